@@ -14,3 +14,12 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'form_desligamento.settings')
 
 application = get_asgi_application()
+
+# Aquece os modelos .xlsx só nos processos que atendem requisições (cada worker
+# do gunicorn importa este módulo), não nos comandos do manage.py.
+from django.conf import settings  # noqa: E402
+
+if settings.RH_EXCEL_AQUECER_MODELOS:
+    from rh.services.modelos_excel import aquecer_modelos
+
+    aquecer_modelos()
@@ -75,6 +75,95 @@ else:
         )
     }
 
+# Cache das exportações individuais (arquivos .xlsx já renderizados).
+# "locmem" é LRU por processo; "file" é compartilhado entre os workers.
+# O limite é o total em bytes (RH_EXPORT_CACHE_MAX_BYTES): no locmem, os menos
+# usados saem até caber; no "file", vira número de entradas pelo tamanho
+# máximo de cada arquivo.
+RH_EXPORT_CACHE_ALIAS = "exportacoes"
+RH_EXPORT_CACHE_ITEM_MAX_BYTES = int(os.getenv("RH_EXPORT_CACHE_ITEM_MAX_BYTES", 2 * 1024 * 1024))
+RH_EXPORT_CACHE_MAX_BYTES = int(os.getenv("RH_EXPORT_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+if os.getenv("RH_EXPORT_CACHE_BACKEND", "locmem") == "file":
+    _CACHE_EXPORTACOES = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("RH_EXPORT_CACHE_DIR", str(BASE_DIR / "cache_exportacoes")),
+        "OPTIONS": {"MAX_ENTRIES": max(1, RH_EXPORT_CACHE_MAX_BYTES // RH_EXPORT_CACHE_ITEM_MAX_BYTES)},
+    }
+else:
+    _CACHE_EXPORTACOES = {
+        "BACKEND": "rh.cache.LocMemCacheLimitado",
+        "LOCATION": "rh-exportacoes",
+        "OPTIONS": {"MAX_ENTRIES": 1000, "MAX_BYTES": RH_EXPORT_CACHE_MAX_BYTES},
+    }
+
+_CACHE_EXPORTACOES["TIMEOUT"] = int(os.getenv("RH_EXPORT_CACHE_TIMEOUT", 24 * 60 * 60))
+
+# Pré-renderização das exportações em segundo plano após o save no admin.
+RH_EXPORT_PRE_RENDER = os.getenv("RH_EXPORT_PRE_RENDER", "False") == "True"
+RH_EXPORT_PRE_RENDER_DIR = os.getenv("RH_EXPORT_PRE_RENDER_DIR", str(BASE_DIR / "exportacoes_pre_render"))
+RH_EXPORT_PRE_RENDER_MAX_DIAS = int(os.getenv("RH_EXPORT_PRE_RENDER_MAX_DIAS", 30))
+
+# Exportações são renderizadas num SpooledTemporaryFile que vai para o disco
+# acima deste tamanho e são servidas com FileResponse (Content-Length exato).
+RH_EXPORT_SPOOL_MAX_BYTES = int(os.getenv("RH_EXPORT_SPOOL_MAX_BYTES", 1024 * 1024))
+
+# Offload do envio de arquivos pré-renderizados para o proxy da frente:
+# "X-Accel-Redirect" (nginx, com RH_EXPORT_SENDFILE_PREFIXO apontando para uma
+# location internal sobre RH_EXPORT_PRE_RENDER_DIR) ou "X-Sendfile" (Apache).
+RH_EXPORT_SENDFILE = os.getenv("RH_EXPORT_SENDFILE", "")
+RH_EXPORT_SENDFILE_PREFIXO = os.getenv("RH_EXPORT_SENDFILE_PREFIXO", "/exportacoes-internas/")
+
+# Coalescência de exportações idênticas simultâneas. Dentro do processo é
+# sempre ativa; entre processos usa lock de arquivo (POSIX) e só reaproveita
+# o resultado se o cache de exportações for compartilhado (backend "file").
+RH_EXPORT_COALESCER_ENTRE_PROCESSOS = os.getenv("RH_EXPORT_COALESCER_ENTRE_PROCESSOS", "False") == "True"
+RH_EXPORT_LOCK_DIR = os.getenv("RH_EXPORT_LOCK_DIR", str(BASE_DIR / "cache_exportacoes" / "locks"))
+# Número fixo de arquivos de lock na pasta (as chaves são distribuídas entre eles).
+RH_EXPORT_LOCK_FAIXAS = int(os.getenv("RH_EXPORT_LOCK_FAIXAS", 64))
+RH_EXPORT_COALESCER_TIMEOUT = int(os.getenv("RH_EXPORT_COALESCER_TIMEOUT", 60))
+
+# Limite de exportações: cota por usuário, (capacidade, reposição por minuto)
+# conforme o grupo, e teto de exportações simultâneas por processo.
+RH_EXPORT_LIMITES = {
+    "RH": (int(os.getenv("RH_EXPORT_LIMITE_RH", 30)), int(os.getenv("RH_EXPORT_LIMITE_RH_MINUTO", 30))),
+    "COORDENADORES": (int(os.getenv("RH_EXPORT_LIMITE_COORDENADORES", 10)), int(os.getenv("RH_EXPORT_LIMITE_COORDENADORES_MINUTO", 10))),
+    "COLABORADORES": (int(os.getenv("RH_EXPORT_LIMITE_COLABORADORES", 5)), int(os.getenv("RH_EXPORT_LIMITE_COLABORADORES_MINUTO", 5))),
+}
+RH_EXPORT_LIMITE_PADRAO = (5, 5)
+RH_EXPORT_MAX_SIMULTANEAS = int(os.getenv("RH_EXPORT_MAX_SIMULTANEAS", 2))
+RH_EXPORT_RETRY_AFTER_OCUPADO = int(os.getenv("RH_EXPORT_RETRY_AFTER_OCUPADO", 5))
+# A cota é contada com add/incr num cache compartilhado entre os workers
+# (Redis, Memcached): locmem é recusado. Vazio: sem cota por usuário, só o teto
+# de simultâneas, com aviso no check (rh.W001) e no log do primeiro export.
+RH_EXPORT_LIMITE_CACHE_ALIAS = os.getenv("RH_EXPORT_LIMITE_CACHE_ALIAS", "")
+
+# Supervisores de cada coordenador em cache com chave versionada; alterar a
+# Hierarquia muda a versão. Precisa ser um cache compartilhado entre os workers
+# (Redis, Memcached, banco): locmem é recusado. Vazio: sem cache, o fechamento
+# da hierarquia é consultado a cada requisição. Grupos nunca ficam em cache.
+RH_HIERARQUIA_CACHE_ALIAS = os.getenv("RH_HIERARQUIA_CACHE_ALIAS", "")
+RH_HIERARQUIA_CACHE_TIMEOUT = int(os.getenv("RH_HIERARQUIA_CACHE_TIMEOUT", 300))
+
+# Changelists: contagem exata até este máximo (acima dele a tela mostra "~N");
+# no Postgres, sem filtros, usa a estimativa do planejador quando a tabela
+# passa de RH_CHANGELIST_CONTAGEM_EXATA_ATE linhas.
+RH_CHANGELIST_CONTAGEM_MAXIMA = int(os.getenv("RH_CHANGELIST_CONTAGEM_MAXIMA", 10000))
+RH_CHANGELIST_CONTAGEM_EXATA_ATE = int(os.getenv("RH_CHANGELIST_CONTAGEM_EXATA_ATE", 10000))
+# Links numerados (OFFSET) até esta página quando a ordenação permite cursor;
+# além dela a navegação é pelo link "Próxima".
+RH_CHANGELIST_PAGINAS_NUMERADAS = int(os.getenv("RH_CHANGELIST_PAGINAS_NUMERADAS", 10))
+
+# Opções dos filtros com autocomplete do changelist (por prefixo e por escopo
+# de visibilidade). Valores novos aparecem depois de no máximo TIMEOUT segundos.
+RH_AUTOCOMPLETE_CACHE_ALIAS = os.getenv("RH_AUTOCOMPLETE_CACHE_ALIAS", "default")
+RH_AUTOCOMPLETE_CACHE_TIMEOUT = int(os.getenv("RH_AUTOCOMPLETE_CACHE_TIMEOUT", 300))
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    RH_EXPORT_CACHE_ALIAS: _CACHE_EXPORTACOES,
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -128,6 +217,23 @@ DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER)
 
 EMAIL_DESTINATARIOS = os.getenv("EMAIL_DESTINATARIOS", "").split(",") if os.getenv("EMAIL_DESTINATARIOS") else []
 
+# Carrega os modelos .xlsx na subida de cada worker, para que a primeira
+# exportação após o deploy não pague o parse do modelo.
+RH_EXCEL_AQUECER_MODELOS = os.getenv("RH_EXCEL_AQUECER_MODELOS", "True") == "True"
+
+# "zip" preenche as células direto no pacote .xlsx; "openpyxl" é o caminho antigo,
+# usado também como fallback quando o modelo não é suportado pelo motor zip.
+RH_EXCEL_MOTOR = os.getenv("RH_EXCEL_MOTOR", "zip")
+
+# Exportação em lote: processos do pool de renderização, tarefas por envio e
+# tamanho mínimo de lote para sair do modo em série. O pool é opcional (1 =
+# em série): cada worker do gunicorn teria os seus processos. Sem lotes por
+# RH_EXCEL_POOL_OCIOSO segundos, o pool é encerrado.
+RH_EXCEL_PROCESSOS = int(os.getenv("RH_EXCEL_PROCESSOS", 1))
+RH_EXCEL_POOL_OCIOSO = int(os.getenv("RH_EXCEL_POOL_OCIOSO", 300))
+RH_EXCEL_CHUNK = int(os.getenv("RH_EXCEL_CHUNK", 8))
+RH_EXCEL_LOTE_MINIMO_PARALELO = int(os.getenv("RH_EXCEL_LOTE_MINIMO_PARALELO", 50))
+
 SECURE_SSL_REDIRECT = not DEBUG
 SESSION_COOKIE_SECURE = not DEBUG
 CSRF_COOKIE_SECURE = not DEBUG
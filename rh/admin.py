@@ -1,19 +1,42 @@
 from django import forms
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters, csrf_protect_m
+from django.contrib.admin.utils import model_ngettext
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.core.paginator import InvalidPage
 from django.urls import path, reverse
 from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.utils import timezone
 from django.utils.html import format_html
-from django.db.models import Count
+from django.utils.translation import ngettext
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 from .forms import DistratoForm
 from .models import Desligamento, Admissao, Distrato, Hierarquia
 from .services.notifications import notificar_admissao, notificar_desligamento
-from .services.excel import (
-    exportar_desligamento_excel,
-    exportar_admissao_excel,
-    exportar_distrato_excel,
+from .services.autocomplete import opcoes_filtro, rotulo_usuario
+from .services.busca import filtrar_busca
+from .services.edicao_lote import aplicar_status, status_do_post
+from .services.dossie import dossies_em_bytes, exportar_dossie, localizar_registros, registros_por_rca
+from .services.exportacao import responder_exportacao
+from .services.exportacao_lote import exportar_lote_zip, resposta_zip
+from .services.facetas import CAMPOS_FACETAS, contagens_facetas
+from .services.limites import admitir_exportacao, limitar_exportacao
+from .services.paginacao import (
+    CURSOR_VAR,
+    PaginadorEstimado,
+    chave_keyset,
+    codificar_cursor,
+    condicao_apos,
+    decodificar_cursor,
+    pagina_com_sobra,
 )
-from .services.permission import users_visiveis_para
+from .services.permission import eh_rh, filtrar_visiveis, papel_do_usuario
+from .services.pre_render import agendar_pre_render
+from .services.relatorios import exportar_relatorio_csv, exportar_relatorio_xlsx, selecionar_colunas
 
 
 # ==========================================================
@@ -62,11 +85,423 @@ class AdmissaoForm(forms.ModelForm):
         return cleaned_data
 
 
+# ==========================================================
+#   EXPORTAÇÃO EM LOTE (AÇÃO DO CHANGELIST)
+# ==========================================================
+class ExportacaoLoteMixin:
+    actions = ["exportar_selecionados"]
+
+    @admin.action(description="📦 Exportar selecionados (ZIP)", permissions=["export"])
+    @limitar_exportacao
+    def exportar_selecionados(self, request, queryset):
+        # O queryset já vem do get_queryset, ou seja, restrito por filtrar_visiveis.
+        admitir_exportacao(request)
+        nome = f"{self.model._meta.model_name}_{timezone.localtime():%Y%m%d_%H%M}.zip"
+        return exportar_lote_zip(queryset, nome)
+
+
+# ==========================================================
+#   DOSSIÊ DO RCA (ADMISSÃO + DESLIGAMENTO + DISTRATO)
+# ==========================================================
+class DossieMixin:
+    def get_actions(self, request):
+        # ``actions`` já vem da exportação em lote; a ação do dossiê é somada aqui.
+        actions = super().get_actions(request)
+        if self.has_export_permission(request):
+            actions["exportar_dossie_selecionados"] = self.get_action("exportar_dossie_selecionados")
+        return actions
+
+    @admin.action(description="🗂️ Exportar dossiê do RCA", permissions=["export"])
+    @limitar_exportacao
+    def exportar_dossie_selecionados(self, request, queryset):
+        # Tudo é localizado antes da resposta: um erro no meio do streaming
+        # chegaria ao usuário como um ZIP truncado.
+        lotes, sem_chave = registros_por_rca(request.user, list(queryset))
+        if sem_chave:
+            self.message_user(
+                request,
+                f"{len(sem_chave)} registro(s) sem código nem CPF ficaram fora do dossiê: "
+                + ", ".join(str(obj) for obj in sem_chave[:5]),
+                messages.WARNING,
+            )
+        if not lotes:
+            return None
+        admitir_exportacao(request)
+        if len(lotes) == 1:
+            return exportar_dossie(lotes[0])
+        nome = f"dossies_{timezone.localtime():%Y%m%d_%H%M}.zip"
+        return resposta_zip(dossies_em_bytes(lotes), nome)
+
+    def get_urls(self):
+        opts = self.model._meta
+        custom_urls = [
+            path(
+                '<int:object_id>/exportar_dossie/',
+                self.admin_site.admin_view(self.exportar_dossie),
+                name=f"{opts.app_label}_{opts.model_name}_exportar_dossie",
+            ),
+        ]
+        return custom_urls + super().get_urls()
+
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        extra_context = extra_context or {}
+        if self.has_export_permission(request):
+            opts = self.model._meta
+            url = reverse(f"admin:{opts.app_label}_{opts.model_name}_exportar_dossie", args=[object_id])
+            extra_context['extra_buttons'] = format_html(
+                '{}<a class="button" style="margin-left:10px;" href="{}">🗂️ Dossiê do RCA</a>',
+                extra_context.get('extra_buttons', ''), url,
+            )
+        return super().change_view(request, object_id, form_url, extra_context=extra_context)
+
+    @limitar_exportacao
+    def exportar_dossie(self, request, object_id):
+        if not self.has_export_permission(request):
+            raise PermissionDenied("Você não tem permissão para exportar este registro.")
+        obj = self.get_object(request, object_id)
+        if obj is None:
+            raise Http404("Registro não encontrado.")
+        admitir_exportacao(request)
+        return exportar_dossie(localizar_registros(request.user, origem=obj))
+
+
+# ==========================================================
+#   LISTAGEM (CHANGELIST)
+# ==========================================================
+class ChangeListListagem(ChangeList):
+    """
+    ChangeList da tela: a página de resultados não carrega as colunas largas
+    que a listagem não mostra. As ações e o relatório continuam recebendo o
+    queryset completo (cl.get_queryset), senão cada registro exportado
+    buscaria os campos adiados um a um.
+
+    A contagem é estimada/limitada e o link "Próxima" usa cursor (keyset),
+    ver services/paginacao.py.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        self.proxima_url = self.primeira_url = None
+        super().__init__(request, *args, **kwargs)
+        # Links de ordenação e filtros recomeçam da primeira página.
+        self.params.pop(CURSOR_VAR, None)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_results(self, request):
+        if self.model_admin.campos_adiados_listagem:
+            self.queryset = self.queryset.defer(*self.model_admin.campos_adiados_listagem)
+
+        # Estimativa só faz sentido para quem vê a tabela inteira, sem filtros nem busca.
+        sem_filtros = (
+            not self.has_active_filters and not self.query
+            and papel_do_usuario(request.user).ids_visiveis is None
+        )
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page, estimar=sem_filtros)
+        chave = chave_keyset(self.model, self.queryset.query.order_by)
+
+        if self.cursor:
+            valores = decodificar_cursor(chave, self.cursor) if chave else None
+            if valores is None:
+                raise IncorrectLookupParameters("Cursor de paginação inválido.")
+            result_list, tem_proxima = pagina_com_sobra(self.queryset.filter(condicao_apos(chave, valores)), self.list_per_page)
+            can_show_all = multi_page = False
+            self.primeira_url = self.get_query_string(remove=[PAGE_VAR])
+        else:
+            can_show_all = paginator.count <= self.list_max_show_all
+            multi_page = paginator.count > self.list_per_page
+            if (self.show_all and can_show_all) or not multi_page:
+                result_list, tem_proxima = self.queryset._clone(), False
+            else:
+                if chave:
+                    # Com cursor, OFFSET só nas primeiras páginas; depois, "Próxima".
+                    paginator.paginas_numeradas = getattr(settings, "RH_CHANGELIST_PAGINAS_NUMERADAS", 10)
+                    if self.page_num > paginator.paginas_numeradas:
+                        raise IncorrectLookupParameters("Página numerada além do limite; use o link Próxima.")
+                try:
+                    pagina = paginator.page(self.page_num)
+                except InvalidPage:
+                    raise IncorrectLookupParameters
+                if chave:
+                    result_list, tem_proxima = pagina_com_sobra(
+                        self.queryset[(pagina.number - 1) * self.list_per_page:], self.list_per_page
+                    )
+                else:
+                    result_list, tem_proxima = pagina.object_list, pagina.has_next()
+
+        if chave and tem_proxima:
+            ultimo = list(result_list)[-1]
+            self.proxima_url = self.get_query_string({CURSOR_VAR: codificar_cursor(chave, ultimo)}, [PAGE_VAR])
+
+        self.result_count = paginator.count
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.full_result_count = self.root_queryset.count() if self.show_full_result_count else None
+        self.show_admin_actions = not self.show_full_result_count or bool(self.full_result_count)
+        self.result_list = result_list
+        self.can_show_all = can_show_all
+        self.multi_page = multi_page
+        self.paginator = paginator
+
+
+def com_total(rotulo, totais, valor):
+    """Rótulo da opção com a contagem da faceta, quando o campo tem contagem."""
+    if totais is None:
+        return rotulo
+    return f"{rotulo} ({totais.get(valor, 0)})"
+
+
+def totais_da_faceta(request, model, field_path):
+    if field_path not in CAMPOS_FACETAS.get(model, ()):
+        return None
+    return contagens_facetas(request.user, model)[field_path]
+
+
+class FiltroStatusContagem(admin.ChoicesFieldListFilter):
+    """Filtro de escolhas com o total de cada opção no escopo do usuário (services/facetas.py)."""
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.totais = totais_da_faceta(request, model, field_path)
+
+    def choices(self, changelist):
+        escolhas = super().choices(changelist)
+        todos = next(escolhas)
+        yield {**todos, "display": f"{todos['display']} ({sum((self.totais or {}).values())})"}
+        # Campo sem nulos: depois de "Todos" vêm as escolhas, na ordem de flatchoices.
+        for escolha, (valor, rotulo) in zip(escolhas, self.field.flatchoices):
+            yield {**escolha, "display": com_total(rotulo, self.totais, valor)}
+
+
+class FiltroAutocomplete(admin.FieldListFilter):
+    """
+    Filtro que não lista os valores no changelist: o select só traz o valor
+    escolhido e as opções vêm por AJAX do endpoint ``autocomplete_filtro``.
+    """
+    template = "admin/rh/filtro_autocomplete.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        # Mesmos parâmetros do RelatedFieldListFilter / AllValuesFieldListFilter.
+        self.lookup_kwarg = f"{field_path}__id__exact" if field.is_relation else field_path
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        opts = model._meta
+        self.url = reverse(f"admin:{opts.app_label}_{opts.model_name}_autocomplete_filtro", args=[field_path])
+        self.totais = totais_da_faceta(request, model, field_path) if self.lookup_val else None
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def has_output(self):
+        return True
+
+    def rotulo_selecionado(self):
+        if not self.lookup_val:
+            return None
+        if self.field.is_relation:
+            user = self.field.related_model.objects.filter(pk=self.lookup_val).only("username", "first_name").first()
+            return rotulo_usuario(user) if user else self.lookup_val
+        return com_total(self.lookup_val, self.totais, self.lookup_val)
+
+    def choices(self, changelist):
+        yield {
+            "selected": self.lookup_val is None,
+            "query_string": changelist.get_query_string(remove=[self.lookup_kwarg]),
+            "display": "Todos",
+        }
+        if self.lookup_val:
+            yield {
+                "selected": True,
+                "query_string": changelist.get_query_string({self.lookup_kwarg: self.lookup_val}),
+                "display": self.rotulo_selecionado(),
+            }
+
+
+class ListagemMixin:
+    list_select_related = ("criado_por",)
+    campos_adiados_listagem = ()
+    paginator = PaginadorEstimado
+    # Sem o segundo COUNT(*) da tabela inteira a cada página.
+    show_full_result_count = False
+    # Status do list_editable gravado em lote (services/edicao_lote.py).
+    edicao_status_em_lote = True
+
+    class Media:
+        js = ("rh/js/filtro_autocomplete.js",)
+
+    def get_changelist(self, request, **kwargs):
+        return ChangeListListagem
+
+    def get_urls(self):
+        opts = self.model._meta
+        custom_urls = [
+            path(
+                'autocomplete/<str:campo>/',
+                self.admin_site.admin_view(self.autocomplete_filtro),
+                name=f"{opts.app_label}_{opts.model_name}_autocomplete_filtro",
+            ),
+        ]
+        return custom_urls + super().get_urls()
+
+    @csrf_protect_m
+    def changelist_view(self, request, extra_context=None):
+        if (
+            self.edicao_status_em_lote and request.method == "POST" and "_save" in request.POST
+            and tuple(self.list_editable) == ("status",)
+        ):
+            resposta = self.salvar_status_em_lote(request)
+            if resposta is not None:
+                return resposta
+        return super().changelist_view(request, extra_context=extra_context)
+
+    def salvar_status_em_lote(self, request):
+        """
+        Grava os status enviados pelo changelist num bulk_update. Retorna None
+        quando alguma linha é inválida: o caminho padrão do admin refaz a
+        validação e mostra os erros.
+        """
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        novos = status_do_post(self.model, request.POST)
+        if novos is None:
+            return None
+        queryset = self.get_queryset(request).defer(*self.campos_adiados_listagem)
+        alterados = aplicar_status(queryset, request.user, novos)
+        if alterados is None:
+            # O formset padrão trataria o id desconhecido como registro novo.
+            self.message_user(
+                request,
+                "Nenhum status foi alterado: há registros que não existem mais ou estão fora da sua visibilidade.",
+                messages.ERROR,
+            )
+        elif alterados:
+            # Mesma mensagem (e tradução) do caminho padrão.
+            mensagem = ngettext(
+                "%(count)s %(name)s was changed successfully.",
+                "%(count)s %(name)s were changed successfully.",
+                len(alterados),
+            ) % {"count": len(alterados), "name": model_ngettext(self.opts, len(alterados))}
+            self.message_user(request, mensagem, messages.SUCCESS)
+        return HttpResponseRedirect(request.get_full_path())
+
+    def autocomplete_filtro(self, request, campo):
+        filtros = {
+            item[0] for item in self.get_list_filter(request)
+            if isinstance(item, (list, tuple)) and item[1] is FiltroAutocomplete
+        }
+        if campo not in filtros:
+            raise Http404("Filtro sem autocomplete.")
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        opcoes = opcoes_filtro(request.user, self.model, campo, request.GET.get("q", ""))
+        # As opções ficam em cache; as contagens não, vêm da tabela de facetas.
+        totais = totais_da_faceta(request, self.model, campo)
+        opcoes = [{**opcao, "text": com_total(opcao["text"], totais, opcao["id"])} for opcao in opcoes]
+        return JsonResponse({"results": opcoes})
+
+    def get_search_results(self, request, queryset, search_term):
+        # Documento normalizado + FTS/trigram em vez de ILIKE em cada search_field.
+        if not search_term.strip():
+            return queryset, False
+        return filtrar_busca(queryset, search_term), False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True, estimar=False):
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, estimar=estimar)
+
+
+# ==========================================================
+#   RELATÓRIO TABULAR (XLSX / CSV) DO CHANGELIST
+# ==========================================================
+class ChangeListRelatorio(ChangeList):
+    """ChangeList só para aplicar filtros/busca: não conta nem pagina resultados."""
+
+    def get_results(self, request):
+        pass
+
+
+class RelatorioMixin:
+    # O cursor da paginação também vem na URL do botão, mas não é filtro.
+    PARAMETROS_RELATORIO = ("formato", "colunas", CURSOR_VAR)
+
+    def get_urls(self):
+        opts = self.model._meta
+        custom_urls = [
+            path(
+                'relatorio/',
+                self.admin_site.admin_view(self.exportar_relatorio),
+                name=f"{opts.app_label}_{opts.model_name}_relatorio",
+            ),
+        ]
+        return custom_urls + super().get_urls()
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        if self.has_export_permission(request):
+            opts = self.model._meta
+            url = reverse(f"admin:{opts.app_label}_{opts.model_name}_relatorio")
+            filtros = request.GET.urlencode()
+            filtros = f"&{filtros}" if filtros else ""
+            extra_context['extra_buttons'] = format_html(
+                '<a class="button" style="margin-left:10px;" href="{}?formato=xlsx{}">📊 Relatório XLSX</a>'
+                '<a class="button" style="margin-left:10px;" href="{}?formato=csv{}">📄 Relatório CSV</a>',
+                url, filtros, url, filtros,
+            )
+        return super().changelist_view(request, extra_context=extra_context)
+
+    def queryset_relatorio(self, request):
+        """Queryset do changelist com os filtros e a busca da tela aplicados."""
+        list_display = self.get_list_display(request)
+        return ChangeListRelatorio(
+            request,
+            self.model,
+            list_display,
+            self.get_list_display_links(request, list_display),
+            self.get_list_filter(request),
+            self.date_hierarchy,
+            self.get_search_fields(request),
+            self.get_list_select_related(request),
+            self.list_per_page,
+            self.list_max_show_all,
+            self.list_editable,
+            self,
+            self.get_sortable_by(request),
+            self.search_help_text,
+        ).get_queryset(request)
+
+    @limitar_exportacao
+    def exportar_relatorio(self, request):
+        if not self.has_export_permission(request):
+            raise PermissionDenied("Você não tem permissão para exportar este relatório.")
+
+        formato = request.GET.get("formato", "xlsx")
+        colunas = selecionar_colunas(self.model, request.GET.get("colunas"))
+
+        # Os parâmetros do relatório não são filtros do changelist.
+        request.GET = request.GET.copy()
+        for parametro in self.PARAMETROS_RELATORIO:
+            request.GET.pop(parametro, None)
+        try:
+            queryset = self.queryset_relatorio(request)
+        except IncorrectLookupParameters:
+            # Como o changelist_view do admin: filtro inválido na URL não vira 500.
+            self.message_user(request, "Filtros inválidos para o relatório.", messages.ERROR)
+            opts = self.model._meta
+            return HttpResponseRedirect(reverse(f"admin:{opts.app_label}_{opts.model_name}_changelist"))
+        admitir_exportacao(request)
+
+        nome = f"relatorio_{self.model._meta.model_name}_{timezone.localtime():%Y%m%d_%H%M}"
+        if formato == "csv":
+            return exportar_relatorio_csv(queryset, colunas, f"{nome}.csv")
+        return exportar_relatorio_xlsx(queryset, colunas, f"{nome}.xlsx")
+
+
 # ==========================================================
 #                DESLIGAMENTO DO VENDEDOR
 # ==========================================================
 @admin.register(Desligamento)
-class DesligamentoAdmin(admin.ModelAdmin):
+class DesligamentoAdmin(ListagemMixin, ExportacaoLoteMixin, DossieMixin, RelatorioMixin, admin.ModelAdmin):
     form = DesligamentoForm
 
     list_display = (
@@ -74,8 +509,13 @@ class DesligamentoAdmin(admin.ModelAdmin):
         "area_atuacao", "criado_por", "status", "qtd_desligamentos_colaborador"
     )
     search_fields = ("nome", "codigo", "area_atuacao")
-    list_filter = ("status", "area_atuacao", "demissao", "criado_por")
+    # Status com contagens (services/facetas.py); valores por autocomplete, sem montar a lista no changelist.
+    list_filter = (
+        ("status", FiltroStatusContagem), ("area_atuacao", FiltroAutocomplete),
+        "demissao", ("criado_por", FiltroAutocomplete),
+    )
     list_editable = ("status",)
+    campos_adiados_listagem = ("motivo", "contato", "busca")
 
     fieldsets = (
         ('📌 Dados do Colaborador', {
@@ -104,30 +544,41 @@ class DesligamentoAdmin(admin.ModelAdmin):
         if is_new:
             obj.criado_por = request.user
         super().save_model(request, obj, form, change)
+        agendar_pre_render(obj)
 
         if is_new:
             notificar_desligamento(obj, request.user)
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        users_visiveis = users_visiveis_para(request.user)
-        return qs.filter(criado_por__in=users_visiveis).annotate(
-            total_desligamentos=Count("criado_por")
+        # Subconsulta correlacionada pelo índice de criado_por: conta todos os
+        # desligamentos do supervisor sem GROUP BY na consulta do changelist.
+        por_supervisor = (
+            Desligamento.objects.filter(criado_por=OuterRef("criado_por"))
+            .order_by()
+            .values("criado_por")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        return filtrar_visiveis(qs, request.user).annotate(
+            total_desligamentos=Coalesce(Subquery(por_supervisor), 0)
         )
 
     def qtd_desligamentos_colaborador(self, obj):
         return obj.total_desligamentos
     qtd_desligamentos_colaborador.short_description = "Qtd desligamentos"
+    qtd_desligamentos_colaborador.admin_order_field = "total_desligamentos"
 
     def has_export_permission(self, request):
-        return request.user.is_superuser or request.user.groups.filter(name="RH").exists()
+        return eh_rh(request.user)
 
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
             path(
                 '<int:desligamento_id>/exportar_excel/',
-                self.admin_site.admin_view(self.exportar_excel),
+                # cacheable: sem o never_cache do admin, o navegador guarda o ETag e revalida.
+                self.admin_site.admin_view(self.exportar_excel, cacheable=True),
                 name="rh_desligamento_exportar_excel_individual",
             ),
         ]
@@ -141,24 +592,32 @@ class DesligamentoAdmin(admin.ModelAdmin):
         )
         return super().change_view(request, object_id, form_url, extra_context=extra_context)
 
+    @limitar_exportacao
     def exportar_excel(self, request, desligamento_id):
         if not self.has_export_permission(request):
             raise PermissionDenied("Você não tem permissão para exportar este registro.")
-        desligamento = Desligamento.objects.get(id=desligamento_id)
-        return exportar_desligamento_excel(desligamento)
+        desligamento = Desligamento.objects.select_related("criado_por").get(id=desligamento_id)
+        return responder_exportacao(request, desligamento)
 
 
 # ==========================================================
 #                    ADMISSÃO DO VENDEDOR
 # ==========================================================
 @admin.register(Admissao)
-class AdmissaoAdmin(admin.ModelAdmin):
+class AdmissaoAdmin(ListagemMixin, ExportacaoLoteMixin, DossieMixin, RelatorioMixin, admin.ModelAdmin):
     form = AdmissaoForm
 
     list_display = ("nome", "codigo", "supervisor", "data_admissao", "cargo", "criado_por", "status")
     search_fields = ("nome", "codigo", "cpf", "cargo", "supervisor_responsavel")
-    list_filter = ("status", "cargo", "data_admissao", "criado_por")
+    list_filter = (
+        ("status", FiltroStatusContagem), ("cargo", FiltroAutocomplete),
+        "data_admissao", ("criado_por", FiltroAutocomplete),
+    )
     list_editable = ("status",)
+    campos_adiados_listagem = (
+        "observacoes", "mae", "pai", "endereco", "bairro", "cidade", "estado", "cep",
+        "banco", "agencia", "conta", "operacao", "conta_gov", "senha_gov", "busca",
+    )
 
     fieldsets = (
         ("📌 Dados Pessoais", {
@@ -195,24 +654,24 @@ class AdmissaoAdmin(admin.ModelAdmin):
         if is_new:
             obj.criado_por = request.user
         super().save_model(request, obj, form, change)
+        agendar_pre_render(obj)
 
         if is_new:
             notificar_admissao(obj, request.user)
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        users_visiveis = users_visiveis_para(request.user)
-        return qs.filter(criado_por__in=users_visiveis)
+        return filtrar_visiveis(qs, request.user)
 
     def has_export_permission(self, request):
-        return request.user.is_superuser or request.user.groups.filter(name="RH").exists()
+        return eh_rh(request.user)
 
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
             path(
                 '<int:admissao_id>/exportar_excel/',
-                self.admin_site.admin_view(self.exportar_excel),
+                self.admin_site.admin_view(self.exportar_excel, cacheable=True),
                 name="rh_admissao_exportar_excel_individual",
             ),
         ]
@@ -226,25 +685,27 @@ class AdmissaoAdmin(admin.ModelAdmin):
         )
         return super().change_view(request, object_id, form_url, extra_context=extra_context)
 
+    @limitar_exportacao
     def exportar_excel(self, request, admissao_id):
         if not self.has_export_permission(request):
             raise PermissionDenied("Você não tem permissão para exportar este registro.")
-        admissao = Admissao.objects.get(id=admissao_id)
-        return exportar_admissao_excel(admissao)
+        admissao = Admissao.objects.select_related("criado_por").get(id=admissao_id)
+        return responder_exportacao(request, admissao)
 
 
 # ==========================================================
 #               DISTRATO DO RCA
 # ==========================================================
 @admin.register(Distrato)
-class DistratoAdmin(admin.ModelAdmin):
+class DistratoAdmin(ListagemMixin, ExportacaoLoteMixin, DossieMixin, RelatorioMixin, admin.ModelAdmin):
     form = DistratoForm
 
     list_display = ("nome", "cpf", "data_admissao", "data_demissao",
                     "total_geral", "total_ultimos_3_meses", "criado_por", "status")
     search_fields = ("nome", "cpf", "rg")
-    list_filter = ("status", "data_demissao", "criado_por")
+    list_filter = (("status", FiltroStatusContagem), "data_demissao", ("criado_por", FiltroAutocomplete))
     list_editable = ("status",)
+    campos_adiados_listagem = ("banco", "agencia", "operacao", "conta_corrente", "titular", "telefone", "busca")
 
     fieldsets = (
         ("📌 Dados do Representante", {
@@ -268,21 +729,21 @@ class DistratoAdmin(admin.ModelAdmin):
         if not obj.pk:
             obj.criado_por = request.user
         super().save_model(request, obj, form, change)
+        agendar_pre_render(obj)
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        users_visiveis = users_visiveis_para(request.user)
-        return qs.filter(criado_por__in=users_visiveis)
+        return filtrar_visiveis(qs, request.user)
 
     def has_export_permission(self, request):
-        return request.user.is_superuser or request.user.groups.filter(name="RH").exists()
+        return eh_rh(request.user)
 
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
             path(
                 '<int:distrato_id>/exportar_excel/',
-                self.admin_site.admin_view(self.exportar_excel),
+                self.admin_site.admin_view(self.exportar_excel, cacheable=True),
                 name="rh_distrato_exportar_excel_individual",
             ),
         ]
@@ -296,11 +757,12 @@ class DistratoAdmin(admin.ModelAdmin):
         )
         return super().change_view(request, object_id, form_url, extra_context=extra_context)
 
+    @limitar_exportacao
     def exportar_excel(self, request, distrato_id):
         if not self.has_export_permission(request):
             raise PermissionDenied("Você não tem permissão para exportar este registro.")
-        distrato = Distrato.objects.get(id=distrato_id)
-        return exportar_distrato_excel(distrato)
+        distrato = Distrato.objects.select_related("criado_por").get(id=distrato_id)
+        return responder_exportacao(request, distrato)
 
 
 # ==========================================================
@@ -312,13 +774,13 @@ class HierarquiaAdmin(admin.ModelAdmin):
     search_fields = ("coordenador__username", "supervisor__username")
 
     def has_view_permission(self, request, obj=None):
-        return request.user.is_superuser or request.user.groups.filter(name="RH").exists()
+        return eh_rh(request.user)
 
     def has_change_permission(self, request, obj=None):
-        return request.user.is_superuser or request.user.groups.filter(name="RH").exists()
+        return eh_rh(request.user)
 
     def has_add_permission(self, request):
-        return request.user.is_superuser or request.user.groups.filter(name="RH").exists()
+        return eh_rh(request.user)
 
     def has_delete_permission(self, request, obj=None):
-        return request.user.is_superuser or request.user.groups.filter(name="RH").exists()
+        return eh_rh(request.user)
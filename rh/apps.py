@@ -1,6 +1,25 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.db.models.signals import post_migrate
 
 
 class RhConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rh'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .services.limites import verificar_configuracao
+
+        checks.register(verificar_configuracao)
+
+        post_migrate.connect(_instalar_indices_busca, sender=self)
+
+
+def _instalar_indices_busca(using, **kwargs):
+    # No SQLite o Django recria a tabela em vários ALTERs, o que apaga os
+    # triggers do FTS; aqui eles voltam (e o índice é reconstruído).
+    from django.db import connections
+    from .services.busca import instalar_indices_busca
+
+    instalar_indices_busca(connections[using])
@@ -0,0 +1,34 @@
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class LocMemCacheLimitado(LocMemCache):
+    """
+    LocMemCache com orçamento total de memória: além de MAX_ENTRIES, a soma
+    dos valores (já serializados) não passa de OPTIONS["MAX_BYTES"]; ao
+    gravar, os menos usados recentemente saem até caber.
+    """
+
+    def __init__(self, name, params):
+        opcoes = dict(params.get("OPTIONS", {}))
+        self._max_bytes = int(opcoes.pop("MAX_BYTES", 0))
+        super().__init__(name, {**params, "OPTIONS": opcoes})
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if self._max_bytes and len(value) > self._max_bytes:
+            self._delete(key)
+            return
+        super()._set(key, value, timeout)
+        if not self._max_bytes:
+            return
+        # O mais recente fica no início do OrderedDict; popitem() tira o LRU do fim.
+        total = sum(len(valor) for valor in self._cache.values())
+        while total > self._max_bytes and len(self._cache) > 1:
+            chave, valor = self._cache.popitem()
+            del self._expire_info[chave]
+            total -= len(valor)
+
+    @property
+    def tamanho_bytes(self):
+        with self._lock:
+            return sum(len(valor) for valor in self._cache.values())
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rh.services.benchmark import FORMULARIOS
+from rh.services.benchmark_edicao import executar_benchmark_edicao
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a edição de status pelo changelist no caminho padrão do admin (um save por linha) "
+        "e no bulk_update em lote. Usa registros sintéticos numa transação desfeita no fim."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--formulario", choices=list(FORMULARIOS), default="desligamento")
+        parser.add_argument("--quantidades", nargs="+", type=int, default=[100, 500], help="Linhas editadas por envio.")
+        parser.add_argument("--repeticoes", type=int, default=5, help="Repetições por cenário.")
+        parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout).")
+
+    def handle(self, *args, **options):
+        if options["repeticoes"] < 1 or min(options["quantidades"]) < 1:
+            raise CommandError("--quantidades e --repeticoes precisam ser positivos.")
+
+        resultados = executar_benchmark_edicao(
+            formulario=options["formulario"],
+            quantidades=options["quantidades"],
+            repeticoes=options["repeticoes"],
+        )
+
+        conteudo = json.dumps(resultados, indent=2, ensure_ascii=False)
+        if options["saida"]:
+            with open(options["saida"], "w", encoding="utf-8") as arquivo:
+                arquivo.write(conteudo + "\n")
+            self.stderr.write(f"Resultado gravado em {options['saida']}")
+        else:
+            self.stdout.write(conteudo)
+
+        for r in resultados:
+            self.stderr.write(
+                f"{r['quantidade']:>5} linhas {r['caminho']:<7} p50={r['p50_ms']:>9.2f}ms "
+                f"p95={r['p95_ms']:>9.2f}ms consultas={r['consultas']}"
+            )
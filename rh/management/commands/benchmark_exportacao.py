@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rh.services.benchmark import FORMULARIOS, comparar, executar_benchmark
+from rh.services.excel import MOTOR_OPENPYXL, MOTOR_ZIP
+from rh.services.render_paralelo import encerrar_pool
+
+
+class Command(BaseCommand):
+    help = "Mede latência (p50/p95), pico de memória e tamanho das exportações e grava o resultado em JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--formularios", nargs="+", choices=list(FORMULARIOS), help="Padrão: todos.")
+        parser.add_argument("--motores", nargs="+", choices=[MOTOR_ZIP, MOTOR_OPENPYXL], help="Padrão: zip e openpyxl.")
+        parser.add_argument("--registros", type=int, default=20, help="Registros sintéticos por formulário.")
+        parser.add_argument("--repeticoes", type=int, default=20, help="Repetições por cenário.")
+        parser.add_argument("--processos", type=int, help="Processos do cenário em pool (padrão: RH_EXCEL_PROCESSOS).")
+        parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout).")
+        parser.add_argument("--comparar", help="JSON de uma execução anterior para detectar regressões.")
+        parser.add_argument("--tolerancia", type=float, default=0.2, help="Piora aceitável na comparação (0.2 = 20%%).")
+
+    def handle(self, *args, **options):
+        if options["registros"] < 1 or options["repeticoes"] < 1:
+            raise CommandError("--registros e --repeticoes precisam ser positivos.")
+
+        try:
+            relatorio = executar_benchmark(
+                formularios=options["formularios"],
+                quantidade=options["registros"],
+                repeticoes=options["repeticoes"],
+                motores=options["motores"],
+                processos=options["processos"],
+            )
+        finally:
+            encerrar_pool()
+
+        regressoes = []
+        if options["comparar"]:
+            with open(options["comparar"], encoding="utf-8") as arquivo:
+                regressoes = comparar(relatorio, json.load(arquivo), options["tolerancia"])
+            relatorio["regressoes"] = regressoes
+
+        conteudo = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if options["saida"]:
+            with open(options["saida"], "w", encoding="utf-8") as arquivo:
+                arquivo.write(conteudo + "\n")
+            self.stderr.write(f"Resultado gravado em {options['saida']}")
+        else:
+            self.stdout.write(conteudo)
+
+        for r in relatorio["resultados"]:
+            self.stderr.write(
+                f"{r['formulario']:<13} {r['cenario']:<20} p50={r['p50_ms']:>9.2f}ms "
+                f"p95={r['p95_ms']:>9.2f}ms pico={r['pico_memoria_bytes'] / 1024:>8.0f}KiB "
+                f"tamanho={r['tamanho_bytes'] / 1024:>8.0f}KiB"
+            )
+
+        if regressoes:
+            for r in regressoes:
+                self.stderr.write(
+                    f"Regressão: {r['formulario']} {r['cenario']} {r['metrica']} "
+                    f"{r['anterior']} -> {r['atual']} (+{r['variacao']:.0%})"
+                )
+            raise CommandError(f"{len(regressoes)} métrica(s) pioraram além da tolerância.")
@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rh.services.benchmark import registros_sinteticos
+from rh.services.mapeamentos import MAPEAMENTOS
+from rh.services.modelos_excel import MODELOS_PADRAO, caminho_origem, caminho_otimizado
+from rh.services.otimizacao_modelos import ErroOtimizacao, otimizar, verificar
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove planilhas vazias, nomes e estilos sem uso e metadados da mídia dos modelos, "
+        "grava <modelo>.otimizado.xlsx ao lado do original e confere as células mapeadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("modelos", nargs="*", help="Caminhos dos modelos (padrão: os três formulários).")
+        parser.add_argument(
+            "--remover-perfil-cor", action="store_true",
+            help="Remove também os perfis ICC das imagens (muda a cor exibida; não é sem perda).",
+        )
+        parser.add_argument("--analisar", action="store_true", help="Só mostra o que seria feito, sem gravar.")
+        parser.add_argument("--json", action="store_true", help="Relatório em JSON no stdout.")
+
+    def handle(self, *args, **options):
+        relatorios = {}
+        for caminho in options["modelos"] or MODELOS_PADRAO:
+            nome = os.path.basename(caminho)
+            if not os.path.exists(caminho):
+                raise CommandError(f"Modelo não encontrado: {caminho}")
+            with open(caminho, "rb") as arquivo:
+                original = arquivo.read()
+
+            otimizado, relatorio = otimizar(original, remover_icc=options["remover_perfil_cor"])
+
+            mapeamentos = [m for m in MAPEAMENTOS.values() if os.path.basename(m.modelo_path) == nome]
+            lista_valores = [
+                m.valores(obj) for m in mapeamentos for obj in registros_sinteticos(m.nome, 3)
+            ]
+            try:
+                verificar(original, otimizado, lista_valores)
+            except ErroOtimizacao as e:
+                raise CommandError(f"{nome}: {e}")
+
+            destino = caminho_otimizado(caminho)
+            if not options["analisar"]:
+                temporario = destino + ".tmp"
+                with open(temporario, "wb") as arquivo:
+                    arquivo.write(otimizado)
+                os.replace(temporario, destino)
+                # Depois do otimizado: no intervalo, o .origem antigo não bate
+                # e as exportações usam o original.
+                with open(temporario, "w", encoding="utf-8") as arquivo:
+                    arquivo.write(hashlib.sha256(original).hexdigest())
+                os.replace(temporario, caminho_origem(destino))
+
+            dados = relatorio.como_dict()
+            dados.update({"destino": destino, "gravado": not options["analisar"],
+                          "mapeamentos_verificados": [m.nome for m in mapeamentos]})
+            relatorios[nome] = dados
+
+            if not options["json"]:
+                self.stdout.write(
+                    f"{nome}: {relatorio.tamanho_original / 1024:.0f} KiB -> "
+                    f"{relatorio.tamanho_otimizado / 1024:.0f} KiB | "
+                    f"abas removidas: {', '.join(relatorio.planilhas_removidas) or '-'} | "
+                    f"nomes removidos: {len(relatorio.nomes_removidos)} | "
+                    f"estilos removidos: {relatorio.estilos_removidos} | "
+                    f"mídia recomprimida: {len(relatorio.midia)}"
+                )
+
+        if options["json"]:
+            self.stdout.write(json.dumps(relatorios, indent=2, ensure_ascii=False))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rh.services.facetas import CAMPOS_FACETAS, reconciliar
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula as contagens por faceta (status, área, cargo) a partir dos formulários e "
+        "corrige as divergências, ou só confere. Rodar periodicamente: update()/bulk_create "
+        "feitos fora do admin não atualizam as contagens."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verificar", action="store_true",
+            help="Só confere as contagens gravadas; sai com erro se houver divergências.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in CAMPOS_FACETAS:
+            divergencias = reconciliar(model, corrigir=not options["verificar"])
+            for autor, campo, valor, gravado, real in divergencias:
+                self.stderr.write(f"{model._meta.label_lower} autor={autor} {campo}={valor!r}: {gravado} → {real}")
+            total += len(divergencias)
+
+        if total and options["verificar"]:
+            raise CommandError(f"Contagens por faceta divergentes: {total}.")
+        if total:
+            self.stdout.write(f"Contagens por faceta corrigidas: {total} divergência(s).")
+        else:
+            self.stdout.write("Contagens por faceta consistentes.")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rh.services.hierarquia import reconstruir_fechamento, verificar_fechamento
+from rh.services.permission import invalidar_hierarquia
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula o fechamento da hierarquia (todos os níveis de coordenador → supervisor) "
+        "a partir da tabela Hierarquia, ou só confere se está consistente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verificar", action="store_true",
+            help="Só confere o fechamento gravado; sai com erro se houver inconsistências.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["verificar"]:
+            pares = reconstruir_fechamento()
+            invalidar_hierarquia()
+            self.stdout.write(f"Fechamento reconstruído: {pares} pares.")
+
+        problemas = verificar_fechamento()
+        for problema in problemas:
+            self.stderr.write(problema)
+        if problemas and options["verificar"]:
+            raise CommandError(f"Fechamento da hierarquia inconsistente: {len(problemas)} problema(s).")
+        if not problemas:
+            self.stdout.write("Fechamento da hierarquia consistente.")
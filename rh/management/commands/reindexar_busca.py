@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from rh.services.busca import CAMPOS_DOCUMENTO, instalar_indices_busca, reindexar
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula o documento de busca (e os dígitos do CPF) de todos os registros e recria "
+        "os índices de busca. Necessário após bulk_create/update feitos fora do admin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        for model in CAMPOS_DOCUMENTO:
+            alterados = reindexar(model)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {alterados} registro(s) atualizados.")
+        instalar_indices_busca(connections[options["database"]], reconstruir=True)
+        self.stdout.write("Índices de busca recriados.")
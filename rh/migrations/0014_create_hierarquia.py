@@ -4,6 +4,15 @@ from django.db import migrations, models
 import django.db.models.deletion
 
 
+def criar_tabela_se_ausente(apps, schema_editor):
+    # A 0011 já cria a tabela; esta migração só existe para bancos em que ela
+    # ficou faltando. Em bancos novos a criação duplicada quebrava o migrate.
+    Hierarquia = apps.get_model("rh", "Hierarquia")
+    tabelas = schema_editor.connection.introspection.table_names()
+    if Hierarquia._meta.db_table not in tabelas:
+        schema_editor.create_model(Hierarquia)
+
+
 class Migration(migrations.Migration):
 
     dependencies = [
@@ -12,24 +21,31 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
-        migrations.CreateModel(
-            name='Hierarquia',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('coordenador', models.ForeignKey(
-                    on_delete=django.db.models.deletion.CASCADE,
-                    related_name='coordenador_set',
-                    to=settings.AUTH_USER_MODEL
-                )),
-                ('supervisor', models.ForeignKey(
-                    on_delete=django.db.models.deletion.CASCADE,
-                    related_name='supervisor_set',
-                    to=settings.AUTH_USER_MODEL
-                )),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(criar_tabela_se_ausente, migrations.RunPython.noop),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='Hierarquia',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('coordenador', models.ForeignKey(
+                            on_delete=django.db.models.deletion.CASCADE,
+                            related_name='coordenador_set',
+                            to=settings.AUTH_USER_MODEL
+                        )),
+                        ('supervisor', models.ForeignKey(
+                            on_delete=django.db.models.deletion.CASCADE,
+                            related_name='supervisor_set',
+                            to=settings.AUTH_USER_MODEL
+                        )),
+                    ],
+                    options={
+                        'verbose_name': 'Hierarquia',
+                        'verbose_name_plural': 'Hierarquias',
+                    },
+                ),
             ],
-            options={
-                'verbose_name': 'Hierarquia',
-                'verbose_name_plural': 'Hierarquias',
-            },
         ),
     ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0018_merge_20250908_1648'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='distrato',
+            name='cpf',
+            field=models.CharField(blank=True, db_index=True, max_length=14, null=True, verbose_name='CPF'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:40
+
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def calcular_fechamento(arestas):
+    # Cópia congelada de services/hierarquia.py: a migration não pode
+    # depender do código atual do app.
+    filhos = defaultdict(set)
+    for coordenador, supervisor in arestas:
+        filhos[coordenador].add(supervisor)
+
+    fechamento = {}
+    for raiz in list(filhos):
+        fila = deque([(raiz, 0)])
+        vistos = {raiz}
+        while fila:
+            atual, profundidade = fila.popleft()
+            for filho in filhos.get(atual, ()):
+                if filho in vistos:
+                    continue
+                vistos.add(filho)
+                fechamento[(raiz, filho)] = profundidade + 1
+                fila.append((filho, profundidade + 1))
+    return fechamento
+
+
+def preencher_fechamento(apps, schema_editor):
+    Hierarquia = apps.get_model("rh", "Hierarquia")
+    HierarquiaFechamento = apps.get_model("rh", "HierarquiaFechamento")
+    fechamento = calcular_fechamento(Hierarquia.objects.values_list("coordenador_id", "supervisor_id"))
+    HierarquiaFechamento.objects.bulk_create(
+        HierarquiaFechamento(ancestral_id=a, descendente_id=d, profundidade=p)
+        for (a, d), p in fechamento.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('rh', '0019_distrato_cpf_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HierarquiaFechamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profundidade', models.PositiveSmallIntegerField()),
+                ('ancestral', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('descendente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Fechamento da hierarquia',
+                'verbose_name_plural': 'Fechamento da hierarquia',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hierarquiafechamento',
+            constraint=models.UniqueConstraint(fields=('ancestral', 'descendente'), name='rh_fechamento_ancestral_descendente'),
+        ),
+        migrations.RunPython(preencher_fechamento, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('rh', '0020_hierarquiafechamento'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='admissao',
+            name='criado_por',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Criado por'),
+        ),
+        migrations.AlterField(
+            model_name='desligamento',
+            name='criado_por',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Criado por'),
+        ),
+        migrations.AlterField(
+            model_name='distrato',
+            name='criado_por',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Criado por'),
+        ),
+        migrations.AddIndex(
+            model_name='admissao',
+            index=models.Index(fields=['criado_por', 'status', 'data_admissao'], name='rh_admis_criado_status_data'),
+        ),
+        migrations.AddIndex(
+            model_name='admissao',
+            index=models.Index(condition=models.Q(('status', 'pendente')), fields=['id'], name='rh_admis_pendentes'),
+        ),
+        migrations.AddIndex(
+            model_name='desligamento',
+            index=models.Index(fields=['criado_por', 'status', 'demissao'], name='rh_deslig_criado_status_data'),
+        ),
+        migrations.AddIndex(
+            model_name='desligamento',
+            index=models.Index(condition=models.Q(('status', 'pendente')), fields=['id'], name='rh_deslig_pendentes'),
+        ),
+        migrations.AddIndex(
+            model_name='distrato',
+            index=models.Index(fields=['criado_por', 'status', 'data_demissao'], name='rh_distr_criado_status_data'),
+        ),
+        migrations.AddIndex(
+            model_name='distrato',
+            index=models.Index(condition=models.Q(('status', 'pendente')), fields=['id'], name='rh_distr_pendentes'),
+        ),
+    ]
@@ -0,0 +1,119 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:49
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Cópias congeladas de services/busca.py e services/dossie.py: a migration
+# não pode depender do código atual do app.
+CAMPOS_DOCUMENTO = {
+    "Desligamento": ("nome", "area_atuacao"),
+    "Admissao": ("nome", "cargo", "supervisor_responsavel"),
+    "Distrato": ("nome", "rg"),
+}
+TABELAS = ("rh_desligamento", "rh_admissao", "rh_distrato")
+
+
+def normalizar(texto):
+    sem_acento = unicodedata.normalize("NFKD", texto or "")
+    sem_acento = "".join(c for c in sem_acento if not unicodedata.combining(c))
+    return " ".join(sem_acento.lower().split())
+
+
+def somente_digitos(valor):
+    return re.sub(r"\D", "", valor or "")
+
+
+def preencher_busca(apps, schema_editor):
+    for nome, campos in CAMPOS_DOCUMENTO.items():
+        Model = apps.get_model("rh", nome)
+        com_cpf = nome != "Desligamento"
+        alterados = []
+        for obj in Model.objects.all().iterator():
+            obj.busca = normalizar(" ".join(str(getattr(obj, campo) or "") for campo in campos))
+            if com_cpf:
+                obj.cpf_digitos = somente_digitos(obj.cpf)
+            alterados.append(obj)
+        Model.objects.bulk_update(alterados, ["busca", "cpf_digitos"] if com_cpf else ["busca"], batch_size=500)
+
+
+def criar_indices_busca(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for tabela in TABELAS:
+            fts = f"{tabela}_busca"
+            if connection.vendor == "postgresql":
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{tabela}_busca_trgm" ON "{tabela}" USING gin (busca gin_trgm_ops)'
+                )
+            elif connection.vendor == "sqlite":
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS \"{fts}\" USING fts5("
+                    f"busca, content='{tabela}', content_rowid='id', tokenize='trigram')"
+                )
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS \"{fts}_ai\" AFTER INSERT ON \"{tabela}\" BEGIN "
+                    f"INSERT INTO \"{fts}\"(rowid, busca) VALUES (new.id, new.busca); END"
+                )
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS \"{fts}_ad\" AFTER DELETE ON \"{tabela}\" BEGIN "
+                    f"INSERT INTO \"{fts}\"(\"{fts}\", rowid, busca) VALUES ('delete', old.id, old.busca); END"
+                )
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS \"{fts}_au\" AFTER UPDATE OF busca ON \"{tabela}\" BEGIN "
+                    f"INSERT INTO \"{fts}\"(\"{fts}\", rowid, busca) VALUES ('delete', old.id, old.busca); "
+                    f"INSERT INTO \"{fts}\"(rowid, busca) VALUES (new.id, new.busca); END"
+                )
+                cursor.execute(f"INSERT INTO \"{fts}\"(\"{fts}\") VALUES ('rebuild')")
+
+
+def remover_indices_busca(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for tabela in TABELAS:
+            fts = f"{tabela}_busca"
+            if connection.vendor == "postgresql":
+                cursor.execute(f'DROP INDEX IF EXISTS "{tabela}_busca_trgm"')
+            elif connection.vendor == "sqlite":
+                for sufixo in ("ai", "ad", "au"):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS "{fts}_{sufixo}"')
+                cursor.execute(f'DROP TABLE IF EXISTS "{fts}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0021_indices_changelist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='admissao',
+            name='busca',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='admissao',
+            name='cpf_digitos',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=14),
+        ),
+        migrations.AddField(
+            model_name='desligamento',
+            name='busca',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='distrato',
+            name='busca',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='distrato',
+            name='cpf_digitos',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=14),
+        ),
+        migrations.RunPython(preencher_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indices_busca, remover_indices_busca),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0022_busca'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='admissao',
+            name='cargo',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True, verbose_name='Cargo a Ocupar'),
+        ),
+        migrations.AlterField(
+            model_name='desligamento',
+            name='area_atuacao',
+            field=models.CharField(db_index=True, max_length=100, verbose_name='Área de Atuação'),
+        ),
+    ]
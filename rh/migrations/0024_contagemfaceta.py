@@ -0,0 +1,59 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Mesmo mapa de services/facetas.py, com os modelos históricos.
+CAMPOS_FACETAS = {
+    "desligamento": ("status", "area_atuacao"),
+    "admissao": ("status", "cargo"),
+    "distrato": ("status",),
+}
+
+
+def preencher_contagens(apps, schema_editor):
+    ContagemFaceta = apps.get_model("rh", "ContagemFaceta")
+    for nome, campos in CAMPOS_FACETAS.items():
+        registros = apps.get_model("rh", nome).objects.filter(criado_por__isnull=False)
+        totais = {}
+        for campo in campos:
+            grupos = registros.values("criado_por_id", campo).annotate(n=models.Count("pk")).order_by()
+            for autor, valor, total in grupos.values_list("criado_por_id", campo, "n"):
+                chave = (autor, campo, valor or "")
+                totais[chave] = totais.get(chave, 0) + total
+        ContagemFaceta.objects.bulk_create(
+            ContagemFaceta(modelo=f"rh.{nome}", criado_por_id=autor, campo=campo, valor=valor, total=total)
+            for (autor, campo, valor), total in totais.items()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('rh', '0023_indices_autocomplete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContagemFaceta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=50)),
+                ('campo', models.CharField(max_length=50)),
+                ('valor', models.CharField(blank=True, max_length=100)),
+                ('total', models.IntegerField(default=0)),
+                ('criado_por', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Contagem por faceta',
+                'verbose_name_plural': 'Contagens por faceta',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='contagemfaceta',
+            constraint=models.UniqueConstraint(fields=('modelo', 'criado_por', 'campo', 'valor'), name='rh_faceta_unica'),
+        ),
+        migrations.RunPython(preencher_contagens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:38
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rh', '0024_contagemfaceta'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='admissao',
+            index=models.Index(django.db.models.functions.text.Lower('cargo'), name='rh_admis_cargo_lower'),
+        ),
+        migrations.AddIndex(
+            model_name='desligamento',
+            index=models.Index(django.db.models.functions.text.Lower('area_atuacao'), name='rh_deslig_area_lower'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 
@@ -17,7 +18,7 @@ class Desligamento(models.Model):
     contato = models.CharField("Contato Particular", max_length=50, blank=True, null=True)
     admissao = models.DateField("Admissão", null=True, blank=True)
     demissao = models.DateField("Demissão", null=True, blank=True)
-    area_atuacao = models.CharField("Área de Atuação", max_length=100)
+    area_atuacao = models.CharField("Área de Atuação", max_length=100, db_index=True)
 
     motivo = models.TextField("Motivo do Desligamento ( Se for trocar de rota, colocar o novo código)", blank=True, null=True)
 
@@ -38,12 +39,14 @@ class Desligamento(models.Model):
 
     data_registro = models.DateField("Data de Registro", auto_now_add=True)
 
+    # Sem índice próprio: o índice composto (criado_por, status, data) começa por ele.
     criado_por = models.ForeignKey(
         User,
         verbose_name="Criado por",
         on_delete=models.SET_NULL,
         null=True,
-        blank=True
+        blank=True,
+        db_index=False,
     )
 
     status = models.CharField(
@@ -53,9 +56,20 @@ class Desligamento(models.Model):
         default="pendente",
     )
 
+    # Documento normalizado da busca do admin (services/busca.py), preenchido no pre_save.
+    busca = models.TextField(editable=False, blank=True, default="")
+
     class Meta:
         verbose_name = "Desligamento"
         verbose_name_plural = "Desligamentos"
+        indexes = [
+            # Filtros do changelist: visibilidade (criado_por), status e data.
+            models.Index(fields=["criado_por", "status", "demissao"], name="rh_deslig_criado_status_data"),
+            # Fila diária do RH: só os pendentes, na ordem padrão do changelist (-pk).
+            models.Index(fields=["id"], name="rh_deslig_pendentes", condition=models.Q(status="pendente")),
+            # Autocomplete do filtro de área por prefixo sem diferenciar maiúsculas.
+            models.Index(Lower("area_atuacao"), name="rh_deslig_area_lower"),
+        ]
 
     def __str__(self):
         return f"{self.nome} ({self.codigo})"
@@ -94,7 +108,7 @@ class Admissao(models.Model):
     operacao = models.CharField("Operação", max_length=10, blank=True, null=True)
 
     data_admissao = models.DateField("Data de Admissão", null=True, blank=True)
-    cargo = models.CharField("Cargo a Ocupar", max_length=100, blank=True, null=True)
+    cargo = models.CharField("Cargo a Ocupar", max_length=100, blank=True, null=True, db_index=True)
     substituicao = models.BooleanField("É substituição?", default=False)
 
     supervisor_responsavel = models.CharField("Supervisor Responsável", max_length=100, blank=True, null=True)
@@ -111,12 +125,14 @@ class Admissao(models.Model):
 
     observacoes = models.TextField("Observações", blank=True, null=True)
 
+    # Sem índice próprio: o índice composto (criado_por, status, data) começa por ele.
     criado_por = models.ForeignKey(
         User,
         verbose_name="Criado por",
         on_delete=models.SET_NULL,
         null=True,
-        blank=True
+        blank=True,
+        db_index=False,
     )
 
     status = models.CharField(
@@ -126,9 +142,21 @@ class Admissao(models.Model):
         default="pendente",
     )
 
+    # Documento normalizado da busca do admin (services/busca.py), preenchido no pre_save.
+    busca = models.TextField(editable=False, blank=True, default="")
+    cpf_digitos = models.CharField(max_length=14, editable=False, blank=True, default="", db_index=True)
+
     class Meta:
         verbose_name = "Admissão"
         verbose_name_plural = "Admissões"
+        indexes = [
+            # Filtros do changelist: visibilidade (criado_por), status e data.
+            models.Index(fields=["criado_por", "status", "data_admissao"], name="rh_admis_criado_status_data"),
+            # Fila diária do RH: só os pendentes, na ordem padrão do changelist (-pk).
+            models.Index(fields=["id"], name="rh_admis_pendentes", condition=models.Q(status="pendente")),
+            # Autocomplete do filtro de cargo por prefixo sem diferenciar maiúsculas.
+            models.Index(Lower("cargo"), name="rh_admis_cargo_lower"),
+        ]
 
     def __str__(self):
         return f"{self.nome} ({self.codigo})"
@@ -140,7 +168,7 @@ class Admissao(models.Model):
 
 class Distrato(models.Model):
     nome = models.CharField("Nome do Representante", max_length=150)
-    cpf = models.CharField("CPF", max_length=14, blank=True, null=True)
+    cpf = models.CharField("CPF", max_length=14, blank=True, null=True, db_index=True)
     rg = models.CharField("RG", max_length=20, blank=True, null=True)
 
     data_admissao = models.DateField("Data de Admissão", null=True, blank=True)
@@ -158,12 +186,14 @@ class Distrato(models.Model):
     titular = models.CharField("Titular", max_length=100, blank=True, null=True)
     telefone = models.CharField("Telefone", max_length=15, validators=[numero_validator], blank=True, null=True)
 
+    # Sem índice próprio: o índice composto (criado_por, status, data) começa por ele.
     criado_por = models.ForeignKey(
         User,
         verbose_name="Criado por",
         on_delete=models.SET_NULL,
         null=True,
-        blank=True
+        blank=True,
+        db_index=False,
     )
 
     status = models.CharField(
@@ -173,9 +203,19 @@ class Distrato(models.Model):
         default="pendente",
     )
 
+    # Documento normalizado da busca do admin (services/busca.py), preenchido no pre_save.
+    busca = models.TextField(editable=False, blank=True, default="")
+    cpf_digitos = models.CharField(max_length=14, editable=False, blank=True, default="", db_index=True)
+
     class Meta:
         verbose_name = "Distrato"
         verbose_name_plural = "Distratos"
+        indexes = [
+            # Filtros do changelist: visibilidade (criado_por), status e data.
+            models.Index(fields=["criado_por", "status", "data_demissao"], name="rh_distr_criado_status_data"),
+            # Fila diária do RH: só os pendentes, na ordem padrão do changelist (-pk).
+            models.Index(fields=["id"], name="rh_distr_pendentes", condition=models.Q(status="pendente")),
+        ]
 
     def __str__(self):
         return f"Distrato - {self.nome}"
@@ -191,3 +231,47 @@ class Hierarquia(models.Model):
 
     def __str__(self):
         return f"{self.coordenador.username} → {self.supervisor.username}"
+
+
+class HierarquiaFechamento(models.Model):
+    """
+    Fechamento transitivo da Hierarquia: uma linha para cada par
+    (ancestral, descendente) em qualquer nível, com a menor distância entre eles.
+    Mantido pelos signals da Hierarquia; reconstruir com `reconstruir_hierarquia`.
+    """
+    ancestral = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    descendente = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    profundidade = models.PositiveSmallIntegerField()
+
+    class Meta:
+        verbose_name = "Fechamento da hierarquia"
+        verbose_name_plural = "Fechamento da hierarquia"
+        constraints = [
+            models.UniqueConstraint(fields=["ancestral", "descendente"], name="rh_fechamento_ancestral_descendente"),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestral_id} → {self.descendente_id} ({self.profundidade})"
+
+
+class ContagemFaceta(models.Model):
+    """
+    Quantos registros de um formulário cada autor tem em cada valor de uma
+    faceta (status, área, cargo). Mantido por services/facetas.py; corrigir
+    desvios com `reconciliar_facetas`.
+    """
+    modelo = models.CharField(max_length=50)
+    criado_por = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    campo = models.CharField(max_length=50)
+    valor = models.CharField(max_length=100, blank=True)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Contagem por faceta"
+        verbose_name_plural = "Contagens por faceta"
+        constraints = [
+            models.UniqueConstraint(fields=["modelo", "criado_por", "campo", "valor"], name="rh_faceta_unica"),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo}.{self.campo}={self.valor} ({self.criado_por_id}): {self.total}"
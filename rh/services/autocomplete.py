@@ -0,0 +1,91 @@
+"""
+Filtros do changelist com autocomplete.
+
+Em vez de o changelist montar a lista completa de valores de ``criado_por``,
+``area_atuacao`` e ``cargo`` a cada carregamento, o filtro só mostra o valor
+escolhido e busca as opções sob demanda num endpoint JSON: consulta por
+prefixo sem diferenciar maiúsculas (intervalo sobre ``LOWER(campo)``, que tem
+índice funcional), restrita aos registros visíveis para o usuário e guardada
+no cache.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Lower
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
+
+from .busca import intervalo_prefixo
+from .permission import filtrar_visiveis, papel_do_usuario
+
+LIMITE_OPCOES = 20
+
+
+def _cache():
+    return caches[getattr(settings, "RH_AUTOCOMPLETE_CACHE_ALIAS", "default")]
+
+
+def condicao_prefixo(campo, prefixo):
+    if not prefixo:
+        return Q()
+    # Um só intervalo sobre LOWER(campo): casa qualquer grafia ("mcDonald",
+    # "SãO") e usa o índice funcional dos models.
+    inicio, fim = intervalo_prefixo(prefixo.lower())
+    return Q(GreaterThanOrEqual(Lower(campo), inicio), LessThan(Lower(campo), fim))
+
+
+def rotulo_usuario(user):
+    return user.first_name or user.username
+
+
+def _opcoes_usuario(user, model, campo, prefixo):
+    ids = papel_do_usuario(user).ids_visiveis
+    # O rótulo costuma ser o primeiro nome: o prefixo vale para ele, para o
+    # sobrenome e para o username.
+    usuarios = User.objects.filter(
+        condicao_prefixo("username", prefixo)
+        | condicao_prefixo("first_name", prefixo)
+        | condicao_prefixo("last_name", prefixo)
+    )
+    if ids is not None:
+        usuarios = usuarios.filter(pk__in=sorted(ids))
+    # Só quem tem registro no formulário, como o RelatedOnlyFieldListFilter.
+    usuarios = usuarios.filter(Exists(model.objects.filter(**{campo: OuterRef("pk")})))
+    return [
+        {"id": str(u.pk), "text": rotulo_usuario(u)}
+        for u in usuarios.order_by("username").only("pk", "username", "first_name")[:LIMITE_OPCOES]
+    ]
+
+
+def _opcoes_valor(user, model, campo, prefixo):
+    valores = (
+        filtrar_visiveis(model.objects.all(), user)
+        .filter(condicao_prefixo(campo, prefixo))
+        .exclude(**{campo: ""})
+        .order_by(campo)
+        .values_list(campo, flat=True)
+        .distinct()[:LIMITE_OPCOES]
+    )
+    return [{"id": valor, "text": valor} for valor in valores]
+
+
+def opcoes_filtro(user, model, campo, prefixo=""):
+    """Até ``LIMITE_OPCOES`` opções ({"id", "text"}) do filtro para o usuário."""
+    prefixo = prefixo.strip()
+    ids = papel_do_usuario(user).ids_visiveis
+    # O escopo entra na chave pelos próprios ids: mudar a hierarquia muda a chave.
+    escopo = "todos" if ids is None else hashlib.md5(",".join(map(str, sorted(ids))).encode()).hexdigest()
+    digest = hashlib.md5(prefixo.encode()).hexdigest()
+    chave = f"rh:autocomplete:{model._meta.label_lower}:{campo}:{escopo}:{digest}"
+
+    cache = _cache()
+    opcoes = cache.get(chave)
+    if opcoes is None:
+        if model._meta.get_field(campo).is_relation:
+            opcoes = _opcoes_usuario(user, model, campo, prefixo)
+        else:
+            opcoes = _opcoes_valor(user, model, campo, prefixo)
+        cache.set(chave, opcoes, timeout=getattr(settings, "RH_AUTOCOMPLETE_CACHE_TIMEOUT", 300))
+    return opcoes
@@ -0,0 +1,214 @@
+"""
+Medição do custo das exportações sobre registros sintéticos.
+
+Para cada formulário mede latência (p50/p95), pico de memória alocada pelo
+Python (``tracemalloc``) e tamanho do arquivo gerado, em cada forma de
+exportar: individual (por motor), em lote (série e pool de processos) e a
+partir do cache. O resultado é um dicionário serializável em JSON para
+comparar entre versões (ver o comando ``benchmark_exportacao``).
+"""
+import math
+import platform
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+import django
+import openpyxl
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import Admissao, Desligamento, Distrato
+from .excel import (
+    MOTOR_OPENPYXL, MOTOR_ZIP, exportar_admissao_excel, exportar_desligamento_excel, exportar_distrato_excel,
+)
+from .exportacao import impressao_digital, invalidar_exportacao, obter_arquivo
+from .mapeamentos import mapeamento_para
+from .render_paralelo import renderizar_lote
+
+# Métricas em que um valor maior é pior (usadas na comparação entre execuções).
+METRICAS_COMPARADAS = ("p50_ms", "p95_ms", "pico_memoria_bytes", "tamanho_bytes")
+
+
+def _desligamento(i):
+    return Desligamento(
+        pk=i, codigo=str(1000 + i), nome=f"Vendedor Sintético {i}", contato="(85) 99999-0000",
+        admissao=date(2022, 1, 1) + timedelta(days=i), demissao=date(2025, 8, 30),
+        area_atuacao="Fortaleza - Centro", motivo="Registro sintético de benchmark",
+        fardamento=i % 2 == 0, tablet=True, chip_voz=True, substituto=i % 3 == 0,
+    )
+
+
+def _admissao(i):
+    return Admissao(
+        pk=i, codigo=str(2000 + i), nome=f"Admitido Sintético {i}", nascimento=date(1990, 5, 17),
+        naturalidade="Sobral", cpf=f"{i:011d}", email=f"admitido{i}@exemplo.com",
+        data_admissao=date(2025, 9, 1), cargo="RCA", substituicao=i % 2 == 0,
+        supervisor_responsavel="Supervisor",
+    )
+
+
+def _distrato(i):
+    return Distrato(
+        pk=i, nome=f"Distrato Sintético {i}", cpf=f"{i:011d}", rg=str(3000000 + i),
+        data_admissao=date(2020, 1, 10), data_demissao=date(2025, 7, 31),
+        total_geral=Decimal("15432.10") + i, total_ultimos_3_meses=Decimal("2100.00"),
+        banco="Caixa", agencia="1234", conta_corrente=str(990000 + i),
+    )
+
+
+FORMULARIOS = {
+    "desligamento": (_desligamento, exportar_desligamento_excel),
+    "admissao": (_admissao, exportar_admissao_excel),
+    "distrato": (_distrato, exportar_distrato_excel),
+}
+
+
+def registros_sinteticos(formulario, quantidade):
+    """Instâncias não salvas (com pk) do formulário, sem tocar no banco."""
+    fabrica, _ = FORMULARIOS[formulario]
+    return [fabrica(i) for i in range(1, quantidade + 1)]
+
+
+def percentil(amostras, p):
+    """Percentil pelo método nearest-rank."""
+    ordenadas = sorted(amostras)
+    return ordenadas[max(0, math.ceil(p / 100 * len(ordenadas)) - 1)]
+
+
+def medir(executar, repeticoes):
+    """
+    Roda ``executar()`` ``repeticoes`` vezes para a latência e mais uma vez
+    sob ``tracemalloc`` (que deixa a execução mais lenta) para o pico de memória.
+    ``executar`` devolve o número de bytes gerados.
+    """
+    executar()  # aquecimento: modelos em cache, imports, pool criado
+    tempos = []
+    tamanho = 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        tamanho = executar()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    tracemalloc.start()
+    try:
+        executar()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "repeticoes": repeticoes,
+        "p50_ms": round(percentil(tempos, 50), 3),
+        "p95_ms": round(percentil(tempos, 95), 3),
+        "pico_memoria_bytes": pico,
+        "tamanho_bytes": tamanho,
+    }
+
+
+def _individual(registros, exportar, motor):
+    estado = {"i": 0}
+
+    def executar():
+        obj = registros[estado["i"] % len(registros)]
+        estado["i"] += 1
+        return sum(len(parte) for parte in exportar(obj, motor=motor).streaming_content)
+
+    return executar
+
+
+def _lote(registros, motor, processos):
+    tarefas = []
+    for obj in registros:
+        mapeamento = mapeamento_para(obj)
+        tarefas.append((mapeamento.nome_arquivo(obj), mapeamento.modelo_path, mapeamento.valores(obj)))
+
+    def executar():
+        return sum(len(conteudo) for _, conteudo in renderizar_lote(tarefas, motor, processos=processos, minimo=0))
+
+    return executar
+
+
+def _cache(obj):
+    mapeamento = mapeamento_para(obj)
+    valores = mapeamento.valores(obj)
+    digital = impressao_digital(mapeamento, valores)
+
+    def executar():
+        arquivo = obter_arquivo(obj, mapeamento, valores, digital)
+        with arquivo:
+            return len(arquivo.read())
+
+    return executar
+
+
+def executar_benchmark(formularios=None, quantidade=20, repeticoes=20, motores=None, processos=None):
+    """
+    Mede cada cenário de cada formulário e devolve o relatório completo.
+    ``processos`` controla o cenário de lote em pool (<= 1 desliga o cenário).
+    """
+    formularios = formularios or list(FORMULARIOS)
+    motores = motores or [MOTOR_ZIP, MOTOR_OPENPYXL]
+    processos = processos if processos is not None else getattr(settings, "RH_EXCEL_PROCESSOS", 1)
+
+    resultados = []
+    for formulario in formularios:
+        registros = registros_sinteticos(formulario, quantidade)
+        _, exportar = FORMULARIOS[formulario]
+
+        cenarios = [(f"individual_{motor}", motor, _individual(registros, exportar, motor)) for motor in motores]
+        motor_lote = motores[0]
+        cenarios.append(("lote_serie", motor_lote, _lote(registros, motor_lote, 1)))
+        if processos > 1:
+            cenarios.append(("lote_pool", motor_lote, _lote(registros, motor_lote, processos)))
+        cenarios.append(("cache", None, _cache(registros[0])))
+
+        # Lotes renderizam todos os registros a cada repetição: menos repetições.
+        for cenario, motor, executar in cenarios:
+            vezes = max(3, repeticoes // 5) if cenario.startswith("lote") else repeticoes
+            resultado = {"formulario": formulario, "cenario": cenario, "motor": motor}
+            resultado.update(medir(executar, vezes))
+            if cenario.startswith("lote"):
+                resultado["registros"] = quantidade
+            resultados.append(resultado)
+
+        invalidar_exportacao(registros[0])
+
+    return {
+        "gerado_em": timezone.now().isoformat(),
+        "ambiente": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "openpyxl": openpyxl.__version__,
+            "plataforma": platform.platform(),
+            "processos": processos,
+        },
+        "parametros": {"quantidade": quantidade, "repeticoes": repeticoes, "motores": motores},
+        "resultados": resultados,
+    }
+
+
+def comparar(atual, anterior, tolerancia=0.2):
+    """
+    Lista as métricas que pioraram mais que ``tolerancia`` (fração) em
+    relação a uma execução anterior, casando por (formulário, cenário).
+    """
+    base = {(r["formulario"], r["cenario"]): r for r in anterior.get("resultados", [])}
+    regressoes = []
+    for resultado in atual["resultados"]:
+        referencia = base.get((resultado["formulario"], resultado["cenario"]))
+        if referencia is None:
+            continue
+        for metrica in METRICAS_COMPARADAS:
+            antes, depois = referencia.get(metrica), resultado.get(metrica)
+            if antes and depois is not None and depois > antes * (1 + tolerancia):
+                regressoes.append({
+                    "formulario": resultado["formulario"],
+                    "cenario": resultado["cenario"],
+                    "metrica": metrica,
+                    "anterior": antes,
+                    "atual": depois,
+                    "variacao": round(depois / antes - 1, 3),
+                })
+    return regressoes
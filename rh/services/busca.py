@@ -0,0 +1,206 @@
+"""
+Busca do admin sem ``ILIKE '%termo%'`` em cada coluna.
+
+Cada registro guarda em ``busca`` um documento normalizado (minúsculo, sem
+acentos) com os campos de texto pesquisáveis, e os documentos (CPF, código)
+ficam de fora: termos numéricos são procurados por prefixo nos dígitos, pelo
+índice b-tree.
+
+- Postgres: índice GIN ``gin_trgm_ops`` em ``busca``; o ``LIKE '%termo%'``
+  no documento normalizado usa o índice.
+- SQLite: tabela FTS5 (tokenizador trigram) com conteúdo externo em
+  ``busca``, mantida por triggers. Termos com menos de três letras não
+  formam trigramas e caem no ``LIKE`` direto.
+
+O documento é recalculado no ``pre_save``; ``bulk_create``/``update`` não
+passam por ele, e o comando ``reindexar_busca`` recalcula tudo.
+"""
+import logging
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from ..models import Admissao, Desligamento, Distrato
+from .dossie import somente_digitos
+
+logger = logging.getLogger(__name__)
+
+# Campos de texto que entram no documento de busca de cada formulário.
+CAMPOS_DOCUMENTO = {
+    Desligamento: ("nome", "area_atuacao"),
+    Admissao: ("nome", "cargo", "supervisor_responsavel"),
+    Distrato: ("nome", "rg"),
+}
+
+# Campos procurados por prefixo quando o termo é numérico.
+CAMPOS_PREFIXO = {
+    Desligamento: ("codigo",),
+    Admissao: ("codigo", "cpf_digitos"),
+    Distrato: ("cpf_digitos",),
+}
+
+_SEPARADORES_NUMERICOS = re.compile(r"[.\-/\s]")
+
+
+def normalizar(texto):
+    """Minúsculo, sem acentos e com espaços simples."""
+    sem_acento = unicodedata.normalize("NFKD", texto or "")
+    sem_acento = "".join(c for c in sem_acento if not unicodedata.combining(c))
+    return " ".join(sem_acento.lower().split())
+
+
+def documento_busca(obj):
+    campos = CAMPOS_DOCUMENTO.get(type(obj), ())
+    return normalizar(" ".join(str(getattr(obj, campo) or "") for campo in campos))
+
+
+def atualizar_campos_busca(obj):
+    obj.busca = documento_busca(obj)
+    if hasattr(obj, "cpf_digitos"):
+        obj.cpf_digitos = somente_digitos(obj.cpf)
+
+
+def gravar_campos_busca(obj, update_fields):
+    """
+    Grava ``busca``/``cpf_digitos`` com um UPDATE próprio quando o save teve
+    ``update_fields`` sem eles (instância carregada com ``busca`` adiado) mas
+    com algum campo que entra neles.
+    """
+    origem = set(CAMPOS_DOCUMENTO.get(type(obj), ())) | {"cpf"}
+    if "busca" in update_fields or not origem & set(update_fields):
+        return
+    campos = {"busca": obj.busca}
+    if hasattr(obj, "cpf_digitos"):
+        campos["cpf_digitos"] = obj.cpf_digitos
+    type(obj)._base_manager.filter(pk=obj.pk).update(**campos)
+
+
+def tabela_fts(model):
+    return f"{model._meta.db_table}_busca"
+
+
+def intervalo_prefixo(prefixo):
+    # "123" -> ["123", "124"): prefixo como intervalo, que usa o b-tree em qualquer banco.
+    return prefixo, prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+
+
+def _condicao_texto(model, termo, vendor):
+    if vendor == "sqlite" and len(termo) >= 3:
+        fts = tabela_fts(model)
+        frase = '"{}"'.format(termo.replace('"', '""'))
+        return Q(pk__in=RawSQL(f'SELECT rowid FROM "{fts}" WHERE "{fts}" MATCH %s', [frase]))
+    return Q(busca__contains=termo)
+
+
+def filtrar_busca(queryset, termo_busca):
+    """
+    Cada termo precisa casar (E); um termo casa com o documento ou, se for
+    numérico (com ou sem máscara), com o prefixo do código/CPF.
+    """
+    model = queryset.model
+    vendor = connections[queryset.db].vendor
+    for bruto in termo_busca.split():
+        termo = normalizar(bruto)
+        if not termo:
+            continue
+        condicao = _condicao_texto(model, termo, vendor)
+        digitos = _SEPARADORES_NUMERICOS.sub("", bruto)
+        if digitos.isdigit():
+            inicio, fim = intervalo_prefixo(digitos)
+            for campo in CAMPOS_PREFIXO.get(model, ()):
+                condicao |= Q(**{f"{campo}__gte": inicio, f"{campo}__lt": fim})
+        queryset = queryset.filter(condicao)
+    return queryset
+
+
+# ==========================================================
+#   ÍNDICES (POSTGRES) / TABELAS FTS5 (SQLITE)
+# ==========================================================
+def _sql_sqlite(model):
+    tabela, fts = model._meta.db_table, tabela_fts(model)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS \"{fts}\" USING fts5("
+        f"busca, content='{tabela}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS \"{fts}_ai\" AFTER INSERT ON \"{tabela}\" BEGIN "
+        f"INSERT INTO \"{fts}\"(rowid, busca) VALUES (new.id, new.busca); END",
+        f"CREATE TRIGGER IF NOT EXISTS \"{fts}_ad\" AFTER DELETE ON \"{tabela}\" BEGIN "
+        f"INSERT INTO \"{fts}\"(\"{fts}\", rowid, busca) VALUES ('delete', old.id, old.busca); END",
+        f"CREATE TRIGGER IF NOT EXISTS \"{fts}_au\" AFTER UPDATE OF busca ON \"{tabela}\" BEGIN "
+        f"INSERT INTO \"{fts}\"(\"{fts}\", rowid, busca) VALUES ('delete', old.id, old.busca); "
+        f"INSERT INTO \"{fts}\"(rowid, busca) VALUES (new.id, new.busca); END",
+    ]
+
+
+def _sql_postgres(model):
+    tabela = model._meta.db_table
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f'CREATE INDEX IF NOT EXISTS "{tabela}_busca_trgm" ON "{tabela}" USING gin (busca gin_trgm_ops)',
+    ]
+
+
+def _tem_coluna_busca(connection, cursor, model):
+    tabela = model._meta.db_table
+    if tabela not in connection.introspection.table_names(cursor):
+        return False
+    return any(coluna.name == "busca" for coluna in connection.introspection.get_table_description(cursor, tabela))
+
+
+def instalar_indices_busca(connection, reconstruir=False):
+    """
+    Cria (se faltarem) os índices/tabelas de busca. No SQLite, recriar a
+    tabela num ALTER do Django derruba os triggers; por isso roda também no
+    post_migrate e reconstrói o FTS quando algum trigger estava faltando.
+    Tabelas ainda sem a coluna ``busca`` (migradas para antes da 0022) ficam
+    de fora.
+    """
+    if connection.vendor not in ("sqlite", "postgresql"):
+        return
+    with connection.cursor() as cursor:
+        for model in CAMPOS_DOCUMENTO:
+            if not _tem_coluna_busca(connection, cursor, model):
+                continue
+            if connection.vendor == "postgresql":
+                for sql in _sql_postgres(model):
+                    cursor.execute(sql)
+                continue
+
+            fts = tabela_fts(model)
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+                [f"{fts}_ai", f"{fts}_ad", f"{fts}_au"],
+            )
+            faltando = cursor.fetchone()[0] < 3
+            for sql in _sql_sqlite(model):
+                cursor.execute(sql)
+            if faltando or reconstruir:
+                cursor.execute(f"INSERT INTO \"{fts}\"(\"{fts}\") VALUES ('rebuild')")
+                logger.info(f"Índice de busca reconstruído: {fts}")
+
+
+def reindexar(model, lote=500):
+    """Recalcula ``busca``/``cpf_digitos`` de todos os registros. Retorna quantos mudaram."""
+    campos = ["busca"]
+    origem = list(CAMPOS_DOCUMENTO[model])
+    if hasattr(model, "cpf_digitos"):
+        campos.append("cpf_digitos")
+        origem.append("cpf")
+
+    total, ultimo = 0, 0
+    while True:
+        # Lotes por pk: não atualiza a tabela com um cursor ainda aberto sobre ela.
+        objs = list(model.objects.filter(pk__gt=ultimo).order_by("pk").only(*origem, *campos)[:lote])
+        if not objs:
+            return total
+        ultimo = objs[-1].pk
+        alterados = []
+        for obj in objs:
+            antes = [getattr(obj, campo) for campo in campos]
+            atualizar_campos_busca(obj)
+            if antes != [getattr(obj, campo) for campo in campos]:
+                alterados.append(obj)
+        model.objects.bulk_update(alterados, campos)
+        total += len(alterados)
@@ -0,0 +1,117 @@
+"""
+Coalescência ("single-flight") de exportações idênticas simultâneas.
+
+Quando várias requisições pedem a mesma exportação ao mesmo tempo (link
+compartilhado no grupo), só a primeira renderiza; as demais esperam e
+reaproveitam o resultado. Dentro do processo isso é feito com um Event por
+chave. Entre processos (vários workers do gunicorn), opcionalmente, um lock
+de arquivo serializa a renderização e quem pega o lock depois procura o
+resultado no armazenamento compartilhado (cache em arquivo / pré-render)
+antes de renderizar de novo.
+
+Os locks são ``RH_EXPORT_LOCK_FAIXAS`` arquivos fixos (hash da chave módulo
+N), não um por chave: a pasta não cresce a cada registro exportado. Chaves
+diferentes na mesma faixa só esperam uma pela outra.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem coalescência entre processos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_voos = {}
+_lock = threading.Lock()
+_contadores = {"renderizados": 0, "coalescidos": 0, "coalescidos_entre_processos": 0}
+
+
+class _Voo:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+def _contar(nome):
+    with _lock:
+        _contadores[nome] += 1
+
+
+def estatisticas():
+    """Contadores desde a subida do processo."""
+    with _lock:
+        return dict(_contadores)
+
+
+def zerar_estatisticas():
+    with _lock:
+        for nome in _contadores:
+            _contadores[nome] = 0
+
+
+@contextmanager
+def _lock_entre_processos(chave):
+    if fcntl is None or not getattr(settings, "RH_EXPORT_COALESCER_ENTRE_PROCESSOS", False):
+        yield False
+        return
+
+    pasta = str(getattr(settings, "RH_EXPORT_LOCK_DIR", os.path.join(tempfile.gettempdir(), "rh_locks")))
+    os.makedirs(pasta, exist_ok=True)
+    faixas = getattr(settings, "RH_EXPORT_LOCK_FAIXAS", 64)
+    faixa = int.from_bytes(hashlib.sha256(chave.encode("utf-8")).digest()[:8], "big") % faixas
+    with open(os.path.join(pasta, f"faixa_{faixa:03d}.lock"), "a+b") as arquivo:
+        fcntl.flock(arquivo, fcntl.LOCK_EX)
+        try:
+            yield True
+        finally:
+            fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+
+def executar_uma_vez(chave, renderizar, buscar=None):
+    """
+    Executa ``renderizar()`` uma única vez por ``chave`` entre chamadas
+    simultâneas. ``buscar()``, se informado, é consultado depois de obter o
+    lock entre processos para reaproveitar o que outro processo já produziu.
+    """
+    with _lock:
+        voo = _voos.get(chave)
+        lider = voo is None
+        if lider:
+            voo = _voos[chave] = _Voo()
+
+    if not lider:
+        timeout = getattr(settings, "RH_EXPORT_COALESCER_TIMEOUT", 60)
+        if voo.evento.wait(timeout) and voo.erro is None:
+            _contar("coalescidos")
+            return voo.resultado
+        # Líder falhou ou demorou demais: segue sozinho.
+        logger.warning(f"Coalescência sem resultado para {chave}; renderizando de novo")
+        _contar("renderizados")
+        return renderizar()
+
+    try:
+        with _lock_entre_processos(chave) as entre_processos:
+            resultado = buscar() if (entre_processos and buscar) else None
+            if resultado is not None:
+                _contar("coalescidos_entre_processos")
+            else:
+                resultado = renderizar()
+                _contar("renderizados")
+        voo.resultado = resultado
+        return resultado
+    except Exception as e:
+        voo.erro = e
+        raise
+    finally:
+        with _lock:
+            _voos.pop(chave, None)
+        voo.evento.set()
@@ -0,0 +1,199 @@
+"""
+Dossiê do RCA: admissão, desligamento e distrato num único workbook.
+
+Os registros são ligados pelo código do RCA (admissão e desligamento) e pelo
+CPF (admissão e distrato). Cada formulário é preenchido na cópia em cache do
+seu modelo e as abas são copiadas, com estilos, mesclagens e dimensões, para
+um workbook novo salvo de uma vez só. Imagens dos modelos não são copiadas
+(o openpyxl não as preserva sem o Pillow).
+"""
+import io
+import re
+import tempfile
+from copy import copy
+
+from django.conf import settings
+from django.http import Http404
+from openpyxl import Workbook
+from openpyxl.cell.cell import MergedCell
+
+from ..models import Admissao, Desligamento, Distrato
+from .excel import resposta_xlsx
+from .mapeamentos import mapeamento_para
+from .modelos_excel import obter_modelo
+from .permission import filtrar_visiveis
+
+# Ordem das abas no dossiê.
+MODELOS_DOSSIE = (Admissao, Desligamento, Distrato)
+
+_ATRIBUTOS_ESTILO = ("font", "border", "fill", "number_format", "protection", "alignment")
+
+
+def somente_digitos(valor):
+    return re.sub(r"\D", "", valor or "")
+
+
+def variantes_cpf(cpf):
+    """O CPF é gravado com ou sem máscara; procura pelas duas formas."""
+    digitos = somente_digitos(cpf)
+    variantes = {cpf.strip()}
+    if len(digitos) == 11:
+        variantes.update({digitos, f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"})
+    return sorted(variantes)
+
+
+def chave_dossie(obj):
+    """(codigo, cpf) que identificam o RCA a partir de qualquer um dos registros."""
+    return getattr(obj, "codigo", None) or None, getattr(obj, "cpf", None) or None
+
+
+def localizar_registros(usuario, codigo=None, cpf=None, origem=None):
+    """
+    Registro de cada formulário do RCA, visível para o usuário: o mais
+    recente, exceto no formulário de ``origem`` (o registro de onde o dossiê
+    foi aberto), que entra sempre ele mesmo. A admissão completa a chave que
+    faltar (código <-> CPF).
+    """
+    if origem is not None:
+        codigo, cpf = chave_dossie(origem)
+    if not codigo and not cpf:
+        raise Http404("Informe o código ou o CPF do RCA.")
+
+    def mais_recente(model, **filtros):
+        if isinstance(origem, model):
+            return origem
+        qs = model.objects.select_related("criado_por").filter(**filtros)
+        return filtrar_visiveis(qs, usuario).order_by("-pk").first()
+
+    admissao = mais_recente(Admissao, codigo=codigo) if codigo else mais_recente(Admissao, cpf__in=variantes_cpf(cpf))
+    if admissao is not None:
+        codigo = codigo or admissao.codigo
+        cpf = cpf or admissao.cpf
+
+    registros = {
+        Admissao: admissao,
+        Desligamento: mais_recente(Desligamento, codigo=codigo) if codigo else None,
+        Distrato: mais_recente(Distrato, cpf__in=variantes_cpf(cpf)) if cpf else None,
+    }
+    if not any(registros.values()):
+        raise Http404("Nenhum formulário encontrado para este RCA.")
+    return registros
+
+
+def _planilha_vazia(ws):
+    return ws.max_row == 1 and ws.max_column == 1 and ws["A1"].value is None
+
+
+def _titulo_citado(titulo, wb):
+    for ws in wb.worksheets:
+        for linha in ws.iter_rows():
+            for celula in linha:
+                if isinstance(celula.value, str) and celula.value.startswith("=") and titulo in celula.value:
+                    return True
+    return False
+
+
+def _copiar_planilha(origem, destino):
+    for linha in origem.iter_rows():
+        for celula in linha:
+            if isinstance(celula, MergedCell):
+                continue
+            nova = destino.cell(row=celula.row, column=celula.column, value=celula.value)
+            if celula.has_style:
+                for atributo in _ATRIBUTOS_ESTILO:
+                    setattr(nova, atributo, copy(getattr(celula, atributo)))
+
+    for intervalo in origem.merged_cells.ranges:
+        destino.merge_cells(str(intervalo))
+    for letra, dimensao in origem.column_dimensions.items():
+        alvo = destino.column_dimensions[letra]
+        alvo.min, alvo.max, alvo.width, alvo.hidden = dimensao.min, dimensao.max, dimensao.width, dimensao.hidden
+    for numero, dimensao in origem.row_dimensions.items():
+        alvo = destino.row_dimensions[numero]
+        alvo.height, alvo.hidden = dimensao.height, dimensao.hidden
+
+    destino.sheet_format = copy(origem.sheet_format)
+    destino.sheet_view.showGridLines = origem.sheet_view.showGridLines
+    destino.page_margins = copy(origem.page_margins)
+    destino.page_setup = copy(origem.page_setup)
+    destino.print_options = copy(origem.print_options)
+    for nome, definido in origem.defined_names.items():
+        destino.defined_names[nome] = copy(definido)
+
+
+def montar_workbook(registros):
+    """Workbook com as abas preenchidas de cada registro encontrado."""
+    wb = Workbook()
+    wb.remove(wb.active)
+    for model in MODELOS_DOSSIE:
+        obj = registros.get(model)
+        if obj is None:
+            continue
+        mapeamento = mapeamento_para(obj)
+        origem = obter_modelo(mapeamento.modelo_path).novo_workbook()
+        ativa = origem.active
+        for celula, valor in mapeamento.valores(obj).items():
+            ativa[celula] = valor
+
+        # A aba preenchida ganha o nome do formulário, a menos que alguma
+        # fórmula do modelo dependa do nome original.
+        if not _titulo_citado(ativa.title, origem):
+            ativa.title = str(model._meta.verbose_name)
+
+        for ws in origem.worksheets:
+            if _planilha_vazia(ws):
+                continue
+            titulo, contador = ws.title, 2
+            while titulo in wb.sheetnames:
+                titulo = f"{ws.title[:26]} ({contador})"
+                contador += 1
+            _copiar_planilha(ws, wb.create_sheet(titulo))
+    wb.active = 0
+    return wb
+
+
+def nome_arquivo_dossie(registros):
+    admissao = registros.get(Admissao)
+    desligamento = registros.get(Desligamento)
+    distrato = registros.get(Distrato)
+    codigo = (admissao and admissao.codigo) or (desligamento and desligamento.codigo)
+    identificador = codigo or somente_digitos((admissao and admissao.cpf) or (distrato and distrato.cpf))
+    return f"dossie_{identificador}.xlsx"
+
+
+def renderizar_dossie(registros, destino):
+    montar_workbook(registros).save(destino)
+
+
+def registros_por_rca(usuario, objetos):
+    """
+    (lotes, sem_chave): os registros de cada RCA distinto entre os objetos,
+    localizados antes de qualquer arquivo ser gerado, e os objetos sem
+    código nem CPF (não dá para montar o dossiê deles).
+    """
+    lotes, sem_chave, vistos = [], [], set()
+    for obj in objetos:
+        chave = chave_dossie(obj)
+        if chave == (None, None):
+            sem_chave.append(obj)
+            continue
+        if chave in vistos:
+            continue
+        vistos.add(chave)
+        lotes.append(localizar_registros(usuario, origem=obj))
+    return lotes, sem_chave
+
+
+def dossies_em_bytes(lotes):
+    """(nome_arquivo, bytes) de cada lote de ``registros_por_rca``."""
+    for registros in lotes:
+        saida = io.BytesIO()
+        renderizar_dossie(registros, saida)
+        yield nome_arquivo_dossie(registros), saida.getvalue()
+
+
+def exportar_dossie(registros):
+    arquivo = tempfile.SpooledTemporaryFile(max_size=getattr(settings, "RH_EXPORT_SPOOL_MAX_BYTES", 1024 * 1024))
+    renderizar_dossie(registros, arquivo)
+    arquivo.seek(0)
+    return resposta_xlsx(arquivo, nome_arquivo_dossie(registros))
@@ -0,0 +1,100 @@
+"""
+Edição de status pelo ``list_editable`` do changelist, em lote.
+
+O caminho padrão do admin valida e salva cada linha com um ``UPDATE`` de
+todas as colunas, os signals e uma ``LogEntry`` por registro. Aqui os status
+alterados são conferidos contra o queryset visível numa consulta e gravados
+com um ``bulk_update(fields=["status"])`` na mesma transação, junto com as
+contagens das facetas, o cache das exportações e o histórico do admin, e
+sai um único evento de auditoria com o resumo.
+
+O status não entra nas planilhas exportadas, então não há pré-renderização.
+"""
+import json
+import logging
+from collections import Counter
+
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+
+from .exportacao import invalidar_exportacoes
+from .facetas import atualizar_facetas
+
+logger = logging.getLogger(__name__)
+
+
+def status_do_post(model, dados, prefixo="form"):
+    """
+    {pk: status} das linhas enviadas pelo formset do changelist, ou ``None``
+    se alguma linha não for válida (o caminho padrão mostra os erros).
+    """
+    try:
+        total = int(dados[f"{prefixo}-TOTAL_FORMS"])
+    except (KeyError, ValueError):
+        return None
+    validos = {str(valor) for valor, _ in model._meta.get_field("status").flatchoices}
+    novos = {}
+    for i in range(total):
+        pk, status = dados.get(f"{prefixo}-{i}-id"), dados.get(f"{prefixo}-{i}-status")
+        if not pk or status not in validos:
+            return None
+        try:
+            novos[model._meta.pk.to_python(pk)] = status
+        except ValidationError:
+            return None
+    return novos
+
+
+def aplicar_status(queryset, usuario, novos):
+    """
+    Grava os status de ``novos`` ({pk: status}) nos registros do queryset
+    (já restrito ao que o usuário vê). Retorna os registros alterados, ou
+    ``None`` se algum pk não estiver no queryset.
+    """
+    model = queryset.model
+    objs = list(queryset.filter(pk__in=list(novos)))
+    if len(objs) != len(novos):
+        return None
+
+    alterados, alteracoes, transicoes = [], [], Counter()
+    for obj in objs:
+        anterior, novo = obj.status, novos[obj.pk]
+        if anterior == novo:
+            continue
+        obj.status = novo
+        alterados.append(obj)
+        alteracoes.append(((obj.criado_por_id, (("status", anterior),)), (obj.criado_por_id, (("status", novo),))))
+        transicoes[(anterior, novo)] += 1
+    if not alterados:
+        return alterados
+
+    with transaction.atomic(using=router.db_for_write(model)):
+        model.objects.bulk_update(alterados, ["status"])
+        atualizar_facetas(model, alteracoes)
+        _registrar_historico(usuario, alterados)
+        invalidar_exportacoes(alterados)
+
+        resumo = ", ".join(f"{a}→{n}: {q}" for (a, n), q in sorted(transicoes.items()))
+        mensagem = f"{usuario.get_username()} alterou o status de {len(alterados)} {model._meta.verbose_name_plural} ({resumo})"
+        transaction.on_commit(lambda: logger.info(mensagem))
+    return alterados
+
+
+def _registrar_historico(usuario, objs):
+    # Mesma entrada do log_change do admin, num único INSERT.
+    content_type = ContentType.objects.get_for_model(objs[0], for_concrete_model=False)
+    campo = str(type(objs[0])._meta.get_field("status").verbose_name)
+    mensagem = json.dumps([{"changed": {"fields": [campo]}}])
+    LogEntry.objects.bulk_create(
+        LogEntry(
+            user_id=usuario.pk,
+            content_type_id=content_type.pk,
+            object_id=str(obj.pk),
+            object_repr=str(obj)[:200],
+            action_flag=CHANGE,
+            change_message=mensagem,
+        )
+        for obj in objs
+    )
@@ -0,0 +1,152 @@
+"""
+Exportação individual com cache do arquivo renderizado e ETag.
+
+A impressão digital de uma exportação é o hash dos valores que vão para as
+células + o hash do modelo .xlsx + o motor usado. Se nada disso mudou, o
+arquivo é o mesmo: o navegador recebe 304 quando manda o ETag de volta, e
+os demais usuários recebem o arquivo pré-renderizado (se houver) ou os
+bytes guardados no cache de exportações.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from .coalescencia import executar_uma_vez
+from .excel import CONTENT_TYPE_XLSX, MOTOR_ZIP, renderizar_em_spool, resposta_xlsx
+from .limites import admitir_exportacao
+from .mapeamentos import mapeamento_para
+from .modelos_excel import hash_modelo
+from .pre_render import arquivo_pre_renderizado, caminho_relativo
+
+logger = logging.getLogger(__name__)
+
+
+def _cache():
+    return caches[getattr(settings, "RH_EXPORT_CACHE_ALIAS", "exportacoes")]
+
+
+def chave_cache(obj):
+    return f"rh:exportacao:{obj._meta.model_name}:{obj.pk}"
+
+
+def impressao_digital(mapeamento, valores, motor=None):
+    motor = motor or getattr(settings, "RH_EXCEL_MOTOR", MOTOR_ZIP)
+    conteudo = json.dumps(valores, sort_keys=True, default=str, ensure_ascii=False)
+    hash_ = hashlib.sha256()
+    for parte in (mapeamento.nome, hash_modelo(mapeamento.modelo_path), motor, conteudo):
+        hash_.update(parte.encode("utf-8"))
+        hash_.update(b"\0")
+    return hash_.hexdigest()
+
+
+def invalidar_exportacao(obj):
+    _cache().delete(chave_cache(obj))
+
+
+def invalidar_exportacoes(objs):
+    """Mesmo que ``invalidar_exportacao`` para vários registros, num único delete_many."""
+    _cache().delete_many([chave_cache(obj) for obj in objs])
+
+
+def obter_arquivo(obj, mapeamento, valores, digital):
+    """
+    Arquivo .xlsx pronto para leitura: do cache se a impressão digital bater,
+    senão renderizado em spool (e guardado no cache se for pequeno o bastante).
+
+    Requisições simultâneas para a mesma digital são coalescidas: só a
+    primeira renderiza e as outras reaproveitam os bytes. Arquivos grandes
+    demais para o cache não são compartilhados; quem esperou renderiza o seu.
+    """
+    cache = _cache()
+    chave = chave_cache(obj)
+    limite = getattr(settings, "RH_EXPORT_CACHE_ITEM_MAX_BYTES", 2 * 1024 * 1024)
+
+    def buscar():
+        guardado = cache.get(chave)
+        if guardado is not None and guardado[0] == digital:
+            return guardado[1]
+        return None
+
+    conteudo = buscar()
+    if conteudo is not None:
+        return io.BytesIO(conteudo)
+
+    arquivo_lider = None
+
+    def renderizar():
+        nonlocal arquivo_lider
+        arquivo = renderizar_em_spool(mapeamento.modelo_path, valores)
+        tamanho = arquivo.seek(0, os.SEEK_END)
+        arquivo.seek(0)
+        if tamanho > limite:
+            arquivo_lider = arquivo
+            return None
+        conteudo = arquivo.read()
+        arquivo.close()
+        cache.set(chave, (digital, conteudo))
+        return conteudo
+
+    conteudo = executar_uma_vez(f"{chave}:{digital}", renderizar, buscar)
+    if arquivo_lider is not None:
+        return arquivo_lider
+    if conteudo is None:
+        return renderizar_em_spool(mapeamento.modelo_path, valores)
+    return io.BytesIO(conteudo)
+
+
+def resposta_sendfile(caminho, nome_arquivo):
+    """
+    Deixa o proxy da frente (nginx/Apache) enviar o arquivo do disco.
+    Retorna None quando o offload não está configurado.
+    """
+    cabecalho = getattr(settings, "RH_EXPORT_SENDFILE", "")
+    if not cabecalho:
+        return None
+    response = HttpResponse(content_type=CONTENT_TYPE_XLSX)
+    if cabecalho == "X-Accel-Redirect":
+        # nginx: caminho de uma location "internal" que aponta para a pasta de pré-render.
+        prefixo = getattr(settings, "RH_EXPORT_SENDFILE_PREFIXO", "/exportacoes-internas/")
+        response[cabecalho] = prefixo.rstrip("/") + "/" + caminho_relativo(caminho)
+    else:
+        response[cabecalho] = caminho
+    response["Content-Disposition"] = f'attachment; filename="{nome_arquivo}"'
+    return response
+
+
+def responder_exportacao(request, obj):
+    """Resposta da exportação individual, com ETag e 304 para If-None-Match."""
+    mapeamento = mapeamento_para(obj)
+    valores = mapeamento.valores(obj)
+    digital = impressao_digital(mapeamento, valores)
+    etag = f'"{digital}"'
+
+    nao_modificado = get_conditional_response(request, etag=etag)
+    if nao_modificado is not None:
+        nao_modificado["ETag"] = etag
+        return nao_modificado
+
+    admitir_exportacao(request)
+    nome_arquivo = mapeamento.nome_arquivo(obj)
+    pre_renderizado = arquivo_pre_renderizado(digital)
+    response = None
+    if pre_renderizado:
+        response = resposta_sendfile(pre_renderizado, nome_arquivo)
+        if response is None:
+            try:
+                response = resposta_xlsx(open(pre_renderizado, "rb"), nome_arquivo)
+            except FileNotFoundError:
+                # Apagado pela limpeza (limpar_antigos) depois do exists: renderiza.
+                response = None
+    if response is None:
+        response = resposta_xlsx(obter_arquivo(obj, mapeamento, valores, digital), nome_arquivo)
+    response["ETag"] = etag
+    # Pode guardar, mas sempre revalida: os dados são sensíveis e mudam no admin.
+    response["Cache-Control"] = "private, no-cache"
+    return response
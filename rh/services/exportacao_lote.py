@@ -0,0 +1,82 @@
+import zipfile
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .mapeamentos import mapeamento_para
+from .render_paralelo import renderizar_lote
+
+TAMANHO_LOTE_CONSULTA = 200
+
+
+class _SaidaStreaming:
+    """Arquivo só de escrita que acumula os bytes até o próximo yield."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def esvaziar(self):
+        dados = b"".join(self._partes)
+        self._partes = []
+        return dados
+
+
+def _nome_unico(nome, usados):
+    if nome not in usados:
+        usados.add(nome)
+        return nome
+    base, extensao = nome.rsplit(".", 1)
+    contador = 2
+    while f"{base}_{contador}.{extensao}" in usados:
+        contador += 1
+    nome = f"{base}_{contador}.{extensao}"
+    usados.add(nome)
+    return nome
+
+
+def tarefas_de_registros(registros):
+    """Converte cada registro em (nome_arquivo, modelo_path, {celula: valor})."""
+    for obj in registros:
+        mapeamento = mapeamento_para(obj)
+        yield mapeamento.nome_arquivo(obj), mapeamento.modelo_path, mapeamento.valores(obj)
+
+
+def iterar_arquivos(registros):
+    """Gera (nome_arquivo, bytes_xlsx) para cada registro, na ordem do queryset."""
+    return renderizar_lote(tarefas_de_registros(registros))
+
+
+def gerar_zip(arquivos):
+    """
+    Monta o ZIP incrementalmente: a cada planilha adicionada, os bytes já
+    prontos são devolvidos, então a memória não cresce com o tamanho do lote.
+    """
+    saida = _SaidaStreaming()
+    usados = set()
+    data = timezone.localtime().timetuple()[:6]
+    # As planilhas já vêm comprimidas; comprimir de novo só gastaria CPU.
+    with zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_STORED) as zf:
+        for nome, conteudo in arquivos:
+            zf.writestr(zipfile.ZipInfo(_nome_unico(nome, usados), date_time=data), conteudo)
+            yield saida.esvaziar()
+    yield saida.esvaziar()
+
+
+def resposta_zip(arquivos, nome_arquivo):
+    """Resposta em streaming com os (nome, bytes) informados dentro de um ZIP."""
+    response = StreamingHttpResponse(gerar_zip(arquivos), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{nome_arquivo}"'
+    return response
+
+
+def exportar_lote_zip(queryset, nome_arquivo):
+    """Resposta em streaming com um .xlsx por registro do queryset."""
+    registros = queryset.select_related("criado_por").iterator(chunk_size=TAMANHO_LOTE_CONSULTA)
+    return resposta_zip(iterar_arquivos(registros), nome_arquivo)
@@ -0,0 +1,150 @@
+"""
+Contagens por faceta (status, área, cargo) ao lado dos filtros do changelist.
+
+Em vez de um ``GROUP BY`` na tabela inteira a cada página, ``ContagemFaceta``
+guarda quantos registros cada autor (``criado_por``) tem em cada valor. O
+total de um escopo de visibilidade é a soma das linhas dos autores visíveis:
+uma consulta numa tabela com poucas linhas por usuário.
+
+As contagens são do escopo inteiro do usuário, não dos filtros aplicados.
+São mantidas pelos signals (save/delete) e pela edição de status do
+changelist; ``update()``/``bulk_create`` não passam por eles, e o comando
+``reconciliar_facetas`` corrige o desvio.
+"""
+import logging
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from ..models import Admissao, ContagemFaceta, Desligamento, Distrato
+from .permission import papel_do_usuario
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_FACETAS = {
+    Desligamento: ("status", "area_atuacao"),
+    Admissao: ("status", "cargo"),
+    Distrato: ("status",),
+}
+
+
+def retrato(obj):
+    """
+    (autor, ((campo, valor), ...)) com os valores carregados no objeto, ou
+    ``None`` se algum estiver adiado (ler dispararia uma consulta).
+    """
+    campos = CAMPOS_FACETAS.get(type(obj), ())
+    dados = obj.__dict__
+    if "criado_por_id" not in dados or any(campo not in dados for campo in campos):
+        return None
+    return dados["criado_por_id"], tuple((campo, dados[campo] or "") for campo in campos)
+
+
+def retrato_gravado(obj):
+    """Retrato da linha como está no banco (antes do save); ``None`` se ainda não existe."""
+    if obj.pk is None:
+        return None
+    campos = CAMPOS_FACETAS.get(type(obj), ())
+    linha = type(obj)._base_manager.filter(pk=obj.pk).values_list("criado_por_id", *campos).first()
+    if linha is None:
+        return None
+    return linha[0], tuple((campo, valor or "") for campo, valor in zip(campos, linha[1:]))
+
+
+def _deltas(alteracoes):
+    deltas = Counter()
+    for antes, depois in alteracoes:
+        for foto, sinal in ((antes, -1), (depois, 1)):
+            # Sem autor o registro não é visível para ninguém: fica fora das contagens.
+            if foto is None or foto[0] is None:
+                continue
+            autor, valores = foto
+            for campo, valor in valores:
+                deltas[(autor, campo, valor)] += sinal
+    return {chave: delta for chave, delta in deltas.items() if delta}
+
+
+def atualizar_facetas(model, alteracoes):
+    """
+    Aplica as alterações [(retrato antes, retrato depois), ...] de registros
+    do modelo: um UPDATE ``total = total + delta`` por (autor, campo, valor).
+    """
+    modelo = model._meta.label_lower
+    for (autor, campo, valor), delta in _deltas(alteracoes).items():
+        linha = ContagemFaceta.objects.filter(modelo=modelo, criado_por_id=autor, campo=campo, valor=valor)
+        if linha.update(total=F("total") + delta):
+            continue
+        try:
+            with transaction.atomic():
+                ContagemFaceta.objects.create(modelo=modelo, criado_por_id=autor, campo=campo, valor=valor, total=delta)
+        except IntegrityError:
+            # Outro processo criou a linha entre o UPDATE e o INSERT.
+            linha.update(total=F("total") + delta)
+
+
+def contagens_facetas(user, model):
+    """
+    {campo: {valor: total}} no escopo de visibilidade do usuário. Guardado no
+    próprio usuário, como o Papel: os filtros da página consultam uma vez só.
+    """
+    memo = user.__dict__.setdefault("_rh_facetas", {})
+    modelo = model._meta.label_lower
+    if modelo not in memo:
+        linhas = ContagemFaceta.objects.filter(modelo=modelo)
+        ids = papel_do_usuario(user).ids_visiveis
+        if ids is not None:
+            linhas = linhas.filter(criado_por_id__in=sorted(ids))
+        contagens = {campo: {} for campo in CAMPOS_FACETAS.get(model, ())}
+        soma = linhas.values("campo", "valor").annotate(soma=Sum("total")).order_by()
+        for campo, valor, total in soma.values_list("campo", "valor", "soma"):
+            if total:
+                contagens.setdefault(campo, {})[valor] = total
+        memo[modelo] = contagens
+    return memo[modelo]
+
+
+# ==========================================================
+#   RECONCILIAÇÃO
+# ==========================================================
+def contagens_reais(model):
+    """{(autor, campo, valor): total} calculado com GROUP BY na tabela do formulário."""
+    reais = Counter()
+    registros = model._base_manager.filter(criado_por__isnull=False)
+    for campo in CAMPOS_FACETAS[model]:
+        grupos = registros.values("criado_por_id", campo).annotate(n=Count("pk")).order_by()
+        for autor, valor, total in grupos.values_list("criado_por_id", campo, "n"):
+            # None e "" contam no mesmo valor, como em retrato().
+            reais[(autor, campo, valor or "")] += total
+    return reais
+
+
+def reconciliar(model, corrigir=True):
+    """
+    Compara a tabela de contagens com a real. Retorna as divergências
+    [(autor, campo, valor, gravado, real), ...] e, se ``corrigir``, grava os
+    valores reais.
+    """
+    modelo = model._meta.label_lower
+    with transaction.atomic():
+        gravadas = {
+            (autor, campo, valor): total
+            for autor, campo, valor, total in ContagemFaceta.objects.filter(modelo=modelo)
+            .values_list("criado_por_id", "campo", "valor", "total")
+        }
+        reais = contagens_reais(model)
+        divergencias = [
+            (*chave, gravadas.get(chave, 0), reais.get(chave, 0))
+            for chave in sorted(set(gravadas) | set(reais), key=str)
+            if gravadas.get(chave, 0) != reais.get(chave, 0)
+        ]
+        if corrigir:
+            for autor, campo, valor, _, real in divergencias:
+                linha = dict(modelo=modelo, criado_por_id=autor, campo=campo, valor=valor)
+                if real:
+                    ContagemFaceta.objects.update_or_create(defaults={"total": real}, **linha)
+                else:
+                    ContagemFaceta.objects.filter(**linha).delete()
+    if divergencias:
+        logger.warning(f"Contagens de {modelo}: {len(divergencias)} divergência(s)")
+    return divergencias
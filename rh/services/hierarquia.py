@@ -0,0 +1,104 @@
+"""
+Hierarquia em vários níveis (gerente → coordenadores → supervisores...).
+
+A tabela Hierarquia guarda só as ligações diretas; HierarquiaFechamento guarda
+todos os pares ancestral/descendente, de modo que "todos abaixo de X" é uma
+única consulta pelo índice de ``ancestral``. A hierarquia é pequena e muda
+pouco, então cada alteração recalcula o fechamento inteiro em memória.
+"""
+import logging
+from collections import defaultdict, deque
+
+from django.db import transaction
+
+from ..models import Hierarquia, HierarquiaFechamento
+
+logger = logging.getLogger(__name__)
+
+
+def calcular_fechamento(arestas):
+    """{(ancestral, descendente): menor profundidade} a partir das ligações diretas."""
+    filhos = defaultdict(set)
+    for coordenador, supervisor in arestas:
+        filhos[coordenador].add(supervisor)
+
+    fechamento = {}
+    for raiz in list(filhos):
+        # Busca em largura: a primeira vez que um nó é visto é a menor distância.
+        fila = deque([(raiz, 0)])
+        vistos = {raiz}
+        while fila:
+            atual, profundidade = fila.popleft()
+            for filho in filhos.get(atual, ()):
+                if filho in vistos:
+                    continue
+                vistos.add(filho)
+                fechamento[(raiz, filho)] = profundidade + 1
+                fila.append((filho, profundidade + 1))
+    return fechamento
+
+
+def _arestas():
+    return Hierarquia.objects.values_list("coordenador_id", "supervisor_id")
+
+
+# Chave do advisory lock do Postgres que serializa as reconstruções.
+LOCK_FECHAMENTO = 0x7268_6671
+
+
+def _travar_reconstrucao():
+    # Duas reconstruções simultâneas intercalariam o delete e o bulk_create.
+    # No SQLite a escrita já é serializada pelo lock do banco.
+    connection = transaction.get_connection()
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [LOCK_FECHAMENTO])
+
+
+def reconstruir_fechamento():
+    """Regrava o fechamento a partir da Hierarquia. Retorna o número de pares."""
+    with transaction.atomic():
+        _travar_reconstrucao()
+        fechamento = calcular_fechamento(_arestas())
+        HierarquiaFechamento.objects.all().delete()
+        HierarquiaFechamento.objects.bulk_create(
+            HierarquiaFechamento(ancestral_id=a, descendente_id=d, profundidade=p)
+            for (a, d), p in fechamento.items()
+        )
+    logger.info(f"Fechamento da hierarquia reconstruído: {len(fechamento)} pares")
+    return len(fechamento)
+
+
+def ids_descendentes(user):
+    """Ids de todos os usuários abaixo de ``user``, em qualquer nível."""
+    return frozenset(
+        HierarquiaFechamento.objects.filter(ancestral=user).values_list("descendente_id", flat=True)
+    )
+
+
+def verificar_fechamento():
+    """Lista de inconsistências entre a Hierarquia e o fechamento gravado."""
+    arestas = list(_arestas())
+    esperado = calcular_fechamento(arestas)
+    gravado = {
+        (a, d): p
+        for a, d, p in HierarquiaFechamento.objects.values_list("ancestral_id", "descendente_id", "profundidade")
+    }
+
+    problemas = []
+    for par in sorted(esperado.keys() - gravado.keys()):
+        problemas.append(f"par ausente: {par[0]} → {par[1]}")
+    for par in sorted(gravado.keys() - esperado.keys()):
+        problemas.append(f"par sobrando: {par[0]} → {par[1]}")
+    for par in sorted(esperado.keys() & gravado.keys()):
+        if esperado[par] != gravado[par]:
+            problemas.append(f"profundidade errada em {par[0]} → {par[1]}: {gravado[par]} (esperado {esperado[par]})")
+
+    ciclos = set()
+    for coordenador, supervisor in arestas:
+        if coordenador == supervisor:
+            problemas.append(f"usuário {coordenador} subordinado a si mesmo")
+        elif (supervisor, coordenador) in esperado:
+            ciclos.add(tuple(sorted((coordenador, supervisor))))
+    problemas.extend(f"ciclo na hierarquia entre {a} e {b}" for a, b in sorted(ciclos))
+    return problemas
@@ -0,0 +1,217 @@
+"""
+Controle de admissão das exportações.
+
+Exportar é a operação mais pesada do admin; poucos usuários disparando
+exportações seguidas prendem os workers síncronos do gunicorn e deixam as
+demais telas sem resposta. Duas travas:
+
+- cota por usuário com capacidade e reposição por minuto configuráveis por
+  grupo (``RH_EXPORT_LIMITES``), no cache ``RH_EXPORT_LIMITE_CACHE_ALIAS``;
+- teto de exportações simultâneas por processo (``RH_EXPORT_MAX_SIMULTANEAS``).
+
+A cota se comporta como um token bucket, mas não guarda (fichas, horário):
+atualizar os dois juntos exigiria um compare-and-set que o cache do Django não
+tem. São contadores por janela de ``capacidade * 60 / por_minuto`` segundos,
+só com ``add``/``incr``/``decr`` (atômicos no Redis/Memcached), e a janela
+anterior entra com peso proporcional ao que falta dela ("janela deslizante").
+Ao contrário da janela fixa, não libera ``2 × capacidade`` na virada: a
+rajada máxima é ``capacidade`` e a reposição é linear, como no bucket. A
+estimativa supõe a janela anterior uniforme; o desvio fica abaixo de
+``capacidade`` por janela.
+
+As views decoradas com ``limitar_exportacao`` chamam ``admitir_exportacao``
+só quando o arquivo vai mesmo ser gerado (depois da permissão e do 304).
+Estourando qualquer trava, a view responde 429 com ``Retry-After``.
+"""
+import functools
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse
+
+from .permission import papel_do_usuario
+
+logger = logging.getLogger(__name__)
+
+_semaforos = {}
+_lock = threading.Lock()
+
+
+class ExportacaoRecusada(Exception):
+    def __init__(self, segundos, mensagem):
+        super().__init__(mensagem)
+        self.segundos = segundos
+
+
+def _cache():
+    """
+    Cache compartilhado das cotas, ou ``None`` (sem cota por usuário). Um
+    cache local do processo multiplicaria a cota pelo número de workers.
+    """
+    alias = getattr(settings, "RH_EXPORT_LIMITE_CACHE_ALIAS", "")
+    if not alias:
+        return None
+    cache = caches[alias]
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            f"RH_EXPORT_LIMITE_CACHE_ALIAS={alias!r} aponta para um cache local do processo; "
+            "use um cache compartilhado entre os workers (Redis, Memcached) ou deixe vazio."
+        )
+    return cache
+
+
+def grupo_do_usuario(user):
+    return papel_do_usuario(user).grupo
+
+
+def limite_do_usuario(user):
+    """(capacidade, reposição por minuto) da cota do usuário."""
+    limites = getattr(settings, "RH_EXPORT_LIMITES", {})
+    return limites.get(grupo_do_usuario(user)) or getattr(settings, "RH_EXPORT_LIMITE_PADRAO", (5, 5))
+
+
+def _incrementar(cache, chave, custo, timeout):
+    if cache.add(chave, custo, timeout=timeout):
+        return custo
+    try:
+        return cache.incr(chave, custo)
+    except ValueError:
+        # A chave expirou entre o add e o incr.
+        cache.add(chave, custo, timeout=timeout)
+        return custo
+
+
+def consumir(user, custo=1):
+    """Retira ``custo`` da cota do usuário. Retorna 0 ou os segundos até haver cota."""
+    cache = _cache()
+    if cache is None:
+        _avisar_sem_cota()
+        return 0
+    capacidade, por_minuto = limite_do_usuario(user)
+    janela = capacidade * 60 / por_minuto
+    agora = time.time()
+    numero, decorrido = divmod(agora, janela)
+    prefixo = f"rh:limite_exportacao:{user.pk}"
+    chave = f"{prefixo}:{int(numero)}"
+
+    # Incrementa antes de conferir: dois workers nunca leem o mesmo saldo.
+    # A chave vive duas janelas, para ainda pesar como "anterior".
+    atual = _incrementar(cache, chave, custo, math.ceil(2 * janela) + 1)
+    anterior = cache.get(f"{prefixo}:{int(numero) - 1}", 0)
+    peso = 1 - decorrido / janela
+    if anterior * peso + atual <= capacidade:
+        return 0
+
+    # Recusada não conta.
+    try:
+        cache.decr(chave, custo)
+    except ValueError:
+        pass
+    excesso = anterior * peso + atual - capacidade
+    if anterior and excesso / anterior * janela <= janela - decorrido:
+        # O peso da janela anterior cai ``anterior / janela`` por segundo.
+        return max(1, math.ceil(excesso / anterior * janela))
+    return max(1, math.ceil(janela - decorrido))
+
+
+_avisado = False
+
+
+def _avisar_sem_cota():
+    global _avisado
+    if not _avisado:
+        _avisado = True
+        logger.warning(
+            "RH_EXPORT_LIMITE_CACHE_ALIAS vazio: exportações sem cota por usuário, "
+            "só com o teto de simultâneas por processo"
+        )
+
+
+def verificar_configuracao(app_configs, **kwargs):
+    """System check: avisa no ``check``/``runserver``/``migrate`` quando a cota está desligada."""
+    if getattr(settings, "RH_EXPORT_LIMITE_CACHE_ALIAS", ""):
+        return []
+    return [checks.Warning(
+        "Exportações sem cota por usuário.",
+        hint="Defina RH_EXPORT_LIMITE_CACHE_ALIAS com um cache compartilhado (Redis, Memcached).",
+        id="rh.W001",
+    )]
+
+
+def _semaforo():
+    maximo = getattr(settings, "RH_EXPORT_MAX_SIMULTANEAS", 2)
+    with _lock:
+        if maximo not in _semaforos:
+            _semaforos[maximo] = threading.BoundedSemaphore(maximo)
+        return _semaforos[maximo]
+
+
+def resposta_limite(segundos, mensagem):
+    response = HttpResponse(mensagem, status=429, content_type="text/plain; charset=utf-8")
+    response["Retry-After"] = str(segundos)
+    return response
+
+
+def admitir_exportacao(request):
+    """
+    Ocupa uma vaga do processo e conta uma exportação do usuário. A view
+    chama quando o arquivo vai mesmo ser gerado; sem vaga ou sem cota,
+    ``limitar_exportacao`` responde 429.
+    """
+    if not hasattr(request, "_rh_vaga_exportacao"):
+        raise RuntimeError("admitir_exportacao() fora de uma view com @limitar_exportacao.")
+    if request._rh_vaga_exportacao is not None:
+        return
+
+    semaforo = _semaforo()
+    if not semaforo.acquire(blocking=False):
+        raise ExportacaoRecusada(
+            getattr(settings, "RH_EXPORT_RETRY_AFTER_OCUPADO", 5),
+            "O servidor já está gerando outras exportações. Tente de novo em instantes.",
+        )
+    # A vaga vem antes da cota: recusar por falta de vaga não gasta a cota.
+    espera = consumir(request.user)
+    if espera:
+        semaforo.release()
+        logger.warning(f"Exportação limitada para {request.user}: aguardar {espera}s")
+        raise ExportacaoRecusada(espera, f"Muitas exportações em sequência. Tente de novo em {espera} segundos.")
+    request._rh_vaga_exportacao = semaforo
+
+
+def limitar_exportacao(view):
+    """
+    Decorador para views e ações de exportação do admin
+    (métodos com assinatura ``(self, request, ...)``).
+    """
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        request._rh_vaga_exportacao = None
+        try:
+            response = view(self, request, *args, **kwargs)
+        except BaseException as erro:
+            semaforo = request.__dict__.pop("_rh_vaga_exportacao", None)
+            if semaforo is not None:
+                semaforo.release()
+            if isinstance(erro, ExportacaoRecusada):
+                return resposta_limite(erro.segundos, str(erro))
+            raise
+        semaforo = request.__dict__.pop("_rh_vaga_exportacao", None)
+        if semaforo is None:
+            return response
+        if getattr(response, "streaming", False) and not isinstance(response, FileResponse):
+            # ZIP/CSV são gerados enquanto a resposta é enviada: libera só no
+            # close() da resposta, como o FileResponse faz com o arquivo.
+            response._resource_closers.append(semaforo.release)
+        else:
+            semaforo.release()
+        return response
+
+    return wrapper
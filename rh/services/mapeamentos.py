@@ -0,0 +1,162 @@
+"""
+Mapeamento declarativo campo → célula dos formulários exportados.
+
+Cada formulário é descrito uma única vez como uma lista de ``Campo`` e
+compilado na importação do módulo para uma lista plana de
+``(celula, getter)``. Todos os motores de exportação (individual, em lote,
+streaming) usam ``Mapeamento.valores()``, de modo que preencher um registro
+custa apenas os acessos a atributo e a formatação de cada célula.
+"""
+from operator import attrgetter
+
+from .modelos_excel import MODELO_ADMISSAO, MODELO_DESLIGAMENTO, MODELO_DISTRATO
+
+
+# ==========================================================
+#   FORMATADORES
+# ==========================================================
+def texto(valor):
+    return valor or ""
+
+
+def data_br(valor):
+    return valor.strftime("%d/%m/%Y") if valor else ""
+
+
+def numero(valor):
+    return valor or 0
+
+
+def sim_nao(valor):
+    return "SIM" if valor else "NÃO"
+
+
+def sim_nao_titulo(valor):
+    return "Sim" if valor else "Não"
+
+
+class Campo:
+    def __init__(self, celula, campo, formatador=texto):
+        self.celula = celula
+        self.campo = campo
+        self.formatador = formatador
+
+
+def _compilar_getter(campo):
+    ler = attrgetter(campo.campo)
+    formatar = campo.formatador
+    return lambda obj: formatar(ler(obj))
+
+
+class Mapeamento:
+    def __init__(self, nome, modelo_path, campos, campo_arquivo="codigo"):
+        self.nome = nome
+        self.modelo_path = modelo_path
+        self.campos = tuple(campos)
+        self.campo_arquivo = campo_arquivo
+
+        celulas = [campo.celula for campo in self.campos]
+        if len(celulas) != len(set(celulas)):
+            raise ValueError(f"Mapeamento '{nome}' escreve mais de uma vez na mesma célula.")
+        self.compilado = tuple((campo.celula, _compilar_getter(campo)) for campo in self.campos)
+
+    def valores(self, obj):
+        """Retorna {celula: valor} já formatado para o registro."""
+        return {celula: getter(obj) for celula, getter in self.compilado}
+
+    def nome_arquivo(self, obj):
+        return f"{self.nome}_{getattr(obj, self.campo_arquivo)}.xlsx"
+
+
+# ==========================================================
+#                DESLIGAMENTO DO VENDEDOR
+# ==========================================================
+ITENS_DESLIGAMENTO = (
+    "fardamento", "chip_voz", "chip_dados", "tablet",
+    "carregador_tablet", "fone_tablet", "catalogo",
+    "bloco_pedido", "carta_pedido_demissao", "relatorio_inadimplencia",
+)
+
+MAPEAMENTO_DESLIGAMENTO = Mapeamento("desligamento", MODELO_DESLIGAMENTO, [
+    Campo("B3", "supervisor"),
+    Campo("E3", "demissao", data_br),
+
+    Campo("A6", "codigo"),
+    Campo("B6", "nome"),
+    Campo("C6", "contato"),
+    Campo("D6", "admissao", data_br),
+    Campo("E6", "demissao", data_br),
+    Campo("F6", "area_atuacao"),
+
+    Campo("C7", "motivo"),
+
+    *(Campo(f"A{linha}", item, sim_nao) for linha, item in enumerate(ITENS_DESLIGAMENTO, start=10)),
+
+    Campo("E22", "substituto", sim_nao),
+    Campo("E23", "telemarketing", sim_nao),
+    Campo("E24", "nova_contratacao", sim_nao),
+])
+
+
+# ==========================================================
+#                    ADMISSÃO DO VENDEDOR
+# ==========================================================
+MAPEAMENTO_ADMISSAO = Mapeamento("admissao", MODELO_ADMISSAO, [
+    Campo("G3", "codigo"),
+    Campo("B6", "nome"),
+    Campo("B7", "nascimento", data_br),
+    Campo("E7", "naturalidade"),
+    Campo("B8", "mae"),
+    Campo("B9", "pai"),
+    Campo("B10", "endereco"),
+    Campo("B11", "bairro"),
+    Campo("F11", "cep"),
+    Campo("B12", "cidade"),
+    Campo("B13", "fone"),
+    Campo("E13", "email"),
+    Campo("B14", "rg"),
+    Campo("E14", "orgao_exp"),
+    Campo("G14", "emissao", data_br),
+    Campo("B15", "cpf"),
+    Campo("B16", "agencia"),
+    Campo("E16", "conta"),
+    Campo("G16", "operacao"),
+    Campo("B18", "data_admissao", data_br),
+    Campo("D18", "cargo"),
+    Campo("F18", "substituicao", sim_nao_titulo),
+    Campo("C19", "supervisor_responsavel"),
+    Campo("F19", "coordenador"),
+    Campo("B20", "conta_gov"),
+    Campo("D20", "senha_gov"),
+])
+
+
+# ==========================================================
+#               DISTRATO DO RCA
+# ==========================================================
+MAPEAMENTO_DISTRATO = Mapeamento("distrato", MODELO_DISTRATO, [
+    Campo("B5", "nome"),
+    Campo("E5", "cpf"),
+    Campo("F5", "rg"),
+    Campo("B10", "data_admissao", data_br),
+    Campo("C10", "data_demissao", data_br),
+    Campo("B13", "total_geral", numero),
+    Campo("B16", "total_ultimos_3_meses", numero),
+    Campo("C23", "banco"),
+    Campo("C24", "agencia"),
+    Campo("C25", "operacao"),
+    Campo("C26", "conta_corrente"),
+    Campo("C27", "titular"),
+    Campo("C28", "telefone"),
+], campo_arquivo="id")
+
+
+MAPEAMENTOS = {
+    mapeamento.nome: mapeamento
+    for mapeamento in (MAPEAMENTO_DESLIGAMENTO, MAPEAMENTO_ADMISSAO, MAPEAMENTO_DISTRATO)
+}
+
+
+def mapeamento_para(obj):
+    """Mapeamento do registro (ou classe de modelo) informado."""
+    return MAPEAMENTOS[obj._meta.model_name]
@@ -0,0 +1,177 @@
+import hashlib
+import io
+import logging
+import os
+import pickle
+import threading
+
+from django.conf import settings
+from openpyxl import load_workbook
+
+from .xlsx_zip import PacoteXlsx
+
+logger = logging.getLogger(__name__)
+
+PASTA_MODELOS = os.path.join(os.path.dirname(__file__), "..")
+
+MODELO_DESLIGAMENTO = os.path.join(PASTA_MODELOS, "FORMULÁRIO DESLIGAMENTO RCA.xlsx")
+MODELO_ADMISSAO = os.path.join(PASTA_MODELOS, "FORMULÁRIO ADMISSAO RCA.xlsx")
+MODELO_DISTRATO = os.path.join(PASTA_MODELOS, "FORMULÁRIO DISTRATO RCA.xlsx")
+
+MODELOS_PADRAO = (MODELO_DESLIGAMENTO, MODELO_ADMISSAO, MODELO_DISTRATO)
+
+# Gerado pelo comando otimizar_modelos ao lado do original; tem preferência
+# enquanto o sha256 do original bater com o gravado em <otimizado>.origem.
+SUFIXO_OTIMIZADO = ".otimizado.xlsx"
+SUFIXO_ORIGEM = ".origem"
+
+
+class ModeloCarregado:
+    """Modelo em memória: bytes do arquivo, workbook serializado e pacote zip."""
+
+    def __init__(self, caminho, assinatura, hash_conteudo, conteudo):
+        self.caminho = caminho
+        self.assinatura = assinatura
+        self.hash = hash_conteudo
+        self.conteudo = conteudo
+        self._workbook_serializado = None
+        self._pacote = None
+
+    def novo_workbook(self):
+        if self._workbook_serializado is None:
+            wb = load_workbook(io.BytesIO(self.conteudo))
+            self._workbook_serializado = pickle.dumps(wb, protocol=pickle.HIGHEST_PROTOCOL)
+        # Desserializar é bem mais barato que rodar load_workbook() de novo,
+        # e cada requisição recebe uma cópia independente para preencher.
+        return pickle.loads(self._workbook_serializado)
+
+    def pacote_xlsx(self):
+        if self._pacote is None:
+            self._pacote = PacoteXlsx(self.conteudo)
+        return self._pacote
+
+
+_modelos = {}
+_verificacoes = {}
+_lock = threading.Lock()
+
+
+def caminho_otimizado(caminho):
+    return os.path.splitext(caminho)[0] + SUFIXO_OTIMIZADO
+
+
+def caminho_origem(otimizado):
+    return otimizado + SUFIXO_ORIGEM
+
+
+def hash_arquivo(caminho):
+    with open(caminho, "rb") as arquivo:
+        return hashlib.sha256(arquivo.read()).hexdigest()
+
+
+def _assinatura(arquivo):
+    stat = os.stat(arquivo)
+    return arquivo, stat.st_mtime_ns, stat.st_size
+
+
+def _otimizado_atual(caminho, otimizado):
+    """O otimizado foi gerado a partir do original como está agora?"""
+    origem = caminho_origem(otimizado)
+    try:
+        chave = (_assinatura(caminho), _assinatura(origem))
+    except FileNotFoundError:
+        chave = (_assinatura(caminho), None)
+    # Só relê e recalcula o hash quando o original ou o .origem mudam.
+    memo = _verificacoes.get(otimizado)
+    if memo is not None and memo[0] == chave:
+        return memo[1]
+
+    atual = False
+    if chave[1] is not None:
+        with open(origem, encoding="utf-8") as arquivo:
+            atual = arquivo.read().strip() == hash_arquivo(caminho)
+    if not atual:
+        logger.warning(
+            f"{os.path.basename(otimizado)} não corresponde ao {os.path.basename(caminho)} atual; "
+            "usando o original até rodar otimizar_modelos de novo"
+        )
+    _verificacoes[otimizado] = (chave, atual)
+    return atual
+
+
+def _arquivo_efetivo(caminho):
+    otimizado = caminho_otimizado(caminho)
+    if os.path.exists(otimizado) and _otimizado_atual(caminho, otimizado):
+        return otimizado
+    return caminho
+
+
+def _carregar(caminho, assinatura):
+    with open(assinatura[0], "rb") as arquivo:
+        conteudo = arquivo.read()
+    hash_conteudo = hashlib.sha256(conteudo).hexdigest()
+
+    anterior = _modelos.get(caminho)
+    if anterior is not None and anterior.hash == hash_conteudo:
+        # Arquivo apenas "tocado" (mtime mudou, conteúdo igual): reaproveita o parse.
+        anterior.assinatura = assinatura
+        return anterior
+
+    modelo = ModeloCarregado(caminho, assinatura, hash_conteudo, conteudo)
+    logger.info(f"Modelo Excel carregado: {os.path.basename(assinatura[0])} ({hash_conteudo[:12]})")
+    return modelo
+
+
+def obter_modelo(caminho):
+    """
+    Retorna o modelo carregado, recarregando se o arquivo mudou em disco.
+    Se existir a versão otimizada do modelo, é ela que é carregada.
+    """
+    caminho = os.path.normpath(caminho)
+    assinatura = _assinatura(_arquivo_efetivo(caminho))
+
+    modelo = _modelos.get(caminho)
+    if modelo is not None and modelo.assinatura == assinatura:
+        return modelo
+
+    with _lock:
+        modelo = _modelos.get(caminho)
+        if modelo is None or modelo.assinatura != assinatura:
+            modelo = _carregar(caminho, assinatura)
+            _modelos[caminho] = modelo
+    return modelo
+
+
+def obter_workbook(caminho):
+    """Cópia nova do workbook do modelo, pronta para ser preenchida."""
+    return obter_modelo(caminho).novo_workbook()
+
+
+def hash_modelo(caminho):
+    return obter_modelo(caminho).hash
+
+
+def aquecer_modelos(caminhos=MODELOS_PADRAO, motor=None):
+    """
+    Carrega os modelos antecipadamente (ex.: na subida do worker), preparando
+    só o que o motor configurado usa.
+    """
+    # excel.py importa este módulo.
+    from .excel import MOTOR_OPENPYXL, MOTOR_ZIP
+
+    motor = motor or getattr(settings, "RH_EXCEL_MOTOR", MOTOR_ZIP)
+    for caminho in caminhos:
+        try:
+            modelo = obter_modelo(caminho)
+            if motor == MOTOR_OPENPYXL:
+                modelo.novo_workbook()
+            else:
+                modelo.pacote_xlsx()
+        except Exception as e:
+            logger.error(f"Erro ao aquecer modelo {caminho}: {e}")
+
+
+def limpar_cache_modelos():
+    with _lock:
+        _modelos.clear()
+        _verificacoes.clear()
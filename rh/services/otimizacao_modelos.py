@@ -0,0 +1,427 @@
+"""
+Otimização dos modelos .xlsx dos formulários.
+
+Trabalha direto no pacote zip, como o ``xlsx_zip``: o openpyxl descartaria
+imagens e partes que não conhece. O otimizador remove planilhas vazias,
+nomes definidos que nenhuma fórmula usa e estilos de célula (``cellXfs``)
+sem referência, e recomprime a mídia sem perda: metadados de JPEG/PNG
+(EXIF, XMP, Photoshop) e o IDAT dos PNG. O perfil de cor ICC é mantido: sem
+ele as cores do logo (CMYK) mudam; removê-lo é opcional (``remover_icc``).
+Partes XML são recomprimidas com deflate nível 9.
+
+O resultado é verificado antes de ser gravado: os mapeamentos que usam o
+modelo são preenchidos com registros sintéticos nos dois motores, com o
+modelo original e com o otimizado, e as células mapeadas precisam sair com o
+mesmo valor e o mesmo estilo.
+"""
+import io
+import posixpath
+import re
+import struct
+import zipfile
+import zlib
+
+from openpyxl import load_workbook
+
+from .xlsx_zip import PacoteXlsx, _atributos
+
+_TIPO_PLANILHA = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+_TIPO_IMPRESSORA = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/printerSettings"
+
+_RE_SHEET = re.compile(r"<sheet\b[^>]*/>")
+_RE_NOME_DEFINIDO = re.compile(r"<definedName\b([^>]*)>(.*?)</definedName>", re.S)
+_RE_FORMULA = re.compile(r"<(?:\w+:)?(?:f|formula|formula1|formula2)\b[^>]*>(.*?)</(?:\w+:)?(?:f|formula|formula1|formula2)>", re.S)
+_RE_XF = re.compile(r"<xf\b[^>]*?(?:/>|>.*?</xf>)", re.S)
+_RE_ESTILO_CELULA = re.compile(r'(<(?:c|row)\b[^>]*?\bs=")(\d+)(")')
+_RE_ESTILO_COLUNA = re.compile(r'(<col\b[^>]*?\bstyle=")(\d+)(")')
+
+# Segmentos JPEG que são só metadados: APP1 (EXIF/XMP), APP13 (Photoshop), COM.
+# APP0 (JFIF) e APP14 (Adobe) ficam: definem como interpretar as cores.
+_JPEG_METADADOS = {0xE1, 0xED, 0xFE}
+_JPEG_ICC = 0xE2
+_PNG_METADADOS = {b"tEXt", b"zTXt", b"iTXt", b"tIME", b"eXIf"}
+_PNG_ICC = b"iCCP"
+
+_EXTENSOES_COMPRIMIDAS = (".jpg", ".jpeg", ".png", ".gif", ".emf.gz")
+
+
+class ErroOtimizacao(Exception):
+    """O modelo otimizado não preencheu igual ao original."""
+
+
+class RelatorioOtimizacao:
+    def __init__(self, tamanho_original):
+        self.tamanho_original = tamanho_original
+        self.tamanho_otimizado = tamanho_original
+        self.planilhas_removidas = []
+        self.nomes_removidos = []
+        self.estilos_removidos = 0
+        self.midia = []  # (parte, bytes antes, bytes depois)
+
+    def como_dict(self):
+        return {
+            "tamanho_original": self.tamanho_original,
+            "tamanho_otimizado": self.tamanho_otimizado,
+            "planilhas_removidas": self.planilhas_removidas,
+            "nomes_removidos": self.nomes_removidos,
+            "estilos_removidos": self.estilos_removidos,
+            "midia": [{"parte": p, "antes": a, "depois": d} for p, a, d in self.midia],
+        }
+
+
+def _caminho_relacao(origem, alvo):
+    """Resolve o Target de um .rels relativo à parte de origem."""
+    if alvo.startswith("/"):
+        return alvo[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(origem), alvo))
+
+
+def _arquivo_rels(parte):
+    pasta, nome = posixpath.split(parte)
+    return posixpath.join(pasta, "_rels", nome + ".rels")
+
+
+def _relacoes(partes, parte):
+    """{Id: (Type, caminho)} das relações de ``parte``."""
+    rels = partes.get(_arquivo_rels(parte))
+    if rels is None:
+        return {}
+    relacoes = {}
+    for rel in re.findall(r"<Relationship\b[^>]*>", rels.decode("utf-8")):
+        atributos = _atributos(rel)
+        if atributos.get("TargetMode") == "External":
+            continue
+        relacoes[atributos["Id"]] = (atributos["Type"], _caminho_relacao(parte, atributos["Target"]))
+    return relacoes
+
+
+class _Pacote:
+    """Partes do .xlsx descomprimidas, na ordem original."""
+
+    def __init__(self, conteudo):
+        zin = zipfile.ZipFile(io.BytesIO(conteudo))
+        self.infos = {info.filename: info for info in zin.infolist()}
+        self.partes = {info.filename: zin.read(info) for info in zin.infolist()}
+
+    def texto(self, parte):
+        return self.partes[parte].decode("utf-8")
+
+    def gravar_texto(self, parte, texto):
+        self.partes[parte] = texto.encode("utf-8")
+
+    def remover(self, parte):
+        self.partes.pop(parte, None)
+        self.partes.pop(_arquivo_rels(parte), None)
+        tipos = self.texto("[Content_Types].xml")
+        tipos = re.sub(rf'<Override\b[^>]*PartName="/{re.escape(parte)}"[^>]*/>', "", tipos)
+        self.gravar_texto("[Content_Types].xml", tipos)
+
+    def planilhas(self):
+        """[(tag <sheet>, nome, r:id, caminho)] na ordem das abas."""
+        relacoes = _relacoes(self.partes, "xl/workbook.xml")
+        planilhas = []
+        for tag in _RE_SHEET.findall(self.texto("xl/workbook.xml")):
+            atributos = _atributos(tag)
+            tipo, caminho = relacoes.get(atributos["r:id"], (None, None))
+            planilhas.append((tag, atributos["name"], atributos["r:id"], caminho if tipo == _TIPO_PLANILHA else None))
+        return planilhas
+
+    def xml_planilhas(self):
+        return [self.texto(caminho) for *_, caminho in self.planilhas() if caminho in self.partes]
+
+    def serializar(self):
+        saida = io.BytesIO()
+        with zipfile.ZipFile(saida, "w") as zout:
+            for parte, dados in self.partes.items():
+                original = self.infos.get(parte)
+                info = zipfile.ZipInfo(parte, date_time=original.date_time if original else (1980, 1, 1, 0, 0, 0))
+                if parte.lower().endswith(_EXTENSOES_COMPRIMIDAS):
+                    info.compress_type = zipfile.ZIP_STORED
+                    zout.writestr(info, dados)
+                else:
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    zout.writestr(info, dados, compresslevel=9)
+        return saida.getvalue()
+
+
+# ==========================================================
+#   PLANILHAS VAZIAS
+# ==========================================================
+def _planilha_vazia(pacote, caminho):
+    xml = pacote.texto(caminho)
+    if "<row" in xml:
+        return False
+    if re.search(r"<(?:drawing|legacyDrawing|legacyDrawingHF|tablePart|oleObject|control|mergeCell|hyperlink)\b", xml):
+        return False
+    # Relações além das configurações de impressora (comentários, desenhos...).
+    return all(tipo == _TIPO_IMPRESSORA for tipo, _ in _relacoes(pacote.partes, caminho).values())
+
+
+def _nome_citado(nome_planilha, textos):
+    padrao = re.compile(rf"(?<![\w.])(?:'{re.escape(nome_planilha)}'|{re.escape(nome_planilha)})!", re.I)
+    return any(padrao.search(texto) for texto in textos)
+
+
+def _reindexar(indice, removidos):
+    return indice - sum(1 for r in removidos if r < indice)
+
+
+def remover_planilhas_vazias(pacote, relatorio):
+    planilhas = pacote.planilhas()
+    formulas = [f for xml in pacote.xml_planilhas() for f in _RE_FORMULA.findall(xml)]
+    formulas += [valor for _, valor in _RE_NOME_DEFINIDO.findall(pacote.texto("xl/workbook.xml"))]
+
+    removidos = [
+        i for i, (_, nome, _, caminho) in enumerate(planilhas)
+        if caminho and _planilha_vazia(pacote, caminho) and not _nome_citado(nome, formulas)
+    ]
+    if len(removidos) == len(planilhas):
+        removidos = removidos[1:]  # um workbook precisa de ao menos uma aba
+    if not removidos:
+        return
+
+    workbook = pacote.texto("xl/workbook.xml")
+    rels_workbook = pacote.texto("xl/_rels/workbook.xml.rels")
+    for i in removidos:
+        tag, nome, rid, caminho = planilhas[i]
+        workbook = workbook.replace(tag, "", 1)
+        rels_workbook = re.sub(rf'<Relationship\b[^>]*\bId="{rid}"[^>]*/>', "", rels_workbook)
+        for tipo, alvo in _relacoes(pacote.partes, caminho).values():
+            if tipo == _TIPO_IMPRESSORA:
+                pacote.remover(alvo)
+        pacote.remover(caminho)
+        relatorio.planilhas_removidas.append(nome)
+
+    def ajustar_aba(match):
+        indice = int(match.group(2))
+        novo = 0 if indice in removidos else _reindexar(indice, removidos)
+        return f'{match.group(1)}"{novo}"'
+
+    workbook = re.sub(r'(\b(?:activeTab|firstSheet)=)"(\d+)"', ajustar_aba, workbook)
+
+    def ajustar_nome(match):
+        atributos = _atributos(match.group(1))
+        if "localSheetId" not in atributos:
+            return match.group(0)
+        indice = int(atributos["localSheetId"])
+        if indice in removidos:
+            relatorio.nomes_removidos.append(atributos["name"])
+            return ""
+        return match.group(0).replace(f'localSheetId="{indice}"', f'localSheetId="{_reindexar(indice, removidos)}"', 1)
+
+    workbook = _RE_NOME_DEFINIDO.sub(ajustar_nome, workbook)
+    workbook = re.sub(r"<definedNames>\s*</definedNames>", "", workbook)
+    pacote.gravar_texto("xl/workbook.xml", workbook)
+    pacote.gravar_texto("xl/_rels/workbook.xml.rels", rels_workbook)
+
+    # A lista de abas do docProps/app.xml é opcional e o Excel a refaz ao salvar.
+    if "docProps/app.xml" in pacote.partes:
+        app = pacote.texto("docProps/app.xml")
+        app = re.sub(r"<HeadingPairs>.*?</HeadingPairs>|<TitlesOfParts>.*?</TitlesOfParts>", "", app, flags=re.S)
+        pacote.gravar_texto("docProps/app.xml", app)
+
+
+# ==========================================================
+#   NOMES DEFINIDOS SEM USO
+# ==========================================================
+def remover_nomes_sem_uso(pacote, relatorio):
+    workbook = pacote.texto("xl/workbook.xml")
+    nomes = _RE_NOME_DEFINIDO.findall(workbook)
+    if not nomes:
+        return
+
+    textos = [f for xml in pacote.xml_planilhas() for f in _RE_FORMULA.findall(xml)]
+    textos += [pacote.texto(p) for p in pacote.partes if p.startswith("xl/charts/") and p.endswith(".xml")]
+
+    # Busca conservadora: citar o nome até dentro de uma string já o mantém.
+    textos += [valor for _, valor in nomes]
+
+    def em_uso(nome):
+        padrao = re.compile(rf"(?<![\w.]){re.escape(nome)}(?![\w.])", re.I)
+        return any(padrao.search(texto) for texto in textos)
+
+    def substituir(match):
+        nome = _atributos(match.group(1))["name"]
+        # Nomes internos do Excel (área de impressão, funções novas...) ficam.
+        if nome.startswith(("_xlnm.", "_xlfn.", "_xlpm.")):
+            return match.group(0)
+        if "#REF!" in match.group(2) or not em_uso(nome):
+            relatorio.nomes_removidos.append(nome)
+            return ""
+        return match.group(0)
+
+    workbook = _RE_NOME_DEFINIDO.sub(substituir, workbook)
+    workbook = re.sub(r"<definedNames>\s*</definedNames>", "", workbook)
+    pacote.gravar_texto("xl/workbook.xml", workbook)
+
+
+# ==========================================================
+#   ESTILOS DE CÉLULA SEM USO
+# ==========================================================
+def remover_estilos_sem_uso(pacote, relatorio):
+    if "xl/styles.xml" not in pacote.partes:
+        return
+    estilos = pacote.texto("xl/styles.xml")
+    bloco = re.search(r"(<cellXfs\b[^>]*>)(.*?)(</cellXfs>)", estilos, re.S)
+    if bloco is None:
+        return
+    xfs = _RE_XF.findall(bloco.group(2))
+
+    caminhos = [caminho for *_, caminho in pacote.planilhas() if caminho in pacote.partes]
+    usados = {0}
+    for caminho in caminhos:
+        xml = pacote.texto(caminho)
+        usados.update(int(m.group(2)) for m in _RE_ESTILO_CELULA.finditer(xml))
+        usados.update(int(m.group(2)) for m in _RE_ESTILO_COLUNA.finditer(xml))
+    usados = sorted(i for i in usados if i < len(xfs))
+    if len(usados) == len(xfs):
+        return
+
+    novo_indice = {antigo: novo for novo, antigo in enumerate(usados)}
+    abertura = re.sub(r'\bcount="\d+"', f'count="{len(usados)}"', bloco.group(1))
+    estilos = (
+        estilos[:bloco.start()] + abertura + "".join(xfs[i] for i in usados)
+        + bloco.group(3) + estilos[bloco.end():]
+    )
+    pacote.gravar_texto("xl/styles.xml", estilos)
+
+    def renumerar(match):
+        return match.group(1) + str(novo_indice.get(int(match.group(2)), 0)) + match.group(3)
+
+    for caminho in caminhos:
+        xml = _RE_ESTILO_CELULA.sub(renumerar, pacote.texto(caminho))
+        pacote.gravar_texto(caminho, _RE_ESTILO_COLUNA.sub(renumerar, xml))
+    relatorio.estilos_removidos = len(xfs) - len(usados)
+
+
+# ==========================================================
+#   MÍDIA
+# ==========================================================
+def _jpeg_sem_metadados(dados, remover_icc):
+    if dados[:2] != b"\xff\xd8":
+        return dados
+    saida = [dados[:2]]
+    i = 2
+    while i + 4 <= len(dados):
+        if dados[i] != 0xFF:
+            return dados  # estrutura inesperada: não mexe
+        marcador = dados[i + 1]
+        if marcador == 0xDA:  # início dos dados da imagem: copia o resto
+            saida.append(dados[i:])
+            return b"".join(saida)
+        tamanho = struct.unpack(">H", dados[i + 2:i + 4])[0]
+        segmento = dados[i:i + 2 + tamanho]
+        descartar = marcador in _JPEG_METADADOS or (marcador == _JPEG_ICC and remover_icc)
+        if not descartar:
+            saida.append(segmento)
+        i += 2 + tamanho
+    return dados
+
+
+def _png_sem_metadados(dados, remover_icc):
+    assinatura = b"\x89PNG\r\n\x1a\n"
+    if not dados.startswith(assinatura):
+        return dados
+    pedacos = []
+    idat = []
+    i = len(assinatura)
+    while i + 8 <= len(dados):
+        tamanho, tipo = struct.unpack(">I4s", dados[i:i + 8])
+        corpo = dados[i + 8:i + 8 + tamanho]
+        i += 12 + tamanho
+        if tipo == b"IDAT":
+            idat.append(corpo)
+            if pedacos and pedacos[-1] is not None:
+                pedacos.append(None)  # posição do IDAT
+            continue
+        if tipo in _PNG_METADADOS or (tipo == _PNG_ICC and remover_icc):
+            continue
+        pedacos.append((tipo, corpo))
+
+    comprimido = b"".join(idat)
+    recomprimido = zlib.compress(zlib.decompress(comprimido), 9)
+    if len(recomprimido) < len(comprimido):
+        comprimido = recomprimido
+
+    def chunk(tipo, corpo):
+        return struct.pack(">I4s", len(corpo), tipo) + corpo + struct.pack(">I", zlib.crc32(tipo + corpo))
+
+    saida = [assinatura]
+    for pedaco in pedacos:
+        saida.append(chunk(b"IDAT", comprimido) if pedaco is None else chunk(*pedaco))
+    return b"".join(saida)
+
+
+def recomprimir_midia(pacote, relatorio, remover_icc=False):
+    for parte in [p for p in pacote.partes if p.startswith("xl/media/")]:
+        dados = pacote.partes[parte]
+        extensao = posixpath.splitext(parte)[1].lower()
+        try:
+            if extensao in (".jpg", ".jpeg"):
+                novo = _jpeg_sem_metadados(dados, remover_icc)
+            elif extensao == ".png":
+                novo = _png_sem_metadados(dados, remover_icc)
+            else:
+                continue
+        except (struct.error, zlib.error):
+            continue
+        if len(novo) < len(dados):
+            pacote.partes[parte] = novo
+            relatorio.midia.append((parte, len(dados), len(novo)))
+
+
+# ==========================================================
+#   OTIMIZAÇÃO E VERIFICAÇÃO
+# ==========================================================
+def otimizar(conteudo, remover_icc=False):
+    """Retorna (bytes do modelo otimizado, RelatorioOtimizacao)."""
+    relatorio = RelatorioOtimizacao(len(conteudo))
+    pacote = _Pacote(conteudo)
+    remover_planilhas_vazias(pacote, relatorio)
+    remover_nomes_sem_uso(pacote, relatorio)
+    remover_estilos_sem_uso(pacote, relatorio)
+    recomprimir_midia(pacote, relatorio, remover_icc)
+    otimizado = pacote.serializar()
+    relatorio.tamanho_otimizado = len(otimizado)
+    return otimizado, relatorio
+
+
+def _estilo(celula):
+    return tuple(repr(getattr(celula, atributo)) for atributo in (
+        "font", "fill", "border", "alignment", "number_format", "protection",
+    ))
+
+
+def _celulas_openpyxl(conteudo, valores):
+    wb = load_workbook(io.BytesIO(conteudo))
+    ws = wb.active
+    for celula, valor in valores.items():
+        ws[celula] = valor
+    saida = io.BytesIO()
+    wb.save(saida)
+    return _ler_celulas(saida.getvalue(), valores)
+
+
+def _ler_celulas(conteudo, valores):
+    ws = load_workbook(io.BytesIO(conteudo)).active
+    return ws.title, {celula: (ws[celula].value, _estilo(ws[celula])) for celula in valores}
+
+
+def verificar(original, otimizado, lista_valores):
+    """
+    Preenche os dois modelos com cada ``{celula: valor}`` nos dois motores
+    e levanta ErroOtimizacao se alguma célula mapeada sair diferente.
+    """
+    pacote_original, pacote_otimizado = PacoteXlsx(original), PacoteXlsx(otimizado)
+    for valores in lista_valores:
+        comparacoes = (
+            ("openpyxl", _celulas_openpyxl(original, valores), _celulas_openpyxl(otimizado, valores)),
+            ("zip", _ler_celulas(pacote_original.gerar_bytes(valores), valores),
+             _ler_celulas(pacote_otimizado.gerar_bytes(valores), valores)),
+        )
+        for motor, (aba_antes, antes), (aba_depois, depois) in comparacoes:
+            if aba_antes != aba_depois:
+                raise ErroOtimizacao(f"Motor {motor}: aba ativa mudou de '{aba_antes}' para '{aba_depois}'.")
+            diferentes = sorted(celula for celula in valores if antes[celula] != depois[celula])
+            if diferentes:
+                raise ErroOtimizacao(f"Motor {motor}: células diferentes após otimizar: {', '.join(diferentes)}")
@@ -0,0 +1,145 @@
+"""
+Paginação dos changelists para tabelas com anos de histórico.
+
+- Contagem: na listagem sem filtros do Postgres vem da estimativa do
+  planejador (``pg_class.reltuples``); nos demais casos é exata, mas limitada
+  a ``RH_CHANGELIST_CONTAGEM_MAXIMA`` linhas (``COUNT`` sobre um ``LIMIT``).
+- Páginas profundas: o link "Próxima" leva um cursor com a chave de ordenação
+  e o id do último registro da página, e a página seguinte é buscada com
+  ``WHERE (chave, id) > cursor`` em vez de ``OFFSET``; o custo não cresce com
+  a profundidade. Quando a ordenação permite o cursor, os links numerados
+  (``OFFSET``) vão só até ``RH_CHANGELIST_PAGINAS_NUMERADAS``.
+- Cada página busca uma linha a mais para saber se há próxima: a contagem
+  pode ser estimada ou limitada, e a última página não ganha link vazio.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Parâmetro da URL com o cursor da página.
+CURSOR_VAR = "apos"
+
+
+class PaginadorEstimado(Paginator):
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, estimar=False):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.estimar = estimar
+        self.aproximado = False
+        # Definido pelo changelist quando há cursor: teto dos links numerados.
+        self.paginas_numeradas = None
+
+    def _estimativa(self):
+        queryset = self.object_list
+        conexao = connections[queryset.db]
+        if not self.estimar or conexao.vendor != "postgresql":
+            return None
+        with conexao.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                           [queryset.model._meta.db_table])
+            linha = cursor.fetchone()
+        # -1: tabela ainda não analisada. Abaixo do limite, contar é barato.
+        if linha is None or linha[0] < getattr(settings, "RH_CHANGELIST_CONTAGEM_EXATA_ATE", 10000):
+            return None
+        return int(linha[0])
+
+    @cached_property
+    def count(self):
+        estimativa = self._estimativa()
+        if estimativa is not None:
+            self.aproximado = True
+            return estimativa
+        maximo = getattr(settings, "RH_CHANGELIST_CONTAGEM_MAXIMA", 10000)
+        # Só os pks, sem ordenação: anotações do queryset (ex. a subconsulta
+        # de total_desligamentos) ficariam dentro do COUNT sobre o LIMIT.
+        total = self.object_list.order_by().values("pk")[:maximo].count()
+        self.aproximado = total >= maximo
+        return total
+
+    def get_elided_page_range(self, number=1, **kwargs):
+        if self.paginas_numeradas is None:
+            return super().get_elided_page_range(number, **kwargs)
+        return range(1, min(self.num_pages, self.paginas_numeradas) + 1)
+
+
+def pagina_com_sobra(queryset, tamanho):
+    """
+    (queryset com as ``tamanho`` primeiras linhas, há mais linhas?) numa
+    consulta só, buscando ``tamanho + 1`` linhas.
+    """
+    linhas = list(queryset[:tamanho + 1])
+    pagina = queryset[:tamanho]
+    # Como o prefetch_related do Django faz: o queryset já sai avaliado. O
+    # formset do list_editable precisa de um queryset, não de uma lista.
+    pagina._result_cache = linhas[:tamanho]
+    pagina._prefetch_done = True
+    return pagina, len(linhas) > tamanho
+
+
+def _campo_ordenacao(model, item):
+    if not isinstance(item, str):
+        return None
+    nome = item.lstrip("-")
+    if nome == "pk":
+        return model._meta.pk
+    try:
+        campo = model._meta.get_field(nome)
+    except FieldDoesNotExist:
+        return None
+    # Colunas nulas ou relações não têm ordem estável entre bancos.
+    if not getattr(campo, "concrete", False) or campo.null or campo.is_relation:
+        return None
+    return campo
+
+
+def chave_keyset(model, ordenacao):
+    """
+    [(campo, decrescente), ...] se a ordenação é (campo, pk) ou só pk, senão
+    ``None`` (a página continua usando OFFSET).
+    """
+    ordenacao = list(ordenacao)
+    if not ordenacao or len(ordenacao) > 2:
+        return None
+    chave = []
+    for item in ordenacao:
+        campo = _campo_ordenacao(model, item)
+        if campo is None:
+            return None
+        chave.append((campo, item.startswith("-")))
+    if not chave[-1][0].primary_key:
+        return None
+    return chave
+
+
+def codificar_cursor(chave, obj):
+    valores = [getattr(obj, campo.attname) for campo, _ in chave]
+    bruto = json.dumps(valores, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(chave, cursor):
+    """Valores do cursor convertidos para os tipos dos campos; ``None`` se inválido."""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(bruto)
+        if len(valores) != len(chave):
+            return None
+        return [campo.to_python(valor) for (campo, _), valor in zip(chave, valores)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def condicao_apos(chave, valores):
+    """Q dos registros que vêm depois do cursor na ordenação da chave."""
+    (campo, decrescente), *resto = chave
+    comparacao = "lt" if decrescente else "gt"
+    condicao = Q(**{f"{campo.attname}__{comparacao}": valores[0]})
+    if resto:
+        condicao |= Q(**{campo.attname: valores[0]}) & condicao_apos(resto, valores[1:])
+    return condicao
@@ -1,21 +1,142 @@
+import time
+
+from django.conf import settings
 from django.contrib.auth.models import User
-from rh.models import Hierarquia
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+from .hierarquia import ids_descendentes
 
 GRUPO_RH = "RH"
 GRUPO_COORDENADOR = "COORDENADORES"
 GRUPO_SUPERVISOR = "COLABORADORES"
 
+# Do mais para o menos permissivo: quem está em vários grupos fica com o primeiro.
+ORDEM_GRUPOS = (GRUPO_RH, GRUPO_COORDENADOR, GRUPO_SUPERVISOR)
 
-def users_visiveis_para(user):
+CHAVE_VERSAO_HIERARQUIA = "rh:hierarquia:versao"
 
-    if user.is_superuser or user.groups.filter(name=GRUPO_RH).exists():
-        return User.objects.all()
 
-    elif user.groups.filter(name=GRUPO_COORDENADOR).exists():
-        supervisores = Hierarquia.objects.filter(coordenador=user).values_list("supervisor_id", flat=True)
-        return User.objects.filter(id__in=list(supervisores) + [user.id])
+def _cache():
+    """
+    Cache compartilhado dos supervisores de cada coordenador, ou ``None``
+    (sem cache entre requisições). Um cache local do processo não serve: a
+    mudança de versão só chegaria ao worker que fez a alteração.
+    """
+    alias = getattr(settings, "RH_HIERARQUIA_CACHE_ALIAS", "")
+    if not alias:
+        return None
+    cache = caches[alias]
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            f"RH_HIERARQUIA_CACHE_ALIAS={alias!r} aponta para um cache local do processo; "
+            "use um cache compartilhado entre os workers (Redis, Memcached, banco) ou deixe vazio."
+        )
+    return cache
+
+
+def _nova_versao():
+    # Se a chave da versão sumir do cache, recomeçar do 1 reaproveitaria
+    # entradas antigas; o relógio garante um número ainda não usado.
+    return time.time_ns()
+
+
+def versao_hierarquia(cache):
+    versao = cache.get(CHAVE_VERSAO_HIERARQUIA)
+    if versao is None:
+        cache.add(CHAVE_VERSAO_HIERARQUIA, _nova_versao(), timeout=None)
+        versao = cache.get(CHAVE_VERSAO_HIERARQUIA)
+    return versao
+
+
+def invalidar_hierarquia():
+    """Muda a versão: todos os workers passam a ignorar os supervisores em cache."""
+    cache = _cache()
+    if cache is None:
+        return
+    try:
+        cache.incr(CHAVE_VERSAO_HIERARQUIA)
+    except ValueError:
+        cache.set(CHAVE_VERSAO_HIERARQUIA, _nova_versao(), timeout=None)
+
+
+def _supervisores(user):
+    """Ids de todos os níveis abaixo do coordenador, do cache versionado ou do fechamento."""
+    cache = _cache()
+    if cache is None:
+        return ids_descendentes(user)
+    chave = f"rh:hierarquia:{versao_hierarquia(cache)}:{user.pk}"
+    supervisores = cache.get(chave)
+    if supervisores is None:
+        supervisores = ids_descendentes(user)
+        cache.set(chave, supervisores, timeout=getattr(settings, "RH_HIERARQUIA_CACHE_TIMEOUT", 300))
+    return supervisores
+
+
+class Papel:
+    """
+    Grupos e usuários visíveis de um usuário, consultados uma única vez.
+
+    Fica guardado no próprio objeto do usuário (``papel_do_usuario``); como o
+    ``request.user`` é criado a cada requisição, vale pela requisição inteira
+    e é reaproveitado por todos os ModelAdmin, filtros e exportações. Os
+    grupos são lidos do banco a cada requisição (perder o grupo RH vale na
+    hora); só os supervisores do coordenador vêm do cache versionado.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._supervisores = frozenset()
+        if user.is_superuser:
+            self.grupos = frozenset()
+            self.grupo = GRUPO_RH
+        else:
+            self.grupos = frozenset(user.groups.values_list("name", flat=True))
+            self.grupo = next((grupo for grupo in ORDEM_GRUPOS if grupo in self.grupos), None)
+            if self.grupo == GRUPO_COORDENADOR:
+                self._supervisores = _supervisores(user)
+
+    @property
+    def eh_rh(self):
+        return self.grupo == GRUPO_RH
+
+    @property
+    def ids_visiveis(self):
+        """Ids dos usuários cujos registros ele enxerga; ``None`` quando vê todos."""
+        if self.eh_rh:
+            return None
+        if self.grupo == GRUPO_COORDENADOR:
+            return self._supervisores | {self.user.pk}
+        return frozenset({self.user.pk})
+
+
+def papel_do_usuario(user):
+    papel = getattr(user, "_rh_papel", None)
+    if papel is None:
+        papel = user._rh_papel = Papel(user)
+    return papel
+
+
+def eh_rh(user):
+    return papel_do_usuario(user).eh_rh
+
+
+def users_visiveis_para(user):
+    ids = papel_do_usuario(user).ids_visiveis
+    if ids is None:
+        return User.objects.all()
+    return User.objects.filter(id__in=sorted(ids))
 
-    elif user.groups.filter(name=GRUPO_SUPERVISOR).exists():
-        return User.objects.filter(id=user.id)
 
-    return User.objects.filter(id=user.id)
+def filtrar_visiveis(queryset, user, campo="criado_por"):
+    """
+    Restringe o queryset aos registros criados por usuários visíveis, com a
+    lista de ids literal no SQL (sem subconsulta em auth_user). Para quem vê
+    tudo, continua de fora o que não tem autor, como no ``__in`` antigo.
+    """
+    ids = papel_do_usuario(user).ids_visiveis
+    if ids is None:
+        return queryset.filter(**{f"{campo}__isnull": False})
+    return queryset.filter(**{f"{campo}__in": sorted(ids)})
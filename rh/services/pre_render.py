@@ -0,0 +1,134 @@
+"""
+Pré-renderização das exportações logo após o save.
+
+Com ``RH_EXPORT_PRE_RENDER`` ligado, o formulário salvo no admin é
+renderizado em segundo plano depois do commit e gravado em disco com o
+nome igual à sua impressão digital. Como o nome depende do conteúdo, um
+arquivo antigo nunca é servido para dados novos: se o registro mudou, a
+digital muda e a view simplesmente não encontra o arquivo e renderiza na hora.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rh-pre-render")
+_gravacoes = 0
+_lock = threading.Lock()
+
+LIMPEZA_A_CADA = 50
+
+
+def ativo():
+    return getattr(settings, "RH_EXPORT_PRE_RENDER", False)
+
+
+def _pasta():
+    return str(getattr(settings, "RH_EXPORT_PRE_RENDER_DIR", os.path.join(tempfile.gettempdir(), "rh_pre_render")))
+
+
+def caminho_arquivo(digital):
+    return os.path.join(_pasta(), digital[:2], f"{digital}.xlsx")
+
+
+def caminho_relativo(caminho):
+    """Caminho dentro da pasta de pré-render, com "/" (para X-Accel-Redirect)."""
+    return os.path.relpath(caminho, _pasta()).replace(os.sep, "/")
+
+
+def arquivo_pre_renderizado(digital):
+    """Caminho do arquivo já renderizado para esta digital, se existir."""
+    if not ativo():
+        return None
+    caminho = caminho_arquivo(digital)
+    return caminho if os.path.exists(caminho) else None
+
+
+def gravar(digital, escrever):
+    """Grava atomicamente: escreve num temporário da mesma pasta e renomeia."""
+    destino = caminho_arquivo(digital)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(destino), suffix=".tmp")
+    try:
+        with os.fdopen(descritor, "wb") as arquivo:
+            escrever(arquivo)
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return destino
+
+
+def limpar_antigos(max_dias=None):
+    """Remove arquivos gravados há mais de ``max_dias``."""
+    max_dias = max_dias or getattr(settings, "RH_EXPORT_PRE_RENDER_MAX_DIAS", 30)
+    limite = time.time() - max_dias * 24 * 60 * 60
+    removidos = 0
+    for raiz, _, arquivos in os.walk(_pasta()):
+        for nome in arquivos:
+            caminho = os.path.join(raiz, nome)
+            try:
+                if os.stat(caminho).st_mtime < limite:
+                    os.remove(caminho)
+                    removidos += 1
+            except FileNotFoundError:
+                pass
+    return removidos
+
+
+def pre_renderizar(label_modelo, pk):
+    # Import local: exportacao importa este módulo.
+    from .excel import renderizar
+    from .exportacao import impressao_digital
+    from .mapeamentos import mapeamento_para
+
+    global _gravacoes
+    try:
+        model = apps.get_model(label_modelo)
+        obj = model.objects.select_related("criado_por").filter(pk=pk).first()
+        if obj is None:
+            return None
+
+        mapeamento = mapeamento_para(obj)
+        valores = mapeamento.valores(obj)
+        digital = impressao_digital(mapeamento, valores)
+        if os.path.exists(caminho_arquivo(digital)):
+            return caminho_arquivo(digital)
+
+        caminho = gravar(digital, lambda arquivo: renderizar(mapeamento.modelo_path, valores, arquivo))
+        logger.info(f"Exportação pré-renderizada: {label_modelo} #{pk}")
+
+        with _lock:
+            _gravacoes += 1
+            limpar = _gravacoes % LIMPEZA_A_CADA == 0
+        if limpar:
+            limpar_antigos()
+        return caminho
+    except Exception as e:
+        logger.error(f"Erro ao pré-renderizar {label_modelo} #{pk}: {e}")
+        return None
+
+
+def _pre_renderizar_em_segundo_plano(label_modelo, pk):
+    try:
+        return pre_renderizar(label_modelo, pk)
+    finally:
+        # Thread fora do ciclo de requisição: a conexão não é fechada sozinha.
+        connection.close()
+
+
+def agendar_pre_render(obj):
+    """Agenda a renderização para depois do commit da transação atual."""
+    if not ativo():
+        return
+    label_modelo, pk = obj._meta.label, obj.pk
+    transaction.on_commit(lambda: _executor.submit(_pre_renderizar_em_segundo_plano, label_modelo, pk))
@@ -0,0 +1,124 @@
+"""
+Relatórios tabulares (uma linha por registro) das tabelas do RH.
+
+As linhas saem de ``values_list(...).iterator(chunk_size=...)``, sem
+instanciar modelos, e vão direto para um workbook ``write_only`` em arquivo
+temporário (XLSX) ou para a resposta em streaming (CSV). Assim a memória
+fica constante mesmo com centenas de milhares de linhas.
+"""
+import csv
+import tempfile
+
+from django.core.exceptions import BadRequest
+from django.db import models
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from .excel import CONTENT_TYPE_XLSX
+from .mapeamentos import sim_nao
+
+TAMANHO_LOTE_CONSULTA = 2000
+
+# Nunca sai em relatório, mesmo se pedido explicitamente.
+CAMPOS_OCULTOS = {"senha_gov", "busca", "cpf_digitos"}
+
+
+class Coluna:
+    def __init__(self, nome, titulo, lookup, converter=None):
+        self.nome = nome
+        self.titulo = titulo
+        self.lookup = lookup
+        self.converter = converter
+
+
+def _conversor(field):
+    if field.choices:
+        rotulos = dict(field.flatchoices)
+        return lambda valor: rotulos.get(valor, valor)
+    if isinstance(field, models.BooleanField):
+        return sim_nao
+    return None
+
+
+def colunas_disponiveis(model):
+    colunas = {}
+    for field in model._meta.concrete_fields:
+        if field.name in CAMPOS_OCULTOS:
+            continue
+        lookup = f"{field.name}__username" if field.is_relation else field.name
+        colunas[field.name] = Coluna(field.name, str(field.verbose_name), lookup, _conversor(field))
+    return colunas
+
+
+def selecionar_colunas(model, nomes=None):
+    """Colunas pedidas (ex.: "nome,codigo,status"), ou todas se nada for informado."""
+    disponiveis = colunas_disponiveis(model)
+    if not nomes:
+        return list(disponiveis.values())
+    if isinstance(nomes, str):
+        nomes = [nome.strip() for nome in nomes.split(",") if nome.strip()]
+    invalidas = [nome for nome in nomes if nome not in disponiveis]
+    if invalidas:
+        raise BadRequest(f"Colunas inválidas para o relatório: {', '.join(invalidas)}")
+    return [disponiveis[nome] for nome in nomes]
+
+
+def iterar_linhas(queryset, colunas, formatar=None):
+    conversores = [coluna.converter for coluna in colunas]
+    linhas = queryset.values_list(*[coluna.lookup for coluna in colunas])
+    for linha in linhas.iterator(chunk_size=TAMANHO_LOTE_CONSULTA):
+        valores = [converter(valor) if converter else valor for converter, valor in zip(conversores, linha)]
+        yield [formatar(valor) for valor in valores] if formatar else valores
+
+
+def exportar_relatorio_xlsx(queryset, colunas, nome_arquivo):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=str(queryset.model._meta.verbose_name_plural)[:31])
+
+    negrito = Font(bold=True)
+    cabecalho = []
+    for coluna in colunas:
+        celula = WriteOnlyCell(ws, value=coluna.titulo)
+        celula.font = negrito
+        cabecalho.append(celula)
+    ws.append(cabecalho)
+
+    for linha in iterar_linhas(queryset, colunas):
+        ws.append(linha)
+
+    # Em disco, não em memória: o arquivo pode ter centenas de milhares de linhas.
+    arquivo = tempfile.TemporaryFile()
+    wb.save(arquivo)
+    arquivo.seek(0)
+    return FileResponse(arquivo, as_attachment=True, filename=nome_arquivo, content_type=CONTENT_TYPE_XLSX)
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de gravar."""
+
+    def write(self, valor):
+        return valor
+
+
+def _formatar_csv(valor):
+    if valor is None:
+        return ""
+    if hasattr(valor, "strftime"):
+        return valor.strftime("%d/%m/%Y")
+    return valor
+
+
+def exportar_relatorio_csv(queryset, colunas, nome_arquivo):
+    escritor = csv.writer(_Eco(), delimiter=";")
+
+    def gerar():
+        # BOM + ";" para o Excel em pt-BR abrir com acentos e colunas certas.
+        yield "\ufeff" + escritor.writerow([coluna.titulo for coluna in colunas])
+        for linha in iterar_linhas(queryset, colunas, _formatar_csv):
+            yield escritor.writerow(linha)
+
+    response = StreamingHttpResponse(gerar(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{nome_arquivo}"'
+    return response
@@ -0,0 +1,169 @@
+"""
+Renderização de lotes grandes em um pool de processos.
+
+Preencher planilhas é CPU-bound; em um lote de centenas de formulários o
+worker do gunicorn fica preso num único núcleo. Aqui os registros já chegam
+convertidos em dicionários simples ({celula: valor}), cada processo do pool
+carrega os modelos uma única vez na inicialização, e os resultados voltam na
+mesma ordem das tarefas. Lotes pequenos são renderizados em série, já que
+o custo de despachar para o pool não compensa.
+
+O pool só existe com ``RH_EXCEL_PROCESSOS`` > 1 e é encerrado depois de
+``RH_EXCEL_POOL_OCIOSO`` segundos sem lotes.
+"""
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain, islice
+
+from django.conf import settings
+
+from .excel import MOTOR_OPENPYXL, MOTOR_ZIP, renderizar_openpyxl, renderizar_zip
+from .modelos_excel import MODELOS_PADRAO, obter_modelo
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_processos = None
+_em_uso = 0
+_timer = None
+_lock = threading.Lock()
+
+
+def _inicializar_worker(caminhos, motor):
+    for caminho in caminhos:
+        modelo = obter_modelo(caminho)
+        if motor == MOTOR_ZIP:
+            modelo.pacote_xlsx()
+        else:
+            modelo.novo_workbook()
+
+
+def _renderizar_bytes(modelo_path, valores, motor):
+    # Roda dentro do processo filho: não pode depender das settings do Django,
+    # por isso o motor chega resolvido e a função de renderização é chamada direto.
+    saida = io.BytesIO()
+    if motor == MOTOR_ZIP:
+        from .xlsx_zip import ErroPacoteXlsx
+        try:
+            renderizar_zip(modelo_path, valores, saida)
+            return saida.getvalue()
+        except ErroPacoteXlsx:
+            saida = io.BytesIO()
+    renderizar_openpyxl(modelo_path, valores, saida)
+    return saida.getvalue()
+
+
+def _renderizar_tarefa(tarefa):
+    return _renderizar_bytes(*tarefa)
+
+
+def _obter_executor(processos, motor):
+    global _executor, _executor_processos
+    with _lock:
+        if _executor is None or _executor_processos != processos:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            # "spawn" evita herdar conexões de banco e threads do worker do gunicorn.
+            _executor = ProcessPoolExecutor(
+                max_workers=processos,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_inicializar_worker,
+                initargs=(MODELOS_PADRAO, motor),
+            )
+            _executor_processos = processos
+        return _executor
+
+
+def encerrar_pool():
+    global _executor, _executor_processos, _timer
+    with _lock:
+        if _timer is not None:
+            _timer.cancel()
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+        _executor = None
+        _executor_processos = None
+        _timer = None
+
+
+def _reservar_pool():
+    global _em_uso, _timer
+    with _lock:
+        _em_uso += 1
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+
+
+def _liberar_pool():
+    global _em_uso, _timer
+    with _lock:
+        _em_uso -= 1
+        if _em_uso or _executor is None:
+            return
+        _timer = threading.Timer(getattr(settings, "RH_EXCEL_POOL_OCIOSO", 300), _encerrar_ocioso)
+        _timer.daemon = True
+        _timer.start()
+
+
+def _encerrar_ocioso():
+    global _executor, _executor_processos, _timer
+    with _lock:
+        if _em_uso or _executor is None:
+            return
+        executor = _executor
+        _executor = _executor_processos = _timer = None
+    # Nada pendente: não precisa esperar os processos saírem.
+    executor.shutdown(wait=False)
+    logger.info("Pool de renderização encerrado por ociosidade")
+
+
+def renderizar_lote(tarefas, motor=None, processos=None, chunksize=None, minimo=None):
+    """
+    Recebe tarefas ``(nome_arquivo, modelo_path, valores)`` e gera
+    ``(nome_arquivo, bytes_xlsx)`` na mesma ordem.
+    """
+    motor = motor or getattr(settings, "RH_EXCEL_MOTOR", MOTOR_ZIP)
+    if motor not in (MOTOR_ZIP, MOTOR_OPENPYXL):
+        motor = MOTOR_ZIP
+    processos = processos if processos is not None else getattr(settings, "RH_EXCEL_PROCESSOS", 1)
+    chunksize = chunksize or getattr(settings, "RH_EXCEL_CHUNK", 8)
+    minimo = minimo if minimo is not None else getattr(settings, "RH_EXCEL_LOTE_MINIMO_PARALELO", 50)
+
+    tarefas = iter(tarefas)
+    inicio = list(islice(tarefas, minimo))
+    pendentes = chain(inicio, tarefas)
+
+    if processos <= 1 or len(inicio) < minimo:
+        for nome, modelo_path, valores in pendentes:
+            yield nome, _renderizar_bytes(modelo_path, valores, motor)
+        return
+
+    # Despacha em janelas para não materializar o lote inteiro em memória.
+    janela = processos * chunksize * 2
+    _reservar_pool()
+    try:
+        while True:
+            bloco = list(islice(pendentes, janela))
+            if not bloco:
+                break
+            try:
+                executor = _obter_executor(processos, motor)
+                resultados = list(executor.map(
+                    _renderizar_tarefa,
+                    [(modelo_path, valores, motor) for _, modelo_path, valores in bloco],
+                    chunksize=chunksize,
+                ))
+            except BrokenProcessPool as e:
+                logger.error(f"Pool de renderização quebrou, seguindo em série: {e}")
+                encerrar_pool()
+                resultados = [_renderizar_bytes(modelo_path, valores, motor) for _, modelo_path, valores in bloco]
+
+            for (nome, _, _), conteudo in zip(bloco, resultados):
+                yield nome, conteudo
+    finally:
+        _liberar_pool()
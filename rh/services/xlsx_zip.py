@@ -0,0 +1,353 @@
+"""
+Preenchimento de modelos .xlsx direto no pacote zip.
+
+Os formulários só recebem valores em células fixas, então não há motivo para
+passar o workbook inteiro pelo modelo de objetos do openpyxl. Aqui o modelo é
+aberto uma única vez, a planilha ativa e o sharedStrings são mantidos como
+texto, e a cada exportação apenas essas partes são reescritas. Todas as demais
+partes (estilos, imagens, desenhos...) são copiadas byte a byte, já
+comprimidas, para o arquivo de saída.
+"""
+import io
+import posixpath
+import re
+import struct
+import zipfile
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+
+class ErroPacoteXlsx(Exception):
+    """O modelo (ou o valor) não é suportado pelo preenchimento via zip."""
+
+
+_RE_CELULA = re.compile(r"<c\b([^>]*?)(?:/>|>(.*?)</c>)", re.S)
+_RE_LINHA = re.compile(r"<row\b([^>]*?)(/>|>(.*?)</row>)", re.S)
+_RE_ATRIBUTO_R = re.compile(r'\br="([A-Z]+)(\d+)"')
+_RE_ATRIBUTO_S = re.compile(r'\bs="(\d+)"')
+_RE_COORDENADA = re.compile(r"^([A-Z]{1,3})([1-9]\d*)$")
+_RE_CARACTERES_ILEGAIS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_TIPO_PLANILHA = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+_TIPO_SST = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+
+_ASSINATURA_LOCAL = b"PK\x03\x04"
+_ASSINATURA_CENTRAL = b"PK\x01\x02"
+_ASSINATURA_FIM = b"PK\x05\x06"
+_FLAG_UTF8 = 0x800
+
+
+def _numero_coluna(letras):
+    numero = 0
+    for letra in letras:
+        numero = numero * 26 + (ord(letra) - 64)
+    return numero
+
+
+def _separar_coordenada(coordenada):
+    match = _RE_COORDENADA.match(coordenada)
+    if not match:
+        raise ErroPacoteXlsx(f"Coordenada inválida: {coordenada}")
+    return match.group(1), int(match.group(2))
+
+
+def _atributos(xml):
+    return dict(re.findall(r'([\w:]+)="([^"]*)"', xml))
+
+
+class _Membro:
+    """Entrada do zip original, com os bytes ainda comprimidos."""
+
+    def __init__(self, info, bruto):
+        self.info = info
+        self.bruto = bruto
+
+
+class PacoteXlsx:
+    """Modelo .xlsx pré-processado para preenchimento rápido de células."""
+
+    def __init__(self, conteudo):
+        try:
+            zin = zipfile.ZipFile(io.BytesIO(conteudo))
+        except zipfile.BadZipFile as e:
+            raise ErroPacoteXlsx(f"Modelo não é um zip válido: {e}")
+
+        self.membros = []
+        for info in zin.infolist():
+            if info.flag_bits & 0x1:
+                raise ErroPacoteXlsx("Modelos criptografados não são suportados.")
+            self.membros.append(_Membro(info, self._ler_bruto(conteudo, info)))
+
+        workbook_xml = zin.read("xl/workbook.xml").decode("utf-8")
+        relacoes = self._relacoes(zin.read("xl/_rels/workbook.xml.rels").decode("utf-8"))
+
+        self.caminho_workbook = "xl/workbook.xml"
+        self.workbook_xml = self._forcar_recalculo(workbook_xml)
+        self.caminho_planilha = self._planilha_ativa(workbook_xml, relacoes)
+        self.planilha_xml = zin.read(self.caminho_planilha).decode("utf-8")
+
+        self.caminho_sst = next(
+            (alvo for tipo, alvo in relacoes.values() if tipo == _TIPO_SST), None
+        )
+        self.sst_xml = zin.read(self.caminho_sst).decode("utf-8") if self.caminho_sst else None
+        if self.sst_xml is not None:
+            atributos = _atributos(re.search(r"<sst\b[^>]*>", self.sst_xml).group(0))
+            self.sst_unicos = int(atributos.get("uniqueCount", self.sst_xml.count("<si>")))
+            self.sst_total = int(atributos.get("count", self.sst_unicos))
+
+    @staticmethod
+    def _ler_bruto(conteudo, info):
+        # Cabeçalho local: 30 bytes fixos + nome + campo extra.
+        cabecalho = conteudo[info.header_offset:info.header_offset + 30]
+        if cabecalho[:4] != _ASSINATURA_LOCAL:
+            raise ErroPacoteXlsx(f"Cabeçalho local inválido em {info.filename}")
+        tam_nome, tam_extra = struct.unpack("<HH", cabecalho[26:30])
+        inicio = info.header_offset + 30 + tam_nome + tam_extra
+        return conteudo[inicio:inicio + info.compress_size]
+
+    @staticmethod
+    def _relacoes(rels_xml):
+        relacoes = {}
+        for rel in re.findall(r"<Relationship\b[^>]*>", rels_xml):
+            atributos = _atributos(rel)
+            alvo = atributos["Target"]
+            if alvo.startswith("/"):
+                alvo = alvo[1:]
+            else:
+                alvo = posixpath.normpath(posixpath.join("xl", alvo))
+            relacoes[atributos["Id"]] = (atributos["Type"], alvo)
+        return relacoes
+
+    @staticmethod
+    def _planilha_ativa(workbook_xml, relacoes):
+        visao = re.search(r"<workbookView\b[^>]*>", workbook_xml)
+        aba_ativa = int(_atributos(visao.group(0)).get("activeTab", 0)) if visao else 0
+
+        planilhas = []
+        for sheet in re.findall(r"<sheet\b[^>]*>", workbook_xml):
+            atributos = _atributos(sheet)
+            tipo, alvo = relacoes[atributos["r:id"]]
+            if tipo == _TIPO_PLANILHA:
+                planilhas.append(alvo)
+        if not planilhas:
+            raise ErroPacoteXlsx("Modelo sem planilhas.")
+        return planilhas[min(aba_ativa, len(planilhas) - 1)]
+
+    @staticmethod
+    def _forcar_recalculo(workbook_xml):
+        # Fórmulas que dependem das células preenchidas trazem valores em
+        # cache do modelo; pede ao Excel para recalcular tudo ao abrir.
+        calc = re.search(r"<calcPr\b[^>]*?/?>", workbook_xml)
+        if calc is None:
+            return workbook_xml.replace("</workbook>", '<calcPr fullCalcOnLoad="1"/></workbook>')
+        if "fullCalcOnLoad" in calc.group(0):
+            return workbook_xml
+        novo = calc.group(0).replace("<calcPr", '<calcPr fullCalcOnLoad="1"', 1)
+        return workbook_xml[:calc.start()] + novo + workbook_xml[calc.end():]
+
+    # ------------------------------------------------------------------
+    #   Geração das partes alteradas
+    # ------------------------------------------------------------------
+    def _xml_celula(self, coordenada, estilo, valor, novas_strings):
+        atributo_s = f' s="{estilo}"' if estilo else ""
+        if valor is None or valor == "":
+            return f'<c r="{coordenada}"{atributo_s}/>'
+        if isinstance(valor, bool):
+            return f'<c r="{coordenada}"{atributo_s} t="b"><v>{int(valor)}</v></c>'
+        if isinstance(valor, (int, float, Decimal)):
+            return f'<c r="{coordenada}"{atributo_s}><v>{valor}</v></c>'
+        if isinstance(valor, (date, datetime)):
+            raise ErroPacoteXlsx("Datas devem ser formatadas antes do preenchimento via zip.")
+
+        texto = _RE_CARACTERES_ILEGAIS.sub("", str(valor))
+        if self.sst_xml is None:
+            espaco = ' xml:space="preserve"' if texto != texto.strip() else ""
+            return (
+                f'<c r="{coordenada}"{atributo_s} t="inlineStr">'
+                f"<is><t{espaco}>{escape(texto)}</t></is></c>"
+            )
+        indice = self.sst_unicos + len(novas_strings)
+        novas_strings.append(texto)
+        return f'<c r="{coordenada}"{atributo_s} t="s"><v>{indice}</v></c>'
+
+    def _preencher_planilha(self, valores, novas_strings):
+        pendentes = {}
+        for coordenada, valor in valores.items():
+            _separar_coordenada(coordenada)
+            pendentes[coordenada] = valor
+
+        def substituir_celula(match):
+            atributos = match.group(1)
+            ref = _RE_ATRIBUTO_R.search(atributos)
+            if ref is None:
+                raise ErroPacoteXlsx("Célula sem referência explícita no modelo.")
+            coordenada = ref.group(1) + ref.group(2)
+            if coordenada not in pendentes:
+                return match.group(0)
+            estilo = _RE_ATRIBUTO_S.search(atributos)
+            return self._xml_celula(
+                coordenada, estilo.group(1) if estilo else None,
+                pendentes.pop(coordenada), novas_strings,
+            )
+
+        inicio = self.planilha_xml.find("<sheetData")
+        fim = self.planilha_xml.find("</sheetData>")
+        if inicio < 0:
+            raise ErroPacoteXlsx("Planilha sem sheetData.")
+        if fim < 0:
+            # <sheetData/> vazio
+            fim_tag = self.planilha_xml.index(">", inicio) + 1
+            cabeca, dados, cauda = (
+                self.planilha_xml[:inicio] + "<sheetData>", "", "</sheetData>" + self.planilha_xml[fim_tag:]
+            )
+        else:
+            abertura = self.planilha_xml.index(">", inicio) + 1
+            cabeca = self.planilha_xml[:abertura]
+            dados = self.planilha_xml[abertura:fim]
+            cauda = self.planilha_xml[fim:]
+
+        dados = _RE_CELULA.sub(substituir_celula, dados)
+        if pendentes:
+            dados = self._inserir_celulas(dados, pendentes, novas_strings)
+        return cabeca + dados + cauda
+
+    def _inserir_celulas(self, dados, pendentes, novas_strings):
+        """Cria as células que não existem no modelo, mantendo a ordem de linhas/colunas."""
+        por_linha = {}
+        for coordenada, valor in pendentes.items():
+            coluna, linha = _separar_coordenada(coordenada)
+            por_linha.setdefault(linha, []).append((_numero_coluna(coluna), coordenada, valor))
+
+        def xml_celulas(linha):
+            return [
+                (numero, self._xml_celula(coordenada, None, valor, novas_strings))
+                for numero, coordenada, valor in sorted(por_linha.pop(linha))
+            ]
+
+        def substituir_linha(match):
+            atributos = _atributos(match.group(1))
+            linha = int(atributos.get("r", 0))
+            if linha not in por_linha:
+                return match.group(0)
+            novas = xml_celulas(linha)
+            existentes = [
+                (_numero_coluna(_RE_ATRIBUTO_R.search(c.group(1)).group(1)), c.group(0))
+                for c in _RE_CELULA.finditer(match.group(3) or "")
+            ]
+            celulas = "".join(xml for _, xml in sorted(existentes + novas, key=lambda item: item[0]))
+            return f"<row{match.group(1)}>{celulas}</row>"
+
+        dados = _RE_LINHA.sub(substituir_linha, dados)
+
+        # Linhas inteiras que não existem no modelo
+        for linha in sorted(por_linha):
+            nova = f'<row r="{linha}">' + "".join(xml for _, xml in xml_celulas(linha)) + "</row>"
+            posicao = len(dados)
+            for match in _RE_LINHA.finditer(dados):
+                if int(_atributos(match.group(1)).get("r", 0)) > linha:
+                    posicao = match.start()
+                    break
+            dados = dados[:posicao] + nova + dados[posicao:]
+        return dados
+
+    def _preencher_sst(self, novas_strings):
+        if not novas_strings:
+            return self.sst_xml
+        itens = []
+        for texto in novas_strings:
+            espaco = ' xml:space="preserve"' if texto != texto.strip() else ""
+            itens.append(f"<si><t{espaco}>{escape(texto)}</t></si>")
+
+        sst = self.sst_xml
+        abertura = re.search(r"<sst\b[^>]*?(/?)>", sst)
+        cabecalho = abertura.group(0)
+        novo_cabecalho = re.sub(r'\s(?:count|uniqueCount)="\d*"', "", cabecalho)
+        novo_cabecalho = novo_cabecalho.replace(
+            "<sst",
+            f'<sst count="{self.sst_total + len(novas_strings)}" '
+            f'uniqueCount="{self.sst_unicos + len(novas_strings)}"',
+            1,
+        )
+        if abertura.group(1):
+            # <sst .../> vazio
+            novo_cabecalho = novo_cabecalho[:-2] + ">"
+            return sst[:abertura.start()] + novo_cabecalho + "".join(itens) + "</sst>" + sst[abertura.end():]
+        sst = sst[:abertura.start()] + novo_cabecalho + sst[abertura.end():]
+        return sst.replace("</sst>", "".join(itens) + "</sst>")
+
+    def partes_preenchidas(self, valores):
+        """Retorna {caminho: bytes} apenas das partes que mudam para estes valores."""
+        novas_strings = []
+        partes = {
+            self.caminho_workbook: self.workbook_xml.encode("utf-8"),
+            self.caminho_planilha: self._preencher_planilha(valores, novas_strings).encode("utf-8"),
+        }
+        if novas_strings:
+            partes[self.caminho_sst] = self._preencher_sst(novas_strings).encode("utf-8")
+        return partes
+
+    # ------------------------------------------------------------------
+    #   Escrita do zip
+    # ------------------------------------------------------------------
+    def gerar(self, valores, destino):
+        """Escreve o .xlsx preenchido em ``destino`` (arquivo binário, não precisa de seek)."""
+        # Tudo que pode falhar acontece antes de escrever o primeiro byte,
+        # para que o chamador possa cair no openpyxl sem saída corrompida.
+        partes = self.partes_preenchidas(valores)
+
+        deslocamento = 0
+        central = []
+        for membro in self.membros:
+            info = membro.info
+            nome = info.filename.encode("utf-8")
+            flags = info.flag_bits & ~0x8
+            if not info.filename.isascii():
+                flags |= _FLAG_UTF8
+
+            if info.filename in partes:
+                dados = partes[info.filename]
+                compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+                bruto = compressor.compress(dados) + compressor.flush()
+                crc, tamanho, metodo = zlib.crc32(dados), len(dados), zipfile.ZIP_DEFLATED
+                flags &= ~0x6
+            else:
+                bruto = membro.bruto
+                crc, tamanho, metodo = info.CRC, info.file_size, info.compress_type
+
+            if len(bruto) > 0xFFFFFFFF or tamanho > 0xFFFFFFFF or deslocamento > 0xFFFFFFFF:
+                raise ErroPacoteXlsx("Arquivos zip64 não são suportados.")
+
+            hora, data_dos = self._data_dos(info.date_time)
+            cabecalho = struct.pack(
+                "<4s2B4HL2L2H", _ASSINATURA_LOCAL, 20, 0, flags, metodo,
+                hora, data_dos, crc, len(bruto), tamanho, len(nome), 0,
+            )
+            destino.write(cabecalho)
+            destino.write(nome)
+            destino.write(bruto)
+
+            central.append(struct.pack(
+                "<4s4B4HL2L5H2L", _ASSINATURA_CENTRAL, 20, info.create_system, 20, 0,
+                flags, metodo, hora, data_dos, crc, len(bruto), tamanho,
+                len(nome), 0, 0, 0, info.internal_attr, info.external_attr, deslocamento,
+            ) + nome)
+            deslocamento += len(cabecalho) + len(nome) + len(bruto)
+
+        diretorio = b"".join(central)
+        destino.write(diretorio)
+        destino.write(struct.pack(
+            "<4s4H2LH", _ASSINATURA_FIM, 0, 0, len(central), len(central),
+            len(diretorio), deslocamento, 0,
+        ))
+
+    @staticmethod
+    def _data_dos(date_time):
+        ano, mes, dia, hora, minuto, segundo = date_time
+        return (hora << 11) | (minuto << 5) | (segundo // 2), ((ano - 1980) << 9) | (mes << 5) | dia
+
+    def gerar_bytes(self, valores):
+        saida = io.BytesIO()
+        self.gerar(valores, saida)
+        return saida.getvalue()
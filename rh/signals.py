@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Desligamento, Admissao, Distrato, Hierarquia
+from .services.busca import atualizar_campos_busca, gravar_campos_busca
+from .services.exportacao import invalidar_exportacao
+from .services.facetas import atualizar_facetas, retrato, retrato_gravado
+from .services.hierarquia import reconstruir_fechamento
+from .services.permission import invalidar_hierarquia
+
+
+# ==========================================================
+#   CACHE DE EXPORTAÇÕES
+# ==========================================================
+@receiver(post_save, sender=Desligamento)
+@receiver(post_save, sender=Admissao)
+@receiver(post_save, sender=Distrato)
+@receiver(post_delete, sender=Desligamento)
+@receiver(post_delete, sender=Admissao)
+@receiver(post_delete, sender=Distrato)
+def invalidar_cache_exportacao(sender, instance, **kwargs):
+    # Cobre o save_model do formulário e as edições de status do list_editable.
+    invalidar_exportacao(instance)
+
+
+# ==========================================================
+#   DOCUMENTO DA BUSCA DO ADMIN
+# ==========================================================
+@receiver(pre_save, sender=Desligamento)
+@receiver(pre_save, sender=Admissao)
+@receiver(pre_save, sender=Distrato)
+def atualizar_busca(sender, instance, **kwargs):
+    atualizar_campos_busca(instance)
+
+
+@receiver(post_save, sender=Desligamento)
+@receiver(post_save, sender=Admissao)
+@receiver(post_save, sender=Distrato)
+def gravar_busca_adiada(sender, instance, update_fields=None, **kwargs):
+    # Com "busca" adiado na listagem, o save grava só os campos carregados.
+    if update_fields is not None:
+        gravar_campos_busca(instance, update_fields)
+
+
+# ==========================================================
+#   CONTAGENS POR FACETA (LATERAL DOS FILTROS)
+# ==========================================================
+@receiver(pre_save, sender=Desligamento)
+@receiver(pre_save, sender=Admissao)
+@receiver(pre_save, sender=Distrato)
+def guardar_facetas_anteriores(sender, instance, **kwargs):
+    # Valores gravados antes da alteração (inclusive status do list_editable).
+    instance._facetas_anteriores = retrato_gravado(instance)
+
+
+@receiver(post_save, sender=Desligamento)
+@receiver(post_save, sender=Admissao)
+@receiver(post_save, sender=Distrato)
+def atualizar_facetas_salvo(sender, instance, **kwargs):
+    anteriores = instance.__dict__.pop("_facetas_anteriores", None)
+    # Com campo adiado (changelist com defer) relê a linha já gravada.
+    atuais = retrato(instance) or retrato_gravado(instance)
+    atualizar_facetas(sender, [(anteriores, atuais)])
+
+
+@receiver(pre_delete, sender=Desligamento)
+@receiver(pre_delete, sender=Admissao)
+@receiver(pre_delete, sender=Distrato)
+def guardar_facetas_excluidas(sender, instance, **kwargs):
+    # No post_delete a linha já não existe para reler os campos adiados.
+    instance._facetas_excluidas = retrato(instance) or retrato_gravado(instance)
+
+
+@receiver(post_delete, sender=Desligamento)
+@receiver(post_delete, sender=Admissao)
+@receiver(post_delete, sender=Distrato)
+def atualizar_facetas_excluido(sender, instance, **kwargs):
+    atualizar_facetas(sender, [(instance.__dict__.pop("_facetas_excluidas", None), None)])
+
+
+# ==========================================================
+#   FECHAMENTO E CACHE DA HIERARQUIA
+# ==========================================================
+@receiver(post_save, sender=Hierarquia)
+@receiver(post_delete, sender=Hierarquia)
+def atualizar_fechamento_hierarquia(sender, **kwargs):
+    # Só depois do commit: antes disso os outros workers ainda leem o
+    # fechamento antigo e o guardariam no cache sob a versão nova.
+    transaction.on_commit(_reconstruir_e_invalidar)
+
+
+def _reconstruir_e_invalidar():
+    reconstruir_fechamento()
+    invalidar_hierarquia()
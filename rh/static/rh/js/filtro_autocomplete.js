@@ -0,0 +1,34 @@
+// Filtros com autocomplete do changelist (rh.admin.FiltroAutocomplete).
+// O select só tem o valor escolhido; as opções vêm do endpoint JSON por prefixo.
+window.addEventListener("load", function () {
+    "use strict";
+    var $ = window.jQuery || (window.django && window.django.jQuery);
+    if (!$ || !$.fn.select2) {
+        return;
+    }
+
+    $(".rh-filtro-autocomplete").each(function () {
+        var $select = $(this);
+        $select.select2({
+            width: "100%",
+            allowClear: true,
+            placeholder: $select.data("placeholder"),
+            ajax: {
+                url: $select.data("url"),
+                dataType: "json",
+                delay: 250,
+                data: function (params) {
+                    return {q: params.term || ""};
+                },
+            },
+        });
+        // Sem valor, o parâmetro não vai na URL (senão filtraria por "").
+        $select.on("change", function () {
+            if ($select.val()) {
+                $select.attr("name", $select.data("parametro"));
+            } else {
+                $select.removeAttr("name");
+            }
+        });
+    });
+});
@@ -1,3 +1,1470 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import zipfile
+from datetime import date
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.messages import get_messages
+from django.contrib.auth.models import Group, Permission, User
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from openpyxl import Workbook, load_workbook
+from openpyxl.workbook.defined_name import DefinedName
+
+from .cache import LocMemCacheLimitado
+from .models import Desligamento, Admissao, Distrato, Hierarquia, HierarquiaFechamento
+from .services.autocomplete import opcoes_filtro
+from .services.benchmark import executar_benchmark
+from .services.benchmark_edicao import executar_benchmark_edicao
+from .services.busca import instalar_indices_busca
+from .services.dossie import localizar_registros
+from .services.hierarquia import calcular_fechamento, reconstruir_fechamento, verificar_fechamento
+from .services.facetas import contagens_facetas, reconciliar
+from .services.excel import MOTOR_OPENPYXL, MOTOR_ZIP, renderizar
+from .services.exportacao import chave_cache
+from .services.mapeamentos import (
+    MAPEAMENTO_ADMISSAO,
+    MAPEAMENTO_DESLIGAMENTO,
+    MAPEAMENTO_DISTRATO,
+    Campo,
+    Mapeamento,
+    mapeamento_para,
+)
+from .services.modelos_excel import MODELO_ADMISSAO, aquecer_modelos, caminho_otimizado, obter_modelo
+from .services.otimizacao_modelos import RelatorioOtimizacao, otimizar, recomprimir_midia, verificar
+from .services.limites import limite_do_usuario
+from .services.permission import (
+    GRUPO_COORDENADOR,
+    GRUPO_RH,
+    eh_rh,
+    filtrar_visiveis,
+    papel_do_usuario,
+    users_visiveis_para,
+    versao_hierarquia,
+)
+from .services.pre_render import agendar_pre_render, caminho_relativo, pre_renderizar
+from .services import coalescencia, limites, render_paralelo
+from .services.render_paralelo import encerrar_pool, renderizar_lote
+
+
+def desligamento_exemplo(**kwargs):
+    dados = dict(
+        codigo="1234", nome="José & <Filho>", contato="(85) 99999-0000",
+        admissao=date(2023, 2, 1), demissao=date(2025, 8, 30),
+        area_atuacao="Fortaleza - Centro", motivo="Troca de rota\nnovo código 4321",
+        tablet=True, chip_voz=True, substituto=True,
+    )
+    dados.update(kwargs)
+    return Desligamento(**dados)
+
+
+def admissao_exemplo(**kwargs):
+    dados = dict(
+        codigo="777", nome="Maria da Conceição", nascimento=date(1990, 5, 17),
+        naturalidade="Sobral", cpf="123.456.789-09", email="maria@exemplo.com",
+        data_admissao=date(2025, 9, 1), cargo="RCA", substituicao=True,
+        supervisor_responsavel="Carlos",
+    )
+    dados.update(kwargs)
+    return Admissao(**dados)
+
+
+def distrato_exemplo(**kwargs):
+    dados = dict(
+        id=42, nome="Pedro Álvares", cpf="98765432100", rg="2000123",
+        data_admissao=date(2020, 1, 10), data_demissao=date(2025, 7, 31),
+        total_geral=Decimal("15432.10"), total_ultimos_3_meses=Decimal("2100.00"),
+        banco="Caixa", agencia="1234", conta_corrente="998877",
+    )
+    dados.update(kwargs)
+    return Distrato(**dados)
+
+
+CASOS = (
+    (MAPEAMENTO_DESLIGAMENTO, desligamento_exemplo),
+    (MAPEAMENTO_ADMISSAO, admissao_exemplo),
+    (MAPEAMENTO_DISTRATO, distrato_exemplo),
+)
+
+
+def estilo(celula):
+    # style_id muda porque o openpyxl renumera os estilos ao salvar.
+    return tuple(repr(getattr(celula, atributo)) for atributo in (
+        "font", "fill", "border", "alignment", "number_format", "protection",
+    ))
+
+
+def renderizar_bytes(modelo_path, valores, motor):
+    saida = io.BytesIO()
+    renderizar(modelo_path, valores, saida, motor)
+    return saida.getvalue()
+
+
+class ModelosExcelTests(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.copia = os.path.join(pasta.name, os.path.basename(MAPEAMENTO_DESLIGAMENTO.modelo_path))
+        shutil.copy(MAPEAMENTO_DESLIGAMENTO.modelo_path, self.copia)
+
+    def avancar_mtime(self):
+        stat = os.stat(self.copia)
+        os.utime(self.copia, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_recarrega_quando_o_arquivo_muda(self):
+        modelo = obter_modelo(self.copia)
+        self.assertIs(obter_modelo(self.copia), modelo)
+
+        # Só tocado: mesma assinatura de conteúdo, o parse é reaproveitado.
+        self.avancar_mtime()
+        self.assertIs(obter_modelo(self.copia), modelo)
+
+        wb = load_workbook(self.copia)
+        wb.active["A1"] = "Modelo novo"
+        wb.save(self.copia)
+        self.avancar_mtime()
+        novo = obter_modelo(self.copia)
+        self.assertIsNot(novo, modelo)
+        self.assertNotEqual(novo.hash, modelo.hash)
+        self.assertEqual(novo.novo_workbook().active["A1"].value, "Modelo novo")
+
+    def test_cada_workbook_e_uma_copia(self):
+        modelo = obter_modelo(self.copia)
+        original = modelo.novo_workbook().active["B6"].value
+        sujo = modelo.novo_workbook()
+        sujo.active["B6"] = "preenchido por outra requisição"
+        self.assertEqual(modelo.novo_workbook().active["B6"].value, original)
+
+    def test_aquecimento_so_do_motor_configurado(self):
+        aquecer_modelos([self.copia], motor=MOTOR_ZIP)
+        modelo = obter_modelo(self.copia)
+        self.assertIsNotNone(modelo._pacote)
+        self.assertIsNone(modelo._workbook_serializado)
+
+
+class MotorZipTests(SimpleTestCase):
+    def test_mesmo_resultado_que_openpyxl(self):
+        for mapeamento, exemplo in CASOS:
+            modelo_path = mapeamento.modelo_path
+            with self.subTest(modelo=mapeamento.nome):
+                valores = mapeamento.valores(exemplo())
+                via_zip = load_workbook(io.BytesIO(renderizar_bytes(modelo_path, valores, MOTOR_ZIP)))
+                via_openpyxl = load_workbook(io.BytesIO(renderizar_bytes(modelo_path, valores, MOTOR_OPENPYXL)))
+
+                self.assertEqual(via_zip.active.title, via_openpyxl.active.title)
+                for celula in valores:
+                    self.assertEqual(via_zip.active[celula].value, via_openpyxl.active[celula].value, celula)
+                    self.assertEqual(estilo(via_zip.active[celula]), estilo(via_openpyxl.active[celula]), celula)
+
+    def test_demais_partes_copiadas_sem_alteracao(self):
+        for mapeamento, exemplo in CASOS:
+            modelo_path = mapeamento.modelo_path
+            with self.subTest(modelo=mapeamento.nome):
+                pacote = obter_modelo(modelo_path).pacote_xlsx()
+                original = zipfile.ZipFile(modelo_path)
+                gerado = zipfile.ZipFile(io.BytesIO(
+                    renderizar_bytes(modelo_path, mapeamento.valores(exemplo()), MOTOR_ZIP)
+                ))
+
+                self.assertIsNone(gerado.testzip())
+                self.assertEqual(original.namelist(), gerado.namelist())
+                alteradas = {pacote.caminho_workbook, pacote.caminho_planilha, pacote.caminho_sst}
+                for nome in original.namelist():
+                    if nome not in alteradas:
+                        self.assertEqual(original.read(nome), gerado.read(nome), nome)
+
+    def test_celula_inexistente_no_modelo(self):
+        saida = renderizar_bytes(MODELO_ADMISSAO, {"Z99": "extra", "H3": 10}, MOTOR_ZIP)
+        ws = load_workbook(io.BytesIO(saida)).active
+        self.assertEqual(ws["Z99"].value, "extra")
+        self.assertEqual(ws["H3"].value, 10)
+
+
+class MapeamentoTests(SimpleTestCase):
+    def test_valores_formatados(self):
+        valores = MAPEAMENTO_DESLIGAMENTO.valores(desligamento_exemplo(criado_por=None))
+        self.assertEqual(valores["B3"], "—")
+        self.assertEqual(valores["E3"], "30/08/2025")
+        self.assertEqual(valores["A13"], "SIM")
+        self.assertEqual(valores["A10"], "NÃO")
+        self.assertEqual(valores["C6"], "(85) 99999-0000")
+
+        valores = MAPEAMENTO_DISTRATO.valores(distrato_exemplo(total_ultimos_3_meses=None, telefone=None))
+        self.assertEqual(valores["B16"], 0)
+        self.assertEqual(valores["C28"], "")
+
+    def test_registro_por_modelo(self):
+        self.assertIs(mapeamento_para(admissao_exemplo()), MAPEAMENTO_ADMISSAO)
+        self.assertEqual(MAPEAMENTO_ADMISSAO.nome_arquivo(admissao_exemplo()), "admissao_777.xlsx")
+        self.assertEqual(MAPEAMENTO_DISTRATO.nome_arquivo(distrato_exemplo()), "distrato_42.xlsx")
+
+    def test_celula_repetida(self):
+        with self.assertRaises(ValueError):
+            Mapeamento("teste", MODELO_ADMISSAO, [Campo("A1", "nome"), Campo("A1", "codigo")])
+
+
+class ExportacaoLoteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rh = User.objects.create_user("rh", password="x", is_staff=True)
+        cls.rh.groups.add(Group.objects.create(name=GRUPO_RH))
+        cls.rh.user_permissions.add(*Permission.objects.filter(content_type__app_label="rh"))
+        cls.supervisor = User.objects.create_user("sup", password="x", is_staff=True)
+        cls.supervisor.user_permissions.add(*Permission.objects.filter(content_type__app_label="rh"))
+        cls.desligamentos = [
+            Desligamento.objects.create(codigo=str(i), nome=f"RCA {i}", area_atuacao="Centro", criado_por=cls.supervisor)
+            for i in range(3)
+        ]
+        Desligamento.objects.create(codigo="0", nome="Repetido", area_atuacao="Centro", criado_por=cls.rh)
+
+    def exportar(self, usuario, ids):
+        self.client.force_login(usuario)
+        return self.client.post(reverse("admin:rh_desligamento_changelist"), {
+            "action": "exportar_selecionados",
+            ACTION_CHECKBOX_NAME: [str(pk) for pk in ids],
+        })
+
+    def test_zip_com_um_arquivo_por_registro(self):
+        ids = Desligamento.objects.values_list("pk", flat=True)
+        response = self.exportar(self.rh, ids)
+
+        self.assertEqual(response["Content-Type"], "application/zip")
+        arquivo = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(sorted(arquivo.namelist()), [
+            "desligamento_0.xlsx", "desligamento_0_2.xlsx", "desligamento_1.xlsx", "desligamento_2.xlsx",
+        ])
+        ws = load_workbook(io.BytesIO(arquivo.read("desligamento_1.xlsx"))).active
+        self.assertEqual(ws["B6"].value, "RCA 1")
+
+    def test_sem_permissao_de_exportar(self):
+        response = self.exportar(self.supervisor, [self.desligamentos[0].pk])
+        self.assertNotEqual(response.get("Content-Type"), "application/zip")
+
+
+class RenderParaleloTests(SimpleTestCase):
+    def tearDown(self):
+        encerrar_pool()
+
+    def tarefas(self, quantidade):
+        for i in range(quantidade):
+            registro = desligamento_exemplo(codigo=str(i), nome=f"RCA {i}")
+            yield (
+                MAPEAMENTO_DESLIGAMENTO.nome_arquivo(registro),
+                MAPEAMENTO_DESLIGAMENTO.modelo_path,
+                MAPEAMENTO_DESLIGAMENTO.valores(registro),
+            )
+
+    def test_pool_preserva_ordem(self):
+        resultados = list(renderizar_lote(self.tarefas(12), processos=2, chunksize=2, minimo=4))
+
+        self.assertEqual([nome for nome, _ in resultados], [f"desligamento_{i}.xlsx" for i in range(12)])
+        for i, (_, conteudo) in enumerate(resultados):
+            self.assertEqual(load_workbook(io.BytesIO(conteudo)).active["B6"].value, f"RCA {i}")
+
+    def test_lote_pequeno_em_serie(self):
+        resultados = list(renderizar_lote(self.tarefas(3), processos=2, minimo=4))
+        self.assertEqual(len(resultados), 3)
+        self.assertIsNone(render_paralelo._executor)
+
+    @override_settings(RH_EXCEL_POOL_OCIOSO=0.5)
+    def test_pool_encerrado_quando_ocioso(self):
+        list(renderizar_lote(self.tarefas(4), processos=2, chunksize=2, minimo=4))
+        timer = render_paralelo._timer
+        self.assertIsNotNone(render_paralelo._executor)
+        timer.join(5)
+        self.assertIsNone(render_paralelo._executor)
+
+
+class RelatorioTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rh = User.objects.create_user("rh", password="x", is_staff=True)
+        cls.rh.groups.add(Group.objects.create(name=GRUPO_RH))
+        cls.rh.user_permissions.add(*Permission.objects.filter(content_type__app_label="rh"))
+        Admissao.objects.create(codigo="10", nome="Ana", cpf="111", status="pendente", senha_gov="segredo", criado_por=cls.rh)
+        Admissao.objects.create(codigo="11", nome="Bruno", cpf="222", status="confirmado", criado_por=cls.rh)
+
+    def setUp(self):
+        self.client.force_login(self.rh)
+
+    def test_xlsx_respeita_filtros_do_changelist(self):
+        response = self.client.get(reverse("admin:rh_admissao_relatorio"), {
+            "formato": "xlsx", "status__exact": "pendente",
+        })
+        ws = load_workbook(io.BytesIO(b"".join(response.streaming_content))).active
+        linhas = list(ws.iter_rows(values_only=True))
+
+        self.assertEqual(len(linhas), 2)
+        self.assertIn("Nome", linhas[0])
+        self.assertIn("Ana", linhas[1])
+        self.assertNotIn("segredo", linhas[1])
+
+    def test_csv_com_colunas_escolhidas(self):
+        response = self.client.get(reverse("admin:rh_admissao_relatorio"), {
+            "formato": "csv", "colunas": "codigo,nome,status,criado_por", "o": "1",
+        })
+        conteudo = b"".join(response.streaming_content).decode("utf-8-sig").splitlines()
+        self.assertEqual(conteudo, [
+            "Código RCA;Nome;Status;Criado por",
+            "10;Ana;Pendente;rh",
+            "11;Bruno;Confirmado;rh",
+        ])
+
+    def test_coluna_invalida(self):
+        response = self.client.get(reverse("admin:rh_admissao_relatorio"), {"colunas": "senha_gov"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_filtro_invalido_volta_ao_changelist(self):
+        response = self.client.get(reverse("admin:rh_admissao_relatorio"), {"data_admissao__gte": "ontem"})
+        self.assertRedirects(response, reverse("admin:rh_admissao_changelist"), fetch_redirect_response=False)
+        self.assertEqual([str(m) for m in get_messages(response.wsgi_request)], ["Filtros inválidos para o relatório."])
+
+
+class ExportacaoIndividualTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rh = User.objects.create_user("rh", password="x", is_staff=True)
+        cls.rh.groups.add(Group.objects.create(name=GRUPO_RH))
+        cls.rh.user_permissions.add(*Permission.objects.filter(content_type__app_label="rh"))
+        cls.desligamento = Desligamento.objects.create(
+            codigo="55", nome="Carla", area_atuacao="Norte", criado_por=cls.rh,
+        )
+
+    def setUp(self):
+        caches["exportacoes"].clear()
+        self.client.force_login(self.rh)
+        self.url = reverse("admin:rh_desligamento_exportar_excel_individual", args=[self.desligamento.pk])
+
+    def test_etag_e_304(self):
+        primeira = self.client.get(self.url)
+        self.assertEqual(primeira.status_code, 200)
+        self.assertTrue(primeira["ETag"])
+        conteudo = b"".join(primeira.streaming_content)
+        self.assertEqual(int(primeira["Content-Length"]), len(conteudo))
+        self.assertEqual(load_workbook(io.BytesIO(conteudo)).active["B6"].value, "Carla")
+
+        segunda = self.client.get(self.url, HTTP_IF_NONE_MATCH=primeira["ETag"])
+        self.assertEqual(segunda.status_code, 304)
+
+    def test_salvar_invalida_cache_e_muda_etag(self):
+        primeira = self.client.get(self.url)
+        self.assertIsNotNone(caches["exportacoes"].get(chave_cache(self.desligamento)))
+
+        self.desligamento.status = "confirmado"
+        self.desligamento.nome = "Carla Souza"
+        self.desligamento.save()
+        self.assertIsNone(caches["exportacoes"].get(chave_cache(self.desligamento)))
+
+        segunda = self.client.get(self.url, HTTP_IF_NONE_MATCH=primeira["ETag"])
+        self.assertEqual(segunda.status_code, 200)
+        self.assertNotEqual(segunda["ETag"], primeira["ETag"])
+        self.assertEqual(load_workbook(io.BytesIO(b"".join(segunda.streaming_content))).active["B6"].value, "Carla Souza")
+
+
+class CacheLimitadoTests(SimpleTestCase):
+    def test_orcamento_total_em_bytes(self):
+        cache = LocMemCacheLimitado("teste-limitado", {"OPTIONS": {"MAX_BYTES": 10_000}})
+        for i in range(5):
+            cache.set(f"k{i}", b"x" * 3000)
+            cache.get("k0")  # k0 sempre usado: nunca é o LRU
+        self.assertLessEqual(cache.tamanho_bytes, 10_000)
+        self.assertIsNotNone(cache.get("k0"))
+        self.assertIsNotNone(cache.get("k4"))
+        self.assertIsNone(cache.get("k1"))
+
+        cache.set("grande", b"x" * 20_000)  # maior que o orçamento inteiro: não entra
+        self.assertIsNone(cache.get("grande"))
+        self.assertIsNotNone(cache.get("k4"))
+
+    def test_settings_usam_o_backend_limitado(self):
+        self.assertIsInstance(caches["exportacoes"], LocMemCacheLimitado)
+
+
+class PreRenderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rh = User.objects.create_user("rh", password="x", is_staff=True)
+        cls.rh.groups.add(Group.objects.create(name=GRUPO_RH))
+        cls.rh.user_permissions.add(*Permission.objects.filter(content_type__app_label="rh"))
+        cls.admissao = Admissao.objects.create(codigo="90", nome="Davi", cpf="333", criado_por=cls.rh)
+
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        configuracao = override_settings(RH_EXPORT_PRE_RENDER=True, RH_EXPORT_PRE_RENDER_DIR=pasta.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        caches["exportacoes"].clear()
+        self.client.force_login(self.rh)
+
+    def test_agenda_apos_commit(self):
+        with mock.patch("rh.services.pre_render._executor") as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                agendar_pre_render(self.admissao)
+        executor.submit.assert_called_once()
+
+    def test_view_serve_arquivo_pre_renderizado(self):
+        caminho = pre_renderizar("rh.Admissao", self.admissao.pk)
+        self.assertTrue(os.path.exists(caminho))
+
+        url = reverse("admin:rh_admissao_exportar_excel_individual", args=[self.admissao.pk])
+        with mock.patch("rh.services.exportacao.obter_arquivo") as renderizacao:
+            response = self.client.get(url)
+        renderizacao.assert_not_called()
+        self.assertEqual(int(response["Content-Length"]), os.path.getsize(caminho))
+        self.assertEqual(load_workbook(io.BytesIO(b"".join(response.streaming_content))).active["B6"].value, "Davi")
+
+        # Registro alterado: a digital muda e a view volta a renderizar na hora.
+        Admissao.objects.filter(pk=self.admissao.pk).update(nome="Davi Lima")
+        response = self.client.get(url)
+        self.assertEqual(load_workbook(io.BytesIO(b"".join(response.streaming_content))).active["B6"].value, "Davi Lima")
+
+    def test_arquivo_apagado_pela_limpeza_renderiza_na_hora(self):
+        url = reverse("admin:rh_admissao_exportar_excel_individual", args=[self.admissao.pk])
+        sumido = os.path.join(settings.RH_EXPORT_PRE_RENDER_DIR, "sumido.xlsx")
+        with mock.patch("rh.services.exportacao.arquivo_pre_renderizado", return_value=sumido):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(load_workbook(io.BytesIO(b"".join(response.streaming_content))).active["B6"].value, "Davi")
+
+    def test_offload_para_o_proxy(self):
+        caminho = pre_renderizar("rh.Admissao", self.admissao.pk)
+        url = reverse("admin:rh_admissao_exportar_excel_individual", args=[self.admissao.pk])
+
+        with self.settings(RH_EXPORT_SENDFILE="X-Accel-Redirect", RH_EXPORT_SENDFILE_PREFIXO="/internas/"):
+            response = self.client.get(url)
+        self.assertEqual(response["X-Accel-Redirect"], "/internas/" + caminho_relativo(caminho))
+        self.assertEqual(response.content, b"")
+
+
+class CoalescenciaTests(SimpleTestCase):
+    def setUp(self):
+        coalescencia.zerar_estatisticas()
+
+    def test_requisicoes_simultaneas_renderizam_uma_vez(self):
+        dentro = threading.Event()
+        liberar = threading.Event()
+        chamadas = []
+
+        def renderizar():
+            chamadas.append(1)
+            dentro.set()
+            liberar.wait(5)
+            return b"xlsx"
+
+        resultados = []
+
+        def requisicao():
+            resultados.append(coalescencia.executar_uma_vez("k", renderizar))
+
+        lider = threading.Thread(target=requisicao)
+        lider.start()
+        dentro.wait(5)
+
+        # Conta quem ficou esperando o líder antes de liberá-lo.
+        esperando = threading.Semaphore(0)
+        evento = coalescencia._voos["k"].evento
+        wait_original = evento.wait
+
+        def wait(timeout=None):
+            esperando.release()
+            return wait_original(timeout)
+
+        evento.wait = wait
+        seguidores = [threading.Thread(target=requisicao) for _ in range(4)]
+        for thread in seguidores:
+            thread.start()
+        for _ in seguidores:
+            self.assertTrue(esperando.acquire(timeout=5))
+        liberar.set()
+        for thread in [lider, *seguidores]:
+            thread.join()
+
+        self.assertEqual(resultados, [b"xlsx"] * 5)
+        self.assertEqual(len(chamadas), 1)
+        self.assertEqual(coalescencia.estatisticas()["renderizados"], 1)
+        self.assertEqual(coalescencia.estatisticas()["coalescidos"], 4)
+
+    def test_erro_do_lider_nao_e_compartilhado(self):
+        with self.assertRaises(ValueError):
+            coalescencia.executar_uma_vez("k", mock.Mock(side_effect=ValueError))
+        self.assertEqual(coalescencia.executar_uma_vez("k", lambda: b"ok"), b"ok")
+        self.assertNotIn("k", coalescencia._voos)
+
+    def test_entre_processos_reaproveita_resultado_compartilhado(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        renderizar = mock.Mock(return_value=b"novo")
+        with override_settings(RH_EXPORT_COALESCER_ENTRE_PROCESSOS=True, RH_EXPORT_LOCK_DIR=pasta.name):
+            resultado = coalescencia.executar_uma_vez("k", renderizar, buscar=lambda: b"de outro worker")
+        self.assertEqual(resultado, b"de outro worker")
+        renderizar.assert_not_called()
+        self.assertEqual(coalescencia.estatisticas()["coalescidos_entre_processos"], 1)
+
+    def test_pasta_de_locks_limitada(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        with override_settings(RH_EXPORT_COALESCER_ENTRE_PROCESSOS=True, RH_EXPORT_LOCK_DIR=pasta.name,
+                               RH_EXPORT_LOCK_FAIXAS=4):
+            for i in range(50):
+                coalescencia.executar_uma_vez(f"rh.desligamento:{i}:digital", lambda: b"xlsx")
+        self.assertLessEqual(len(os.listdir(pasta.name)), 4)
+
+
+class BenchmarkTests(SimpleTestCase):
+    def test_relatorio_por_formulario_e_cenario(self):
+        relatorio = executar_benchmark(formularios=["admissao"], quantidade=2, repeticoes=2, processos=1)
+        cenarios = [r["cenario"] for r in relatorio["resultados"]]
+        self.assertEqual(cenarios, ["individual_zip", "individual_openpyxl", "lote_serie", "cache"])
+        for resultado in relatorio["resultados"]:
+            self.assertLessEqual(resultado["p50_ms"], resultado["p95_ms"])
+            self.assertGreater(resultado["pico_memoria_bytes"], 0)
+            self.assertGreater(resultado["tamanho_bytes"], 0)
+
+    def test_comando_grava_json_e_acusa_regressao(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        saida = os.path.join(pasta.name, "atual.json")
+        anterior = os.path.join(pasta.name, "anterior.json")
+        argumentos = ["--formularios", "distrato", "--motores", "zip", "--registros", "2", "--repeticoes", "2",
+                      "--processos", "1", "--saida", saida]
+        call_command("benchmark_exportacao", *argumentos, stderr=io.StringIO())
+
+        with open(saida, encoding="utf-8") as arquivo:
+            relatorio = json.load(arquivo)
+        self.assertEqual({r["cenario"] for r in relatorio["resultados"]}, {"individual_zip", "lote_serie", "cache"})
+
+        # Uma execução "anterior" impossivelmente rápida faz tudo parecer regressão.
+        for resultado in relatorio["resultados"]:
+            resultado["p95_ms"] = 1e-6
+        with open(anterior, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo)
+        with self.assertRaises(CommandError):
+            call_command("benchmark_exportacao", *argumentos, "--comparar", anterior, stderr=io.StringIO())
+
+
+class OtimizacaoModelosTests(SimpleTestCase):
+    def test_remove_aba_vazia_e_nome_sem_uso(self):
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Dados"
+        ws["A1"] = 10
+        ws["B1"] = "=Taxa*A1"
+        wb.create_sheet("Vazia")
+        wb.defined_names["Taxa"] = DefinedName("Taxa", attr_text="Dados!$A$1")
+        wb.defined_names["Sobra"] = DefinedName("Sobra", attr_text="Dados!$C$1")
+        saida = io.BytesIO()
+        wb.save(saida)
+
+        otimizado, relatorio = otimizar(saida.getvalue())
+
+        self.assertEqual(relatorio.planilhas_removidas, ["Vazia"])
+        self.assertEqual(relatorio.nomes_removidos, ["Sobra"])
+        resultado = load_workbook(io.BytesIO(otimizado))
+        self.assertEqual(resultado.sheetnames, ["Dados"])
+        self.assertEqual(list(resultado.defined_names), ["Taxa"])
+        verificar(saida.getvalue(), otimizado, [{"C3": "x", "A1": 5}])
+
+    def test_perfil_icc_mantido_por_padrao(self):
+        def segmento(marcador, corpo):
+            return bytes([0xFF, marcador]) + struct.pack(">H", len(corpo) + 2) + corpo
+
+        icc = segmento(0xE2, b"ICC_PROFILE\0" + b"p" * 64)
+        jpeg = b"\xff\xd8" + segmento(0xE1, b"Exif\0\0" + b"e" * 64) + icc + b"\xff\xda\x00\x02dados\xff\xd9"
+
+        class Pacote:
+            def __init__(self):
+                self.partes = {"xl/media/image1.jpeg": jpeg}
+
+        for remover_icc, manteve in ((False, True), (True, False)):
+            pacote = Pacote()
+            recomprimir_midia(pacote, RelatorioOtimizacao(0), remover_icc=remover_icc)
+            resultado = pacote.partes["xl/media/image1.jpeg"]
+            self.assertNotIn(b"Exif", resultado)
+            self.assertEqual(icc in resultado, manteve)
+
+    def test_comando_grava_otimizado_e_exportacao_passa_a_usar(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        copia = os.path.join(pasta.name, os.path.basename(MAPEAMENTO_DESLIGAMENTO.modelo_path))
+        shutil.copy(MAPEAMENTO_DESLIGAMENTO.modelo_path, copia)
+
+        otimizado = caminho_otimizado(copia)
+        # Quase todo o tamanho do modelo é o perfil ICC do logo: só sai com a opção explícita.
+        call_command("otimizar_modelos", copia, stdout=io.StringIO())
+        self.assertLess(os.path.getsize(otimizado), os.path.getsize(copia))
+        self.assertGreater(os.path.getsize(otimizado), os.path.getsize(copia) / 10)
+        call_command("otimizar_modelos", copia, "--remover-perfil-cor", stdout=io.StringIO())
+        self.assertLess(os.path.getsize(otimizado), os.path.getsize(copia) / 10)
+        self.assertEqual(obter_modelo(copia).assinatura[0], otimizado)
+        valores = MAPEAMENTO_DESLIGAMENTO.valores(desligamento_exemplo())
+        self.assertEqual(load_workbook(io.BytesIO(renderizar_bytes(copia, valores, MOTOR_ZIP))).active["B6"].value,
+                         valores["B6"])
+
+    def test_original_alterado_depois_de_otimizar(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        copia = os.path.join(pasta.name, os.path.basename(MAPEAMENTO_DESLIGAMENTO.modelo_path))
+        shutil.copy(MAPEAMENTO_DESLIGAMENTO.modelo_path, copia)
+        call_command("otimizar_modelos", copia, stdout=io.StringIO())
+        self.assertEqual(obter_modelo(copia).assinatura[0], caminho_otimizado(copia))
+
+        wb = load_workbook(copia)
+        wb.active["A1"] = "Formulário revisado"
+        wb.save(copia)
+        with self.assertLogs("rh.services.modelos_excel", "WARNING"):
+            self.assertEqual(obter_modelo(copia).assinatura[0], copia)
+        self.assertEqual(load_workbook(io.BytesIO(obter_modelo(copia).conteudo)).active["A1"].value, "Formulário revisado")
+
+        call_command("otimizar_modelos", copia, stdout=io.StringIO())
+        self.assertEqual(obter_modelo(copia).assinatura[0], caminho_otimizado(copia))
+
+
+class DossieTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rh = User.objects.create_user("rh", password="x", is_staff=True)
+        cls.rh.groups.add(Group.objects.create(name=GRUPO_RH))
+        cls.rh.user_permissions.add(*Permission.objects.filter(content_type__app_label="rh"))
+        cls.admissao = Admissao.objects.create(codigo="321", nome="Ana", cpf="123.456.789-09", criado_por=cls.rh)
+        cls.desligamento = Desligamento.objects.create(codigo="321", nome="Ana", area_atuacao="Sul", criado_por=cls.rh)
+        # Distrato gravado sem máscara: casa pelo CPF normalizado.
+        cls.distrato = Distrato.objects.create(nome="Ana", cpf="12345678909", criado_por=cls.rh)
+        Desligamento.objects.create(codigo="999", nome="Outro", area_atuacao="Sul", criado_por=cls.rh)
+
+    def setUp(self):
+        caches["default"].clear()
+        self.client.force_login(self.rh)
+
+    def test_url_a_partir_de_qualquer_formulario(self):
+        for obj in (self.admissao, self.desligamento, self.distrato):
+            url = reverse(f"admin:rh_{obj._meta.model_name}_exportar_dossie", args=[obj.pk])
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("dossie_321.xlsx", response["Content-Disposition"])
+            wb = load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+            self.assertEqual(wb.sheetnames[:2], ["Admissão", "Desligamento"])
+            self.assertIn("Rescisão-RCA", wb.sheetnames)
+            self.assertEqual(wb["Desligamento"]["B6"].value, "Ana")
+            self.assertEqual(wb["Rescisão-RCA"]["E5"].value, "12345678909")
+
+    def test_registro_de_origem_entra_no_dossie(self):
+        antigo = Desligamento.objects.create(codigo="77", nome="Pessoa antiga", area_atuacao="Sul", criado_por=self.rh)
+        Desligamento.objects.create(codigo="77", nome="Pessoa nova", area_atuacao="Sul", criado_por=self.rh)
+        response = self.client.get(reverse("admin:rh_desligamento_exportar_dossie", args=[antigo.pk]))
+        wb = load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(wb["Desligamento"]["B6"].value, "Pessoa antiga")
+
+    def test_consultas_indexadas(self):
+        # Grupos do usuário (cache frio) + uma consulta por formulário (codigo/cpf indexados).
+        with self.assertNumQueries(4):
+            registros = localizar_registros(self.rh, cpf="12345678909")
+        self.assertEqual(registros[Desligamento], self.desligamento)
+
+    def test_acao_com_varios_rcas_gera_zip(self):
+        response = self.client.post(reverse("admin:rh_desligamento_changelist"), {
+            "action": "exportar_dossie_selecionados",
+            ACTION_CHECKBOX_NAME: [str(pk) for pk in Desligamento.objects.values_list("pk", flat=True)],
+        })
+        self.assertEqual(response["Content-Type"], "application/zip")
+        arquivo = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(sorted(arquivo.namelist()), ["dossie_321.xlsx", "dossie_999.xlsx"])
+        self.assertEqual(load_workbook(io.BytesIO(arquivo.read("dossie_999.xlsx"))).sheetnames, ["Desligamento"])
+
+    def test_acao_com_registro_sem_chave_nao_trunca_o_zip(self):
+        sem_cpf = Distrato.objects.create(nome="Sem CPF", criado_por=self.rh)
+        outro = Distrato.objects.create(nome="Bia", cpf="98765432100", criado_por=self.rh)
+        response = self.client.post(reverse("admin:rh_distrato_changelist"), {
+            "action": "exportar_dossie_selecionados",
+            ACTION_CHECKBOX_NAME: [str(self.distrato.pk), str(sem_cpf.pk), str(outro.pk)],
+        })
+        arquivo = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(sorted(arquivo.namelist()), ["dossie_321.xlsx", "dossie_98765432100.xlsx"])
+        self.assertIn("Sem CPF", [str(m) for m in get_messages(response.wsgi_request)][0])
+
+        # Só registros sem chave: volta para a listagem com o aviso.
+        response = self.client.post(reverse("admin:rh_distrato_changelist"), {
+            "action": "exportar_dossie_selecionados", ACTION_CHECKBOX_NAME: [str(sem_cpf.pk)],
+        })
+        self.assertEqual(response.status_code, 302)
+
+
+class LimiteExportacaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.coordenador = User.objects.create_user("coord", password="x", is_staff=True)
+        cls.coordenador.groups.add(Group.objects.create(name=GRUPO_COORDENADOR))
+        cls.coordenador.user_permissions.add(*Permission.objects.filter(content_type__app_label="rh"))
+        cls.rh = User.objects.create_user("rh", password="x", is_staff=True)
+        cls.rh.groups.add(Group.objects.create(name=GRUPO_RH))
+        cls.rh.user_permissions.add(*Permission.objects.filter(content_type__app_label="rh"))
+        cls.desligamento = Desligamento.objects.create(codigo="7", nome="Rui", area_atuacao="Sul", criado_por=cls.rh)
+
+    def setUp(self):
+        caches["default"].clear()
+        self.enterContext(cache_compartilhado(self, "RH_EXPORT_LIMITE_CACHE_ALIAS"))
+        self.url = reverse("admin:rh_desligamento_exportar_excel_individual", args=[self.desligamento.pk])
+        # Meio de uma janela de 20s (2 por 6/min) e de 60s (1 por 1/min).
+        self.enterContext(mock.patch.object(limites.time, "time", return_value=1000.0))
+
+    @override_settings(RH_EXPORT_LIMITES={GRUPO_RH: (2, 6), GRUPO_COORDENADOR: (1, 1)})
+    def test_cota_por_grupo_responde_429_com_retry_after(self):
+        self.client.force_login(self.rh)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        bloqueada = self.client.get(self.url)
+        self.assertEqual(bloqueada.status_code, 429)
+        self.assertEqual(bloqueada["Retry-After"], "20")
+
+        # A cota é por usuário e o limite vem do grupo.
+        self.assertEqual(limite_do_usuario(self.coordenador), (1, 1))
+        self.assertEqual(limites.consumir(self.coordenador), 0)
+        self.assertEqual(limites.consumir(self.coordenador), 20)
+
+    @override_settings(RH_EXPORT_LIMITES={GRUPO_RH: (1, 1), GRUPO_COORDENADOR: (1, 1)})
+    def test_304_e_permissao_negada_nao_gastam_cota(self):
+        self.client.force_login(self.coordenador)
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(limites.consumir(self.coordenador), 0)
+
+        self.client.force_login(self.rh)
+        etag = self.client.get(self.url)["ETag"]
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(self.url).status_code, 429)
+
+    @override_settings(RH_EXPORT_LIMITES={GRUPO_RH: (2, 6)})
+    def test_sem_rajada_dupla_na_virada_da_janela(self):
+        relogio = limites.time.time
+        relogio.return_value = 1019.0
+        self.assertEqual([limites.consumir(self.rh) for _ in range(2)], [0, 0])
+        # Janela fixa liberaria mais 2 aqui; a anterior ainda pesa 95%.
+        relogio.return_value = 1021.0
+        self.assertEqual(limites.consumir(self.rh), 9)
+        # Metade da janela: a reposição já devolveu uma ficha, e só uma.
+        relogio.return_value = 1030.0
+        self.assertEqual(limites.consumir(self.rh), 0)
+        self.assertGreater(limites.consumir(self.rh), 0)
+
+    @override_settings(RH_EXPORT_LIMITE_CACHE_ALIAS="default")
+    def test_cache_local_do_processo_recusado(self):
+        with self.assertRaises(ImproperlyConfigured):
+            limites.consumir(self.rh)
+
+    def test_aviso_sem_cota(self):
+        with override_settings(RH_EXPORT_LIMITE_CACHE_ALIAS=""):
+            self.assertEqual([aviso.id for aviso in limites.verificar_configuracao(None)], ["rh.W001"])
+        self.assertEqual(limites.verificar_configuracao(None), [])
+
+    @override_settings(RH_EXPORT_MAX_SIMULTANEAS=1)
+    def test_teto_de_exportacoes_simultaneas(self):
+        self.client.force_login(self.rh)
+        semaforo = limites._semaforo()
+        self.assertTrue(semaforo.acquire(blocking=False))
+        try:
+            self.assertEqual(self.client.get(self.url).status_code, 429)
+        finally:
+            semaforo.release()
+
+        # Respostas em streaming só liberam a vaga quando são fechadas.
+        response = self.client.post(reverse("admin:rh_desligamento_changelist"), {
+            "action": "exportar_selecionados", ACTION_CHECKBOX_NAME: [str(self.desligamento.pk)],
+        })
+        self.assertEqual(self.client.get(self.url).status_code, 429)
+        b"".join(response.streaming_content)
+        response.close()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+def cache_compartilhado(teste, configuracao):
+    """Cache em arquivo (visível entre processos) no alias da ``configuracao``."""
+    pasta = tempfile.mkdtemp()
+    teste.addCleanup(shutil.rmtree, pasta, ignore_errors=True)
+    caches_ = {**settings.CACHES, "compartilhado": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": pasta,
+    }}
+    return override_settings(CACHES=caches_, **{configuracao: "compartilhado"})
+
+
+class PapelUsuarioTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.coordenador = User.objects.create_user("coord", password="x", is_staff=True)
+        cls.coordenador.groups.add(Group.objects.create(name=GRUPO_COORDENADOR))
+        cls.coordenador.user_permissions.add(*Permission.objects.filter(content_type__app_label="rh"))
+        cls.supervisor = User.objects.create_user("sup", password="x", is_staff=True)
+        Hierarquia.objects.create(coordenador=cls.coordenador, supervisor=cls.supervisor)
+        reconstruir_fechamento()  # os signals só reconstroem após o commit
+        for i in range(3):
+            Desligamento.objects.create(codigo=str(i), nome=f"RCA {i}", area_atuacao="Sul", criado_por=cls.supervisor)
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def consultas_de_papel(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        sqls = [consulta["sql"] for consulta in consultas.captured_queries]
+        grupos = [sql for sql in sqls if "auth_user_groups" in sql and "auth_permission" not in sql]
+        hierarquia = [sql for sql in sqls if "rh_hierarquia" in sql]
+        return len(grupos), len(hierarquia)
+
+    def test_changelist_resolve_papel_uma_vez_por_requisicao(self):
+        self.client.force_login(self.coordenador)
+        url = reverse("admin:rh_desligamento_changelist")
+        self.assertEqual(self.consultas_de_papel(url), (1, 1))
+        self.assertEqual(self.consultas_de_papel(url), (1, 1))
+
+    def test_cache_compartilhado_guarda_so_os_supervisores(self):
+        with cache_compartilhado(self, "RH_HIERARQUIA_CACHE_ALIAS"):
+            self.client.force_login(self.coordenador)
+            url = reverse("admin:rh_desligamento_changelist")
+            self.assertEqual(self.consultas_de_papel(url), (1, 1))
+            # Grupos continuam vindo do banco; os supervisores, do cache.
+            self.assertEqual(self.consultas_de_papel(url), (1, 0))
+            self.assertEqual(self.consultas_de_papel(reverse("admin:index")), (1, 0))
+
+    def test_perda_de_grupo_vale_na_hora(self):
+        rh = User.objects.create_user("rh2", password="x", is_staff=True)
+        rh.groups.add(Group.objects.create(name=GRUPO_RH))
+        with cache_compartilhado(self, "RH_HIERARQUIA_CACHE_ALIAS"):
+            self.assertTrue(eh_rh(User.objects.get(pk=rh.pk)))
+            # Mudança feita sem signals (como em outro worker sem o mesmo cache local).
+            User.groups.through.objects.filter(user=rh).delete()
+            self.assertFalse(eh_rh(User.objects.get(pk=rh.pk)))
+
+    def test_fechamento_e_versao_so_mudam_apos_o_commit(self):
+        outro = User.objects.create_user("sup2", password="x")
+        with cache_compartilhado(self, "RH_HIERARQUIA_CACHE_ALIAS"):
+            cache = caches["compartilhado"]
+            self.assertNotIn(outro.pk, papel_do_usuario(User.objects.get(pk=self.coordenador.pk)).ids_visiveis)
+            versao = versao_hierarquia(cache)
+            with self.captureOnCommitCallbacks(execute=True):
+                Hierarquia.objects.create(coordenador=self.coordenador, supervisor=outro)
+                # Outro worker lendo agora vê o fechamento antigo: precisa cair na versão antiga.
+                self.assertEqual(versao_hierarquia(cache), versao)
+                self.assertFalse(HierarquiaFechamento.objects.filter(descendente=outro).exists())
+                papel_do_usuario(User.objects.get(pk=self.coordenador.pk))
+            self.assertNotEqual(versao_hierarquia(cache), versao)
+            self.assertIn(outro.pk, papel_do_usuario(User.objects.get(pk=self.coordenador.pk)).ids_visiveis)
+
+    @override_settings(RH_HIERARQUIA_CACHE_ALIAS="default")
+    def test_cache_local_do_processo_recusado(self):
+        with self.assertRaises(ImproperlyConfigured):
+            papel_do_usuario(User.objects.get(pk=self.coordenador.pk))
+
+    def test_filtro_com_lista_literal_de_ids(self):
+        with CaptureQueriesContext(connection) as consultas:
+            total = filtrar_visiveis(Desligamento.objects.all(), self.coordenador).count()
+        self.assertEqual(total, 3)
+        self.assertNotIn('"auth_user"', consultas.captured_queries[-1]["sql"])
+
+    def test_mudancas_na_hierarquia_e_nos_grupos_invalidam_o_cache(self):
+        self.assertEqual(papel_do_usuario(self.coordenador).ids_visiveis, {self.coordenador.pk, self.supervisor.pk})
+
+        outro = User.objects.create_user("sup2", password="x")
+        with self.captureOnCommitCallbacks(execute=True):
+            ligacao = Hierarquia.objects.create(coordenador=self.coordenador, supervisor=outro)
+        coordenador = User.objects.get(pk=self.coordenador.pk)
+        self.assertIn(outro.pk, papel_do_usuario(coordenador).ids_visiveis)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ligacao.delete()
+        coordenador.groups.add(Group.objects.create(name=GRUPO_RH))
+        coordenador = User.objects.get(pk=self.coordenador.pk)
+        self.assertTrue(eh_rh(coordenador))
+        self.assertEqual(filtrar_visiveis(Desligamento.objects.all(), coordenador).count(), 3)
+
+    def test_papel_memorizado_no_usuario(self):
+        papel = papel_do_usuario(self.coordenador)
+        self.assertIs(papel_do_usuario(self.coordenador), papel)
+        with self.assertNumQueries(0):
+            self.assertFalse(eh_rh(self.coordenador))
+            self.assertEqual(papel.grupo, GRUPO_COORDENADOR)
+        self.assertEqual(set(users_visiveis_para(self.coordenador)), {self.coordenador, self.supervisor})
+
+
+class HierarquiaFechamentoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        coordenadores = Group.objects.create(name=GRUPO_COORDENADOR)
+        cls.gerente, cls.coordenador, cls.supervisor = (
+            User.objects.create_user(nome, password="x", is_staff=True) for nome in ("gerente", "coord", "sup")
+        )
+        cls.gerente.groups.add(coordenadores)
+        cls.gerente.user_permissions.add(*Permission.objects.filter(content_type__app_label="rh"))
+        cls.coordenador.groups.add(coordenadores)
+        Hierarquia.objects.create(coordenador=cls.gerente, supervisor=cls.coordenador)
+        cls.ligacao = Hierarquia.objects.create(coordenador=cls.coordenador, supervisor=cls.supervisor)
+        reconstruir_fechamento()
+        Desligamento.objects.create(codigo="1", nome="RCA", area_atuacao="Sul", criado_por=cls.supervisor)
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def test_calcula_menor_profundidade(self):
+        fechamento = calcular_fechamento([(1, 2), (2, 3), (3, 4), (1, 4), (4, 1)])
+        self.assertEqual(fechamento[(1, 3)], 2)
+        self.assertEqual(fechamento[(1, 4)], 1)
+        self.assertEqual(fechamento[(4, 3)], 3)
+        self.assertNotIn((1, 1), fechamento)
+
+    def test_gerente_ve_todos_os_niveis_abaixo(self):
+        self.assertEqual(
+            papel_do_usuario(self.gerente).ids_visiveis,
+            {self.gerente.pk, self.coordenador.pk, self.supervisor.pk},
+        )
+        self.client.force_login(self.gerente)
+        response = self.client.get(reverse("admin:rh_desligamento_changelist"))
+        self.assertEqual(response.context["cl"].result_count, 1)
+
+    def test_signals_mantem_o_fechamento(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ligacao.delete()
+        self.assertEqual(verificar_fechamento(), [])
+        gerente = User.objects.get(pk=self.gerente.pk)
+        self.assertNotIn(self.supervisor.pk, papel_do_usuario(gerente).ids_visiveis)
+
+    def test_comando_verifica_e_reconstroi(self):
+        HierarquiaFechamento.objects.filter(ancestral=self.gerente).delete()
+        with self.assertRaises(CommandError):
+            call_command("reconstruir_hierarquia", "--verificar", stdout=io.StringIO(), stderr=io.StringIO())
+
+        call_command("reconstruir_hierarquia", stdout=io.StringIO())
+        self.assertEqual(verificar_fechamento(), [])
+        self.assertEqual(
+            HierarquiaFechamento.objects.get(ancestral=self.gerente, descendente=self.supervisor).profundidade, 2
+        )
+
+
+class ChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rh = User.objects.create_user("rh", password="x", is_staff=True, is_superuser=True)
+        cls.supervisor = User.objects.create_user("sup", password="x")
+        outro = User.objects.create_user("outro", password="x")
+        for i in range(3):
+            Desligamento.objects.create(codigo=str(i), nome=f"RCA {i}", area_atuacao="Sul", criado_por=cls.supervisor)
+        Desligamento.objects.create(codigo="9", nome="RCA 9", area_atuacao="Norte", criado_por=outro)
+
+    def setUp(self):
+        caches["default"].clear()
+        self.client.force_login(self.rh)
+
+    def test_qtd_desligamentos_por_supervisor_sem_group_by(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse("admin:rh_desligamento_changelist"), {"o": "8"})
+        totais = {obj.codigo: obj.total_desligamentos for obj in response.context["cl"].result_list}
+        self.assertEqual(totais, {"0": 3, "1": 3, "2": 3, "9": 1})
+        listagem = [c["sql"] for c in consultas.captured_queries if c["sql"].startswith('SELECT "rh_desligamento"."id"')]
+        self.assertTrue(listagem)
+        self.assertNotIn("GROUP BY \"rh_desligamento\".\"id\"", listagem[-1])
+
+    def contar_consultas(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(consultas.captured_queries), [c["sql"] for c in consultas.captured_queries]
+
+    def test_changelists_com_numero_constante_de_consultas(self):
+        fabricas = {
+            Desligamento: lambda i: desligamento_exemplo(codigo=str(i), criado_por=self.supervisor),
+            Admissao: lambda i: admissao_exemplo(codigo=str(i), cpf=f"{i:011d}", criado_por=self.supervisor),
+            Distrato: lambda i: distrato_exemplo(id=None, criado_por=self.supervisor),
+        }
+        for model, fabrica in fabricas.items():
+            with self.subTest(model=model.__name__):
+                url = reverse(f"admin:rh_{model._meta.model_name}_changelist")
+                model.objects.bulk_create(fabrica(i) for i in range(1000, 1010))
+                self.client.get(url)  # aquece sessão e papel do usuário
+
+                poucos, _ = self.contar_consultas(url)
+                model.objects.bulk_create(fabrica(i) for i in range(2000, 2990))
+                muitos, sqls = self.contar_consultas(url)
+                self.assertEqual(poucos, muitos)
+
+                listagem = [sql for sql in sqls if sql.startswith(f'SELECT "rh_{model._meta.model_name}"."id"')][-1]
+                self.assertIn('INNER JOIN "auth_user"', listagem)
+                for campo in admin.site._registry[model].campos_adiados_listagem:
+                    self.assertNotIn(f'"rh_{model._meta.model_name}"."{campo}"', listagem)
+
+
+
+class IndicesChangelistTests(TestCase):
+    """Os changelists usam os índices compostos/parciais num volume realista."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.rh = User.objects.create_user("rh", password="x", is_staff=True, is_superuser=True)
+        cls.supervisores = [User.objects.create_user(f"sup{i}") for i in range(20)]
+        fabricas = (
+            (Desligamento, lambda i, **kw: desligamento_exemplo(codigo=str(i), demissao=date(2024, 1, 1 + i % 28), **kw)),
+            (Admissao, lambda i, **kw: admissao_exemplo(codigo=str(i), cpf=str(i), data_admissao=date(2024, 1, 1 + i % 28), **kw)),
+            (Distrato, lambda i, **kw: distrato_exemplo(id=None, data_demissao=date(2024, 1, 1 + i % 28), **kw)),
+        )
+        for model, fabrica in fabricas:
+            model.objects.bulk_create(
+                fabrica(i, criado_por=cls.supervisores[i % 20], status="pendente" if i % 10 == 0 else "confirmado")
+                for i in range(2000)
+            )
+
+    def setUp(self):
+        caches["default"].clear()
+        self.client.force_login(self.rh)
+
+    def plano(self, model, params):
+        tabela = model._meta.db_table
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse(f"admin:rh_{model._meta.model_name}_changelist"), params)
+        sql = [c["sql"] for c in consultas.captured_queries if c["sql"].startswith(f'SELECT "{tabela}"."id"')][-1]
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # Com poucos milhares de linhas o Postgres prefere seq scan; o que
+                # interessa aqui é se o índice é utilizável pela consulta.
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}")
+            else:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return " ".join(str(coluna) for linha in cursor.fetchall() for coluna in linha)
+
+    def test_changelists_usam_os_indices(self):
+        if connection.vendor not in ("sqlite", "postgresql"):
+            self.skipTest("EXPLAIN só conferido em SQLite e Postgres")
+        for model, prefixo in ((Desligamento, "rh_deslig"), (Admissao, "rh_admis"), (Distrato, "rh_distr")):
+            with self.subTest(model=model.__name__):
+                # Fila do RH: todos os pendentes, ordem padrão.
+                self.assertIn(f"{prefixo}_pendentes", self.plano(model, {"status__exact": "pendente"}))
+                # Filtro por supervisor + status.
+                self.assertIn(f"{prefixo}_criado_status_data", self.plano(model, {
+                    "criado_por__id__exact": self.supervisores[3].pk, "status__exact": "confirmado",
+                }))
+
+
+class PaginacaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rh = User.objects.create_user("rh", password="x", is_staff=True, is_superuser=True)
+        Desligamento.objects.bulk_create(
+            desligamento_exemplo(codigo=str(i), nome=f"RCA {i % 7}", criado_por=cls.rh) for i in range(250)
+        )
+        cls.url = reverse("admin:rh_desligamento_changelist")
+
+    def setUp(self):
+        caches["default"].clear()
+        self.client.force_login(self.rh)
+
+    def percorrer(self, params):
+        """Pks de todas as páginas seguindo o link "Próxima" e o SQL de cada página por cursor."""
+        response = self.client.get(self.url, params)
+        cl = response.context["cl"]
+        pks, sqls = [obj.pk for obj in cl.result_list], []
+        while cl.proxima_url:
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(self.url + cl.proxima_url)
+            cl = response.context["cl"]
+            self.assertIsNotNone(cl.primeira_url)
+            pks += [obj.pk for obj in cl.result_list]
+            sqls += [c["sql"] for c in consultas.captured_queries if c["sql"].startswith('SELECT "rh_desligamento"."id"')]
+        return pks, sqls
+
+    def test_keyset_percorre_tudo_sem_offset(self):
+        todos = list(Desligamento.objects.order_by("-pk").values_list("pk", flat=True))
+        for params, esperado in (
+            ({}, todos),
+            ({"o": "1"}, list(Desligamento.objects.order_by("nome", "-pk").values_list("pk", flat=True))),
+        ):
+            with self.subTest(params=params):
+                pks, sqls = self.percorrer(params)
+                self.assertEqual(pks, esperado)
+                self.assertTrue(sqls)
+                for sql in sqls:
+                    self.assertNotIn("OFFSET", sql)
+
+    def test_ultima_pagina_sem_link_vazio_quando_total_e_multiplo(self):
+        with mock.patch.object(admin.site._registry[Desligamento], "list_per_page", 50):
+            response = self.client.get(self.url)
+            cl = response.context["cl"]
+            paginas = [len(cl.result_list)]
+            while cl.proxima_url:
+                cl = self.client.get(self.url + cl.proxima_url).context["cl"]
+                paginas.append(len(cl.result_list))
+        self.assertEqual(paginas, [50] * 5)
+
+    @override_settings(RH_CHANGELIST_PAGINAS_NUMERADAS=2)
+    def test_links_numerados_limitados_com_cursor(self):
+        with mock.patch.object(admin.site._registry[Desligamento], "list_per_page", 50):
+            response = self.client.get(self.url, {"p": "2"})
+            self.assertContains(response, 'href="?p=1"')
+            self.assertNotContains(response, 'href="?p=3"')
+            cl = response.context["cl"]
+            self.assertEqual(len(cl.result_list), 50)
+            self.assertIsNotNone(cl.proxima_url)
+            self.assertRedirects(self.client.get(self.url, {"p": "3"}), f"{self.url}?e=1", fetch_redirect_response=False)
+
+            # Sem cursor (coluna nula na ordenação) as páginas continuam todas numeradas.
+            self.assertContains(self.client.get(self.url, {"o": "4"}), 'href="?o=4&p=5"')
+
+    def test_ordenacao_por_coluna_nula_continua_com_offset(self):
+        cl = self.client.get(self.url, {"o": "4"}).context["cl"]  # demissao aceita nulo
+        self.assertIsNone(cl.proxima_url)
+        self.assertTrue(cl.multi_page)
+
+    @override_settings(RH_CHANGELIST_CONTAGEM_MAXIMA=120)
+    def test_contagem_limitada(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.context["cl"].result_count, 120)
+        self.assertTrue(response.context["cl"].paginator.aproximado)
+        self.assertContains(response, "~120")
+
+    def test_contagem_so_com_pks(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(self.url, {"o": "1"})
+        contagens = [c["sql"] for c in consultas.captured_queries if c["sql"].startswith("SELECT COUNT(*)")]
+        self.assertEqual(len(contagens), 1)
+        self.assertEqual(contagens[0].count("SELECT"), 2)  # COUNT(*) FROM (SELECT id ... LIMIT)
+        self.assertNotIn("ORDER BY", contagens[0])
+        self.assertNotIn("total_desligamentos", contagens[0])
+
+    def test_cursor_invalido(self):
+        response = self.client.get(self.url, {"apos": "lixo"})
+        self.assertRedirects(response, f"{self.url}?e=1", fetch_redirect_response=False)
+
+
+class BuscaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rh = User.objects.create_user("rh", password="x", is_staff=True, is_superuser=True)
+        cls.jose = desligamento_exemplo(codigo="1234", nome="José Araújo", area_atuacao="Fortaleza - Centro", criado_por=cls.rh)
+        cls.jose.save()
+        desligamento_exemplo(codigo="9123", nome="Ana Lima", area_atuacao="Sobral", criado_por=cls.rh).save()
+        cls.maria = admissao_exemplo(criado_por=cls.rh)
+        cls.maria.save()
+        cls.distrato = distrato_exemplo(id=None, cpf="98765432100", criado_por=cls.rh)
+        cls.distrato.save()
+
+    def setUp(self):
+        caches["default"].clear()
+        self.client.force_login(self.rh)
+
+    def buscar(self, model, termo):
+        response = self.client.get(reverse(f"admin:rh_{model._meta.model_name}_changelist"), {"q": termo})
+        return {obj.pk for obj in response.context["cl"].result_list}
+
+    def test_documento_normalizado_e_sem_acento(self):
+        self.assertEqual(self.jose.busca, "jose araujo fortaleza - centro")
+        self.assertEqual(self.maria.cpf_digitos, "12345678909")
+        self.assertEqual(self.buscar(Desligamento, "ARAUJO fortal"), {self.jose.pk})
+        self.assertEqual(self.buscar(Desligamento, "josé sobral"), set())
+        self.assertEqual(self.buscar(Admissao, "conceicao"), {self.maria.pk})
+        # Termo curto demais para trigramas cai no LIKE.
+        self.assertEqual(self.buscar(Desligamento, "li"), set(Desligamento.objects.filter(nome="Ana Lima").values_list("pk", flat=True)))
+
+    def test_codigo_e_cpf_por_prefixo(self):
+        self.assertEqual(self.buscar(Desligamento, "12"), {self.jose.pk})
+        self.assertEqual(self.buscar(Admissao, "123.456"), {self.maria.pk})
+        self.assertEqual(self.buscar(Distrato, "987.654.321-00"), {self.distrato.pk})
+        self.assertEqual(self.buscar(Distrato, "654"), set())
+
+    def test_sqlite_usa_fts(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("FTS5 só no SQLite")
+        with CaptureQueriesContext(connection) as consultas:
+            self.buscar(Desligamento, "araujo")
+        self.assertTrue(any('"rh_desligamento_busca" MATCH' in c["sql"] for c in consultas.captured_queries))
+
+    def test_reindexar_apos_bulk_create_e_triggers_perdidos(self):
+        Desligamento.objects.bulk_create([desligamento_exemplo(codigo="55", nome="Célio Bulk", criado_por=self.rh)])
+        self.assertEqual(self.buscar(Desligamento, "celio"), set())
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute('DROP TRIGGER "rh_desligamento_busca_au"')
+
+        call_command("reindexar_busca", stdout=io.StringIO())
+        celio = Desligamento.objects.get(codigo="55")
+        self.assertEqual(self.buscar(Desligamento, "celio"), {celio.pk})
+        celio.nome = "Outro Nome"
+        celio.save()
+        self.assertEqual(self.buscar(Desligamento, "celio"), set())
+
+    def test_cpf_com_mais_de_onze_digitos(self):
+        admissao = admissao_exemplo(codigo="778", cpf="12345678909123", criado_por=self.rh)
+        admissao.save()
+        self.assertEqual(admissao.cpf_digitos, "12345678909123")
+        admissao.full_clean()
+        self.assertEqual(self.buscar(Admissao, "12345678909123"), {admissao.pk})
+
+    def test_save_com_busca_adiada_atualiza_documento(self):
+        jose = Desligamento.objects.defer("busca").get(pk=self.jose.pk)
+        jose.nome = "José Bonifácio"
+        jose.save()
+        self.assertEqual(Desligamento.objects.get(pk=self.jose.pk).busca, "jose bonifacio fortaleza - centro")
+        self.assertEqual(self.buscar(Desligamento, "bonifacio"), {self.jose.pk})
+
+    def test_post_migrate_ignora_tabela_sem_coluna_busca(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("triggers FTS5 só no SQLite")
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER "rh_desligamento_busca_au"')
+        descricao = connection.introspection.get_table_description
+
+        def sem_busca(cursor, tabela):
+            return [coluna for coluna in descricao(cursor, tabela) if coluna.name != "busca"]
+
+        with mock.patch.object(connection.introspection, "get_table_description", sem_busca):
+            instalar_indices_busca(connection)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name = 'rh_desligamento_busca_au'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+        instalar_indices_busca(connection)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name = 'rh_desligamento_busca_au'")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class FiltroAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rh = User.objects.create_user("rh", password="x", is_staff=True, is_superuser=True)
+        cls.coordenador = User.objects.create_user("coord", password="x", is_staff=True)
+        cls.coordenador.groups.add(Group.objects.create(name=GRUPO_COORDENADOR))
+        cls.coordenador.user_permissions.add(*Permission.objects.filter(content_type__app_label="rh"))
+        cls.fabio = User.objects.create_user("fabio", first_name="Fábio")
+        cls.souza = User.objects.create_user("jsouza", first_name="Júlia", last_name="Souza")
+        cls.fernanda = User.objects.create_user("fernanda")
+        User.objects.create_user("fausto")  # sem registros: não aparece
+        Hierarquia.objects.create(coordenador=cls.coordenador, supervisor=cls.fabio)
+        reconstruir_fechamento()
+        Desligamento.objects.create(codigo="1", nome="A", area_atuacao="Fortaleza - Centro", criado_por=cls.fabio)
+        Desligamento.objects.create(codigo="2", nome="B", area_atuacao="Fortim", criado_por=cls.fernanda)
+        Desligamento.objects.create(codigo="3", nome="C", area_atuacao="Sobral", criado_por=cls.fernanda)
+        Desligamento.objects.create(codigo="4", nome="D", area_atuacao="Iguatu", criado_por=cls.souza)
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def opcoes(self, campo, q):
+        url = reverse("admin:rh_desligamento_autocomplete_filtro", args=[campo])
+        return [opcao["text"] for opcao in self.client.get(url, {"q": q}).json()["results"]]
+
+    def test_changelist_nao_monta_lista_de_valores(self):
+        self.client.force_login(self.rh)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse("admin:rh_desligamento_changelist"))
+        self.assertNotContains(response, '<option value="Sobral"')
+        self.assertFalse([c["sql"] for c in consultas.captured_queries if "DISTINCT" in c["sql"]])
+
+    def test_endpoint_por_prefixo_e_visibilidade(self):
+        self.client.force_login(self.rh)
+        self.assertEqual(self.opcoes("area_atuacao", "fort"), ["Fortaleza - Centro (1)", "Fortim (1)"])
+        self.assertEqual(self.opcoes("criado_por", "f"), ["Fábio", "fernanda"])
+
+        self.client.force_login(self.coordenador)
+        self.assertEqual(self.opcoes("area_atuacao", "Fort"), ["Fortaleza - Centro (1)"])
+        self.assertEqual(self.opcoes("criado_por", ""), ["Fábio"])
+
+        url = reverse("admin:rh_desligamento_autocomplete_filtro", args=["nome"])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_usuario_pelo_nome_e_sobrenome(self):
+        self.client.force_login(self.rh)
+        self.assertEqual(self.opcoes("criado_por", "jú"), ["Júlia"])
+        self.assertEqual(self.opcoes("criado_por", "souza"), ["Júlia"])
+        self.assertEqual(self.opcoes("criado_por", "jsou"), ["Júlia"])
+
+    def test_prefixo_em_qualquer_grafia(self):
+        Desligamento.objects.create(codigo="5", nome="E", area_atuacao="McDonald", criado_por=self.fabio)
+        Desligamento.objects.create(codigo="6", nome="F", area_atuacao="São Gonçalo", criado_por=self.fabio)
+        self.client.force_login(self.rh)
+        self.assertEqual(self.opcoes("area_atuacao", "mcDonald"), ["McDonald (1)"])
+        self.assertEqual(self.opcoes("area_atuacao", "SãO"), ["São Gonçalo (1)"])
+        self.assertEqual(self.opcoes("criado_por", "fÁB"), ["Fábio"])
+
+    def test_resultado_em_cache(self):
+        opcoes_filtro(self.rh, Desligamento, "area_atuacao", "So")
+        rh = User.objects.get(pk=self.rh.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(opcoes_filtro(rh, Desligamento, "area_atuacao", "So"), [{"id": "Sobral", "text": "Sobral"}])
+
+    def test_filtro_selecionado(self):
+        self.client.force_login(self.rh)
+        response = self.client.get(reverse("admin:rh_desligamento_changelist"), {"criado_por__id__exact": self.fabio.pk})
+        self.assertEqual(response.context["cl"].result_count, 1)
+        self.assertContains(response, f'<option value="{self.fabio.pk}" selected>Fábio</option>', html=True)
+
+
+class FacetasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rh = User.objects.create_user("rh", password="x", is_staff=True, is_superuser=True)
+        cls.coordenador = User.objects.create_user("coord", password="x", is_staff=True)
+        cls.coordenador.groups.add(Group.objects.create(name=GRUPO_COORDENADOR))
+        cls.sup = User.objects.create_user("sup")
+        cls.outro = User.objects.create_user("outro")
+        Hierarquia.objects.create(coordenador=cls.coordenador, supervisor=cls.sup)
+        reconstruir_fechamento()
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def criar(self, autor, area="Centro", status="pendente"):
+        return Desligamento.objects.create(codigo="1", nome="A", area_atuacao=area, status=status, criado_por=autor)
+
+    def contagens(self, user):
+        return contagens_facetas(User.objects.get(pk=user.pk), Desligamento)
+
+    def test_contagens_acompanham_save_e_delete(self):
+        a = self.criar(self.sup)
+        self.criar(self.sup, area="Sobral")
+        c = self.criar(self.outro, status="confirmado")
+        a.status = "troca"
+        a.save()
+        c.delete()
+        self.criar(None)  # sem autor: invisível, fica fora
+
+        self.assertEqual(self.contagens(self.rh), {
+            "status": {"pendente": 1, "troca": 1},
+            "area_atuacao": {"Centro": 1, "Sobral": 1},
+        })
+        self.assertEqual(reconciliar(Desligamento, corrigir=False), [])
+
+    def test_instancia_com_campos_adiados(self):
+        a = self.criar(self.sup)
+        self.criar(self.sup, status="confirmado")
+        adiado = Desligamento.objects.defer("status").get(pk=a.pk)
+        adiado.area_atuacao = "Sobral"
+        adiado.save()
+        Desligamento.objects.only("pk").get(pk=a.pk).delete()
+        self.criar(self.sup)
+        Desligamento.objects.defer("area_atuacao").get(status="confirmado").delete()
+
+        self.assertEqual(self.contagens(self.rh), {"status": {"pendente": 1}, "area_atuacao": {"Centro": 1}})
+        self.assertEqual(reconciliar(Desligamento, corrigir=False), [])
+
+    def test_escopo_do_coordenador(self):
+        self.criar(self.sup)
+        self.criar(self.outro)
+        self.criar(self.outro)
+        self.assertEqual(self.contagens(self.coordenador)["status"], {"pendente": 1})
+        self.assertEqual(self.contagens(self.rh)["status"], {"pendente": 3})
+
+    def test_changelist_mostra_contagens_sem_group_by_no_formulario(self):
+        self.criar(self.sup)
+        self.criar(self.sup, status="confirmado")
+        self.client.force_login(self.rh)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse("admin:rh_desligamento_changelist"), {"area_atuacao": "Centro"})
+        self.assertContains(response, "Pendente (1)")
+        self.assertContains(response, "Confirmado (1)")
+        self.assertContains(response, "Centro (2)")
+        sqls = [c["sql"] for c in consultas.captured_queries]
+        # A única agregação das facetas é na tabela de contagens.
+        self.assertEqual(len([sql for sql in sqls if 'FROM "rh_contagemfaceta"' in sql]), 1)
+        self.assertFalse([sql for sql in sqls if 'GROUP BY "rh_desligamento"' in sql])
+
+        url = reverse("admin:rh_desligamento_autocomplete_filtro", args=["area_atuacao"])
+        self.assertEqual(self.client.get(url, {"q": "Cen"}).json()["results"], [{"id": "Centro", "text": "Centro (2)"}])
+
+    def test_reconciliar_corrige_desvio(self):
+        self.criar(self.sup)
+        self.criar(self.outro)
+        Desligamento.objects.filter(criado_por=self.outro).update(status="troca")  # sem signals
+        with self.assertRaises(CommandError):
+            call_command("reconciliar_facetas", "--verificar", stdout=io.StringIO(), stderr=io.StringIO())
+        call_command("reconciliar_facetas", stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(self.contagens(self.rh)["status"], {"pendente": 1, "troca": 1})
+        call_command("reconciliar_facetas", "--verificar", stdout=io.StringIO(), stderr=io.StringIO())
+
+
+class EdicaoStatusLoteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rh = User.objects.create_user("rh", password="x", is_staff=True, is_superuser=True)
+        cls.coordenador = User.objects.create_user("coord", password="x", is_staff=True)
+        cls.coordenador.groups.add(Group.objects.create(name=GRUPO_COORDENADOR))
+        cls.coordenador.user_permissions.add(*Permission.objects.filter(content_type__app_label="rh"))
+        cls.sup = User.objects.create_user("sup")
+        Hierarquia.objects.create(coordenador=cls.coordenador, supervisor=cls.sup)
+        reconstruir_fechamento()
+
+    def setUp(self):
+        caches["default"].clear()
+        self.registros = [
+            Desligamento.objects.create(codigo=str(i), nome=f"V{i}", area_atuacao="Centro", criado_por=self.sup)
+            for i in range(4)
+        ]
+
+    def post(self, status):
+        dados = {"form-TOTAL_FORMS": str(len(status)), "form-INITIAL_FORMS": str(len(status)), "_save": "Salvar"}
+        for i, (obj, novo) in enumerate(status.items()):
+            dados[f"form-{i}-id"] = str(obj.pk)
+            dados[f"form-{i}-status"] = novo
+        return self.client.post(reverse("admin:rh_desligamento_changelist"), dados)
+
+    def test_um_bulk_update_e_um_evento(self):
+        a, b, c, d = self.registros
+        for obj in self.registros:
+            caches["exportacoes"].set(chave_cache(obj), ("digital", b"xlsx"))
+        self.client.force_login(self.rh)
+
+        with CaptureQueriesContext(connection) as consultas, \
+                self.assertLogs("rh.services.edicao_lote", level="INFO") as logs, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.post({a: "confirmado", b: "confirmado", c: "troca", d: "pendente"})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            dict(Desligamento.objects.values_list("pk", "status")),
+            {a.pk: "confirmado", b.pk: "confirmado", c.pk: "troca", d.pk: "pendente"},
+        )
+        updates = [q["sql"] for q in consultas.captured_queries if q["sql"].startswith('UPDATE "rh_desligamento"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(LogEntry.objects.filter(action_flag=CHANGE).count(), 3)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("confirmado: 2", logs.output[0])
+        # Cache das exportações: só quem mudou perde a entrada.
+        self.assertIsNone(caches["exportacoes"].get(chave_cache(a)))
+        self.assertIsNotNone(caches["exportacoes"].get(chave_cache(d)))
+        self.assertEqual(
+            contagens_facetas(User.objects.get(pk=self.rh.pk), Desligamento)["status"],
+            {"confirmado": 2, "troca": 1, "pendente": 1},
+        )
+        self.assertEqual(reconciliar(Desligamento, corrigir=False), [])
+
+    def test_registro_nao_visivel_nao_altera_nada(self):
+        outro = Desligamento.objects.create(codigo="9", nome="X", area_atuacao="Centro", criado_por=self.rh)
+        self.client.force_login(self.coordenador)
+        response = self.post({self.registros[0]: "confirmado", outro: "confirmado"})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Desligamento.objects.filter(status="confirmado").exists())
+        self.assertEqual(Desligamento.objects.count(), 5)
+
+    def test_status_invalido_cai_no_caminho_padrao(self):
+        self.client.force_login(self.rh)
+        response = self.post({self.registros[0]: "confirmado", self.registros[1]: "arquivado"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["cl"].formset.errors[1])
+        self.assertFalse(Desligamento.objects.filter(status="confirmado").exists())
+
+    def test_benchmark_compara_os_dois_caminhos(self):
+        resultados = executar_benchmark_edicao(quantidades=(5,), repeticoes=1)
+        consultas = {r["caminho"]: r["consultas"] for r in resultados}
+        self.assertLess(consultas["lote"], consultas["padrao"])
+        self.assertFalse(User.objects.filter(username="benchmark_edicao_status").exists())
+        self.assertTrue(admin.site._registry[Desligamento].edicao_status_em_lote)